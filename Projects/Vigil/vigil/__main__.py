@@ -1,6 +1,7 @@
 """Entry point: python -m vigil
 
 Muestra banner con status de componentes, parsea args y lanza el engine.
+Subcomandos adicionales (query, import) en commands.py.
 """
 
 from __future__ import annotations
@@ -56,7 +57,7 @@ def _print_banner(status: dict) -> None:
     # Alertas
     toast = "ON" if status["toast"] else "OFF"
     print(f"  Toast:        {toast}")
-    print(f"  Ollama:       {status['ollama_model']} @ {status['ollama_url']}")
+    print(f"  LLM:          {status['ollama_model']} @ {status['ollama_url']} ({status.get('llm_backend', 'ollama')})")
 
     if status.get("dashboard_url"):
         print(f"  Dashboard:    {status['dashboard_url']}")
@@ -66,6 +67,14 @@ def _print_banner(status: dict) -> None:
     print()
 
 
+def _print_llm_status(breaker: str) -> None:
+    """Estado del LLM tras el chequeo inicial (corre ya dentro del loop)."""
+    llm_state = "ON" if breaker == "CLOSED" else "OFF"
+    llm_label = "disponible" if breaker == "CLOSED" else "circuito abierto, reintentando"
+    print(f"  LLM:          {_status_icon(llm_state)} {llm_label}")
+    print()
+
+
 def main() -> None:
     """Parsea argumentos y arranca Vigil."""
     parser = argparse.ArgumentParser(
@@ -83,8 +92,18 @@ def main() -> None:
         action="store_true",
         help="Habilitar logging verbose (DEBUG)",
     )
+
+    from .commands import add_subcommands
+
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("run", help="Iniciar el IDS (default)")
+    add_subcommands(subparsers)
     args = parser.parse_args()
 
+    if getattr(args, "func", None):
+        args.func(args)
+        return
+
     # Importar engine aquí para que el banner se vea rápido
     from .core.engine import VigilEngine
 
@@ -97,6 +116,7 @@ def main() -> None:
         sys.exit(1)
 
     _print_banner(status)
+    engine.on_llm_status = _print_llm_status
 
     # Lanzar loop async
     try:
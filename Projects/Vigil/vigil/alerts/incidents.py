@@ -0,0 +1,258 @@
+"""Agregación de alertas en incidentes por entidades compartidas.
+
+Una intrusión suele disparar varias reglas: proceso en temp, listener en
+4444 del mismo PID, conexión a la misma IP... Este módulo une esas alertas
+en un Incident si comparten alguna entidad (pid, IP remota, path) dentro
+de una ventana temporal. El nombre de proceso es una entidad débil: se
+guarda para mostrar y consultar pero no une por sí solo (svchost.exe o
+python corren en muchos procesos sin relación); lo que une es el pid.
+
+Estructura:
+- Índice de entidades: {(tipo, valor) -> (incident_id, last_seen)}, en
+  orden de último uso para expirar desde el frente en O(1) amortizado.
+- Union-find incremental sobre incident_id (path compression + union by
+  size). Cuando una alerta toca entidades de varios incidentes, se unen;
+  los ids absorbidos quedan en alert.merged_incidents para que el store
+  resuelva alertas guardadas con un id previo a la unión.
+- Estado acotado: entidades e incidentes expiran tras `window` segundos
+  sin actividad, con tope duro de max_incidents / max_entities.
+"""
+
+from __future__ import annotations
+
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from ..core.events import Alert, Severity
+
+# Campo de event.data -> tipo de entidad
+_ENTITY_FIELDS = {
+    "pid": "pid",
+    "process": "process",
+    "name": "process",
+    "remote_ip": "ip",
+    "ip_address": "ip",
+    "source_ip": "ip",
+    "file_path": "path",
+    "path": "path",
+    "service_path": "path",
+}
+
+# Tipos de entidad que no unen incidentes por sí solos
+_WEAK_KINDS = {"process"}
+
+# Tope de entidades guardadas por incidente (para mostrar, no para unir)
+_MAX_INCIDENT_ENTITIES = 50
+
+# Valores que no identifican nada (no deben unir incidentes)
+_IGNORED_VALUES = {"", "unknown", "-", "0", "4", "system", "0.0.0.0", "::", "*", "127.0.0.1", "::1"}
+
+
+@dataclass
+class Incident:
+    """Grupo de alertas relacionadas por entidades compartidas."""
+    incident_id: str
+    title: str
+    severity: Severity
+    first_seen: float
+    last_seen: float
+    alert_count: int = 0
+    rule_ids: list[str] = field(default_factory=list)
+    entities: set[tuple[str, str]] = field(default_factory=set)
+    llm_explanation: str | None = None
+
+    def absorb(self, other: Incident) -> None:
+        """Fusiona otro incidente dentro de este."""
+        if other.severity > self.severity:
+            self.severity = other.severity
+            self.title = other.title
+        self.first_seen = min(self.first_seen, other.first_seen)
+        self.last_seen = max(self.last_seen, other.last_seen)
+        self.alert_count += other.alert_count
+        for rule_id in other.rule_ids:
+            if rule_id not in self.rule_ids:
+                self.rule_ids.append(rule_id)
+        for entity in other.entities:
+            if len(self.entities) >= _MAX_INCIDENT_ENTITIES:
+                break
+            self.entities.add(entity)
+        if self.llm_explanation is None:
+            self.llm_explanation = other.llm_explanation
+
+    def to_dict(self) -> dict:
+        return {
+            "incident_id": self.incident_id,
+            "title": self.title,
+            "severity": self.severity.name,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "alert_count": self.alert_count,
+            "rule_ids": self.rule_ids,
+            "entities": sorted(f"{k}={v}" for k, v in self.entities),
+        }
+
+
+def extract_entities(alert: Alert) -> set[tuple[str, str]]:
+    """Extrae entidades normalizadas (tipo, valor) del evento de una alerta."""
+    if not alert.event or not alert.event.data:
+        return set()
+    return entities_from_data(alert.event.data)
+
+
+def entities_from_data(data: dict) -> set[tuple[str, str]]:
+    """Extrae entidades normalizadas (tipo, valor) de un event.data."""
+    entities = set()
+    for key, value in data.items():
+        kind = _ENTITY_FIELDS.get(key)
+        if kind is None or value is None:
+            continue
+        norm = str(value).strip().lower()
+        if norm in _IGNORED_VALUES:
+            continue
+        entities.add((kind, norm))
+    return entities
+
+
+class IncidentAggregator:
+    """Une alertas en incidentes con union-find sobre un índice de entidades."""
+
+    def __init__(self, window: int = 300, max_incidents: int = 1000,
+                 max_entities: int = 10000):
+        self.window = window
+        self.max_incidents = max_incidents
+        self.max_entities = max_entities
+
+        self._entities: OrderedDict[tuple[str, str], tuple[str, float]] = OrderedDict()
+        self._parent: dict[str, str] = {}
+        self._size: dict[str, int] = {}
+        self._members: dict[str, list[str]] = {}   # root -> ids unidos a él
+        self._incidents: OrderedDict[str, Incident] = OrderedDict()  # root -> Incident
+
+        self.alerts_total = 0
+        self.alerts_grouped = 0   # alertas que se sumaron a un incidente existente
+        self.merges = 0
+
+    def _find(self, incident_id: str) -> str | None:
+        """Raíz del conjunto, o None si el incidente ya expiró."""
+        if incident_id not in self._parent:
+            return None
+        root = incident_id
+        while self._parent[root] != root:
+            root = self._parent[root]
+        # Path compression
+        while self._parent[incident_id] != root:
+            self._parent[incident_id], incident_id = root, self._parent[incident_id]
+        return root
+
+    def _union(self, a: str, b: str) -> str:
+        """Une dos raíces (by size). Retorna la raíz resultante."""
+        if self._size[a] < self._size[b]:
+            a, b = b, a
+        self._parent[b] = a
+        self._size[a] += self._size.pop(b)
+        self._members[a].extend(self._members.pop(b))
+        self._incidents[a].absorb(self._incidents.pop(b))
+        self.merges += 1
+        return a
+
+    def _drop(self, root: str) -> None:
+        """Elimina un incidente y todos los ids unidos a él."""
+        self._incidents.pop(root, None)
+        self._size.pop(root, None)
+        for member in self._members.pop(root, [root]):
+            self._parent.pop(member, None)
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.window
+        while self._entities:
+            entity, (_, seen) = next(iter(self._entities.items()))
+            if seen >= cutoff and len(self._entities) <= self.max_entities:
+                break
+            del self._entities[entity]
+        while self._incidents:
+            root, incident = next(iter(self._incidents.items()))
+            if incident.last_seen >= cutoff and len(self._incidents) <= self.max_incidents:
+                break
+            self._drop(root)
+
+    def add(self, alert: Alert) -> tuple[Incident, bool, bool]:
+        """Asigna la alerta a un incidente.
+
+        Retorna (incidente, es_nuevo, escaló_severidad) y setea
+        alert.incident_id con el id de la raíz del incidente (y
+        alert.merged_incidents con los ids que esta alerta unió a él).
+        """
+        now = time.time()
+        self._expire(now)
+        self.alerts_total += 1
+
+        entities = extract_entities(alert)
+        linking = [e for e in entities if e[0] not in _WEAK_KINDS]
+        roots = set()
+        for entity in linking:
+            entry = self._entities.get(entity)
+            if entry is None:
+                continue
+            root = self._find(entry[0])
+            if root is not None:
+                roots.add(root)
+
+        if roots:
+            merged = set(roots)
+            root = roots.pop()
+            for other in roots:
+                root = self._union(root, other)
+            merged.discard(root)
+            alert.merged_incidents = sorted(merged)
+            incident = self._incidents[root]
+            self._incidents.move_to_end(root)
+            is_new = False
+            self.alerts_grouped += 1
+        else:
+            root = uuid.uuid4().hex[:12]
+            self._parent[root] = root
+            self._size[root] = 1
+            self._members[root] = [root]
+            incident = Incident(
+                incident_id=root,
+                title=alert.title,
+                severity=alert.severity,
+                first_seen=now,
+                last_seen=now,
+            )
+            self._incidents[root] = incident
+            is_new = True
+
+        incident.last_seen = now
+        incident.alert_count += 1
+        if alert.rule_id not in incident.rule_ids:
+            incident.rule_ids.append(alert.rule_id)
+        escalated = alert.severity > incident.severity
+        if escalated:
+            incident.severity = alert.severity
+            incident.title = alert.title
+
+        for entity in linking:
+            self._entities[entity] = (root, now)
+            self._entities.move_to_end(entity)
+        for entity in entities:
+            if len(incident.entities) < _MAX_INCIDENT_ENTITIES:
+                incident.entities.add(entity)
+
+        alert.incident_id = incident.incident_id
+        return incident, is_new, escalated
+
+    def get(self, incident_id: str) -> Incident | None:
+        root = self._find(incident_id)
+        return self._incidents.get(root) if root else None
+
+    def get_stats(self) -> dict:
+        return {
+            "open": len(self._incidents),
+            "entities": len(self._entities),
+            "alerts_total": self.alerts_total,
+            "alerts_grouped": self.alerts_grouped,
+            "merges": self.merges,
+        }
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-import json
+import asyncio
 from pathlib import Path
 
 from ..core.events import Alert
@@ -21,9 +21,16 @@ class AlertLog:
     async def write(self, alert: Alert) -> None:
         """Append una alerta serializada como una línea JSON."""
         try:
-            line = json.dumps(alert.to_dict(), ensure_ascii=False)
-            with self.path.open("a", encoding="utf-8") as f:
-                f.write(line + "\n")
-            log.debug("Alerta logueada: %s", alert.alert_id)
+            await self.write_batch([alert])
         except Exception as e:
             log.error("Error escribiendo alerta: %s", e)
+
+    async def write_batch(self, alerts: list[Alert]) -> None:
+        """Append un batch de alertas con un solo open/write. Lanza si falla."""
+        data = b"".join(a.to_json() + b"\n" for a in alerts)
+        await asyncio.get_running_loop().run_in_executor(None, self._append, data)
+        log.debug("%d alertas logueadas", len(alerts))
+
+    def _append(self, data: bytes) -> None:
+        with self.path.open("ab") as f:
+            f.write(data)
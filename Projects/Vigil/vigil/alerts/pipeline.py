@@ -2,31 +2,133 @@
 
 from __future__ import annotations
 
+import asyncio
 import time
 from collections import defaultdict
+from typing import Callable
 
-from ..core.config import AlertConfig
+from ..core.config import AlertConfig, SinkConfig
 from ..core.events import Alert
 from ..core.logger import get_logger
-from .log_alert import AlertLog
-from .toast import send_toast
+from .incidents import Incident, IncidentAggregator
+from .sinks import SinkWorker, create_sink
 
 log = get_logger("pipeline")
 
 
 class AlertPipeline:
-    """Procesa alertas: dedup → throttle → enrich (LLM) → toast + log."""
+    """Procesa alertas: dedup → throttle → incidente → enrich (LLM) → sinks.
+
+    Las alertas relacionadas se agrupan en incidentes: el LLM y los sinks
+    per_incident (toast) solo actúan cuando una alerta abre un incidente
+    o eleva su severidad. Cada sink tiene su propia cola, así que
+    process() solo encola y nunca espera la entrega. El enriquecimiento
+    corre en su propia task: una ráfaga llega entera al analizador (que
+    puede agruparla en un batch) sin frenar el procesamiento de eventos.
+    """
 
     def __init__(self, config: AlertConfig, enricher=None):
         self.config = config
         self.enricher = enricher  # OllamaAnalyzer (se setea después)
-        self.alert_log = AlertLog(config.log_file)
+        # Observadores en vivo (dashboard): alerta emitida antes del LLM,
+        # y updates de la explicación (parcial o final)
+        self.on_alert: Callable[[Alert], None] | None = None
+        self.on_update: Callable[[Alert, str, bool], None] | None = None
+        self.sinks: list[SinkWorker] = self._build_sinks()
+        self.incidents = IncidentAggregator(
+            window=config.incident_window,
+            max_incidents=config.max_incidents,
+        )
+        self._started = False
+        self._enrich_tasks: set[asyncio.Task] = set()
 
         # Para dedup: {hash -> timestamp}
         self._seen: dict[str, float] = {}
         # Para throttle: {rule_id -> last_alert_time}
         self._last_alert: dict[str, float] = defaultdict(float)
 
+    def _build_sinks(self) -> list[SinkWorker]:
+        """Crea log JSONL + toast (según config) más los sinks extra configurados."""
+        sink_configs = [SinkConfig(type="jsonl", options={"path": self.config.log_file},
+                                   batch_size=50, flush_interval=0.5)]
+        if self.config.store_path:
+            sink_configs.append(SinkConfig(type="store", options={"path": self.config.store_path},
+                                           batch_size=100, flush_interval=1.0))
+        if self.config.toast_enabled:
+            sink_configs.append(SinkConfig(type="toast", queue_size=20, max_retries=0))
+        sink_configs.extend(self.config.sinks)
+
+        workers = []
+        for sink_config in sink_configs:
+            try:
+                workers.append(SinkWorker(create_sink(sink_config), sink_config))
+            except ValueError as e:
+                log.error("Sink inválido (saltando): %s", e)
+        return workers
+
+    @property
+    def store(self):
+        """AlertStore del sink "store", o None si está deshabilitado."""
+        for worker in self.sinks:
+            if worker.name == "store":
+                return worker.sink.store
+        return None
+
+    async def start(self) -> None:
+        """Lanza el worker de cada sink. Requiere un event loop corriendo."""
+        for worker in self.sinks:
+            worker.start()
+        self._started = True
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Espera enriquecimientos en curso, vacía las colas de los sinks y los cierra."""
+        if self._enrich_tasks:
+            _, pending = await asyncio.wait(self._enrich_tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                log.warning("%d enriquecimientos cancelados al cerrar", len(pending))
+                await asyncio.gather(*pending, return_exceptions=True)
+        for worker in self.sinks:
+            await worker.stop()
+        self._started = False
+
+    def get_stats(self) -> dict:
+        """Contadores por sink para el dashboard."""
+        stats = {}
+        for worker in self.sinks:
+            key = worker.name
+            if key in stats:
+                key = f"{worker.name}#{len(stats)}"
+            stats[key] = worker.get_stats()
+        return stats
+
+    async def _enrich_and_dispatch(self, alert: Alert, incident: Incident, notify: bool) -> None:
+        on_partial = None
+        if self.on_update:
+            on_partial = lambda text: self.on_update(alert, text, False)  # noqa: E731
+        try:
+            explanation = await self.enricher.analyze(alert, on_partial=on_partial)
+            if explanation:
+                alert.llm_explanation = explanation
+                alert.invalidate()
+                incident.llm_explanation = explanation
+                if self.on_update:
+                    self.on_update(alert, explanation, True)
+        except Exception as e:
+            log.debug("LLM enrichment falló (continuando): %s", e)
+        self._dispatch(alert, incident, notify)
+
+    def _dispatch(self, alert: Alert, incident: Incident, notify: bool) -> None:
+        """5. Encola en cada sink (no bloquea)."""
+        for worker in self.sinks:
+            if worker.sink.per_incident and not notify:
+                continue
+            worker.enqueue(alert)
+
+        log.info("[%s] %s — %s (incidente %s, %d alertas)", alert.severity.name,
+                 alert.rule_id, alert.title, incident.incident_id, incident.alert_count)
+
     def _dedup_key(self, alert: Alert) -> str:
         """Genera una clave para deduplicación basada en regla + datos relevantes."""
         event_data = alert.event.data if alert.event else {}
@@ -78,21 +180,22 @@ class AlertPipeline:
             log.debug("Alerta throttled: %s", alert.rule_id)
             return False
 
-        # 3. LLM enrichment (async, no bloquea)
-        if self.enricher:
-            try:
-                explanation = await self.enricher.analyze(alert)
-                if explanation:
-                    alert.llm_explanation = explanation
-            except Exception as e:
-                log.debug("LLM enrichment falló (continuando): %s", e)
+        # 3. Agrupar en incidente
+        incident, is_new, escalated = self.incidents.add(alert)
+        notify = is_new or escalated
 
-        # 4. Log siempre
-        await self.alert_log.write(alert)
+        # Publicar ya (sin esperar al LLM): el dashboard la muestra de inmediato
+        if self.on_alert:
+            self.on_alert(alert)
 
-        # 5. Toast si habilitado
-        if self.config.toast_enabled:
-            await send_toast(alert)
+        if not self._started:
+            await self.start()
 
-        log.info("[%s] %s — %s", alert.severity.name, alert.rule_id, alert.title)
+        # 4. LLM enrichment solo si abre o escala el incidente (en background)
+        if self.enricher and notify:
+            task = asyncio.create_task(self._enrich_and_dispatch(alert, incident, notify))
+            self._enrich_tasks.add(task)
+            task.add_done_callback(self._enrich_tasks.discard)
+        else:
+            self._dispatch(alert, incident, notify)
         return True
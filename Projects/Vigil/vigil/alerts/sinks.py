@@ -0,0 +1,388 @@
+"""Sinks de alertas: destinos enchufables con cola propia, batching y retry.
+
+Cada sink corre detrás de un SinkWorker con su propia cola acotada.
+El pipeline solo hace put_nowait() — nunca espera a un sink — así un
+webhook lento no demora el log JSONL ni el toast.
+
+Sinks incluidos:
+- jsonl:   archivo JSONL append-only (AlertLog)
+- toast:   notificación toast de Windows
+- syslog:  RFC 5424 sobre UDP o TCP (framing octet-counting, RFC 6587)
+- webhook: POST HTTP con un array JSON por batch
+- stream:  NDJSON a un Unix socket o a stdout ("-")
+- store:   store SQLite indexado (AlertStore)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import socket
+import sys
+import time
+from abc import ABC, abstractmethod
+
+from ..core.config import SinkConfig
+from ..core.encoding import json_array
+from ..core.events import Alert, Severity
+from ..core.logger import get_logger
+from .log_alert import AlertLog
+from .store import AlertStore
+from .toast import send_toast
+
+log = get_logger("sinks")
+
+# Severidad Vigil -> severidad syslog (RFC 5424)
+_SYSLOG_SEVERITY = {
+    Severity.LOW: 6,       # informational
+    Severity.MEDIUM: 4,    # warning
+    Severity.HIGH: 3,      # error
+    Severity.CRITICAL: 2,  # critical
+}
+
+
+class SinkError(Exception):
+    """Fallo de entrega. retryable=False descarta el batch sin reintentar."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class AlertSink(ABC):
+    """Destino de alertas.
+
+    Subclases implementan:
+    - send(): entrega un batch completo o lanza excepción (→ retry)
+    - open()/close(): opcional, manejo de conexiones
+
+    per_incident=True: solo recibe alertas que abren o escalan un incidente.
+    """
+
+    per_incident = False
+
+    def __init__(self, name: str):
+        self.name = name
+
+    async def open(self) -> None:
+        """Abre recursos del sink. Override si necesita conexión."""
+        pass
+
+    @abstractmethod
+    async def send(self, alerts: list[Alert]) -> None:
+        """Entrega un batch de alertas. Lanza excepción si falla."""
+        ...
+
+    async def close(self) -> None:
+        """Libera recursos del sink. Override si necesita cleanup."""
+        pass
+
+
+class JsonlSink(AlertSink):
+    """Escribe batches en un archivo JSONL via AlertLog."""
+
+    def __init__(self, path: str):
+        super().__init__("jsonl")
+        self.alert_log = AlertLog(path)
+
+    async def send(self, alerts: list[Alert]) -> None:
+        await self.alert_log.write_batch(alerts)
+
+
+class StoreSink(AlertSink):
+    """Inserta batches en el AlertStore SQLite (en un thread del executor)."""
+
+    def __init__(self, path: str):
+        super().__init__("store")
+        self.store = AlertStore(path)
+
+    async def send(self, alerts: list[Alert]) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.store.insert_many, alerts)
+
+    async def close(self) -> None:
+        self.store.close()
+
+
+class ToastSink(AlertSink):
+    """Notificaciones toast de Windows. Un toast por incidente, sin retry."""
+
+    per_incident = True
+
+    def __init__(self):
+        super().__init__("toast")
+
+    async def send(self, alerts: list[Alert]) -> None:
+        for alert in alerts:
+            await send_toast(alert)
+
+
+class SyslogSink(AlertSink):
+    """Envía alertas como mensajes syslog RFC 5424 por UDP o TCP."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 514,
+                 protocol: str = "udp", facility: int = 16):
+        super().__init__("syslog")
+        self.host = host
+        self.port = port
+        self.protocol = protocol.lower()
+        self.facility = facility  # 16 = local0
+        self._hostname = socket.gethostname()
+        self._udp: asyncio.DatagramTransport | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    def format_message(self, alert: Alert) -> bytes:
+        """Formatea una alerta como mensaje RFC 5424."""
+        pri = self.facility * 8 + _SYSLOG_SEVERITY.get(alert.severity, 5)
+        ts = alert.timestamp.astimezone().isoformat()
+        header = f"<{pri}>1 {ts} {self._hostname} vigil - {alert.rule_id} - "
+        return header.encode("utf-8") + alert.to_json()
+
+    async def _connect(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.protocol == "udp":
+            self._udp, _ = await loop.create_datagram_endpoint(
+                asyncio.DatagramProtocol,
+                remote_addr=(self.host, self.port),
+            )
+        else:
+            _, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def send(self, alerts: list[Alert]) -> None:
+        if self._udp is None and self._writer is None:
+            await self._connect()
+
+        try:
+            if self._udp is not None:
+                for alert in alerts:
+                    self._udp.sendto(self.format_message(alert))
+            else:
+                # Octet counting: "<len> <msg>" (RFC 6587)
+                for alert in alerts:
+                    msg = self.format_message(alert)
+                    self._writer.write(f"{len(msg)} ".encode("ascii") + msg)
+                await self._writer.drain()
+        except (OSError, ConnectionError):
+            await self.close()
+            raise
+
+    async def close(self) -> None:
+        if self._udp is not None:
+            self._udp.close()
+            self._udp = None
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (OSError, ConnectionError):
+                pass
+            self._writer = None
+
+
+class WebhookSink(AlertSink):
+    """POST de batches a un webhook HTTP como array JSON."""
+
+    def __init__(self, url: str, timeout: float = 10.0, headers: dict | None = None):
+        super().__init__("webhook")
+        self.url = url
+        self.timeout = timeout
+        self.headers = headers or {}
+        self._client = None
+
+    async def open(self) -> None:
+        import httpx
+        self._client = httpx.AsyncClient(timeout=self.timeout, headers=self.headers)
+
+    async def send(self, alerts: list[Alert]) -> None:
+        import httpx
+
+        body = json_array([a.to_json() for a in alerts])
+        try:
+            resp = await self._client.post(
+                self.url,
+                content=body,
+                headers={"Content-Type": "application/json"},
+            )
+        except httpx.HTTPError as e:
+            raise SinkError(f"webhook inaccesible: {e}") from e
+
+        if resp.status_code >= 500 or resp.status_code == 429:
+            raise SinkError(f"webhook respondió {resp.status_code}")
+        if resp.status_code >= 400:
+            raise SinkError(f"webhook rechazó el batch ({resp.status_code})", retryable=False)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class StreamSink(AlertSink):
+    """Stream NDJSON a un Unix socket, o a stdout si path es "-"."""
+
+    def __init__(self, path: str = "-"):
+        super().__init__("stream")
+        self.path = path
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def send(self, alerts: list[Alert]) -> None:
+        data = b"".join(a.to_json() + b"\n" for a in alerts)
+
+        if self.path == "-":
+            sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+            return
+
+        if self._writer is None:
+            _, self._writer = await asyncio.open_unix_connection(self.path)
+        try:
+            self._writer.write(data)
+            await self._writer.drain()
+        except (OSError, ConnectionError):
+            await self.close()
+            raise
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (OSError, ConnectionError):
+                pass
+            self._writer = None
+
+
+class SinkWorker:
+    """Cola acotada + task consumidora para un sink.
+
+    - enqueue() nunca bloquea: si la cola está llena, descarta y cuenta
+    - Agrupa hasta batch_size alertas o flush_interval segundos
+    - Reintenta con backoff exponencial hasta max_retries
+    """
+
+    def __init__(self, sink: AlertSink, config: SinkConfig):
+        self.sink = sink
+        self.config = config
+        self._queue: asyncio.Queue[Alert] = asyncio.Queue(maxsize=config.queue_size)
+        self._task: asyncio.Task | None = None
+        self.sent = 0
+        self.dropped = 0     # descartadas por cola llena
+        self.failed = 0      # descartadas tras agotar reintentos
+        self.retries = 0
+
+    @property
+    def name(self) -> str:
+        return self.sink.name
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"sink-{self.name}")
+
+    def enqueue(self, alert: Alert) -> bool:
+        """Encola sin bloquear. Retorna False si se descartó."""
+        try:
+            self._queue.put_nowait(alert)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            log.warning("Cola de sink '%s' llena — alerta %s descartada", self.name, alert.alert_id)
+            return False
+
+    async def _next_batch(self) -> list[Alert]:
+        """Espera la primera alerta y junta más hasta batch_size o flush_interval."""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.config.flush_interval
+        while len(batch) < self.config.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _deliver(self, batch: list[Alert]) -> None:
+        """Entrega un batch con retry y backoff exponencial."""
+        delay = self.config.retry_backoff
+        for attempt in range(self.config.max_retries + 1):
+            try:
+                await self.sink.send(batch)
+                self.sent += len(batch)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                retryable = getattr(e, "retryable", True)
+                if not retryable or attempt == self.config.max_retries:
+                    self.failed += len(batch)
+                    log.warning("Sink '%s' descartó %d alertas: %s", self.name, len(batch), e)
+                    return
+                self.retries += 1
+                log.debug("Sink '%s' falló (intento %d): %s", self.name, attempt + 1, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.config.max_backoff)
+
+    async def _run(self) -> None:
+        try:
+            await self.sink.open()
+        except Exception as e:
+            log.error("No se pudo abrir sink '%s': %s", self.name, e)
+
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._deliver(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Intenta vaciar la cola dentro de timeout y cierra el sink."""
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                log.warning("Sink '%s': %d alertas sin entregar al cerrar",
+                            self.name, self._queue.qsize())
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.sink.close()
+
+    def get_stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "retries": self.retries,
+        }
+
+
+def create_sink(config: SinkConfig) -> AlertSink:
+    """Instancia un sink a partir de su SinkConfig."""
+    opts = config.options
+    if config.type == "jsonl":
+        return JsonlSink(opts.get("path", "alerts.jsonl"))
+    if config.type == "store":
+        return StoreSink(opts.get("path", "alerts.db"))
+    if config.type == "toast":
+        return ToastSink()
+    if config.type == "syslog":
+        return SyslogSink(
+            host=opts.get("host", "127.0.0.1"),
+            port=int(opts.get("port", 514)),
+            protocol=opts.get("protocol", "udp"),
+            facility=int(opts.get("facility", 16)),
+        )
+    if config.type == "webhook":
+        if "url" not in opts:
+            raise ValueError("sink webhook requiere 'url'")
+        return WebhookSink(
+            url=opts["url"],
+            timeout=float(opts.get("timeout", 10.0)),
+            headers=opts.get("headers"),
+        )
+    if config.type == "stream":
+        return StreamSink(opts.get("path", "-"))
+    raise ValueError(f"tipo de sink desconocido: {config.type}")
@@ -0,0 +1,229 @@
+"""Store indexado de alertas sobre SQLite (modo WAL).
+
+Complementa el alerts.jsonl append-only con un índice consultable por
+timestamp, rule_id, severidad y entidades (pid, proceso, IP, path).
+Lo alimenta StoreSink en batches desde el AlertPipeline, y lo consultan
+`python -m vigil query` y el endpoint /api/alerts del dashboard.
+
+El documento JSON completo de cada alerta se guarda tal cual (los mismos
+bytes que van al JSONL), así que una consulta no re-serializa nada.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from ..core.events import Alert, Severity
+from ..core.logger import get_logger
+from .incidents import entities_from_data, extract_entities
+
+log = get_logger("store")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    alert_id    TEXT PRIMARY KEY,
+    ts          REAL NOT NULL,
+    rule_id     TEXT NOT NULL,
+    severity    INTEGER NOT NULL,
+    incident_id TEXT,
+    doc         BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts(ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_rule_ts ON alerts(rule_id, ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_severity_ts ON alerts(severity, ts);
+
+CREATE TABLE IF NOT EXISTS alert_entities (
+    kind     TEXT NOT NULL,
+    value    TEXT NOT NULL,
+    alert_id TEXT NOT NULL,
+    ts       REAL NOT NULL,
+    PRIMARY KEY (kind, value, ts, alert_id)
+) WITHOUT ROWID;
+
+-- Incidentes absorbidos por otro (union en IncidentAggregator): las
+-- alertas guardadas con el id viejo siguen apareciendo bajo el nuevo
+CREATE TABLE IF NOT EXISTS incident_merges (
+    incident_id TEXT PRIMARY KEY,
+    merged_into TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+_IMPORT_BATCH = 1000
+
+
+def _row(alert_id: str, ts: float, rule_id: str, severity: int,
+         incident_id: str | None, doc: bytes, entities: Iterable[tuple[str, str]],
+         merged: Iterable[str] = ()):
+    return (alert_id, ts, rule_id, severity, incident_id, doc), [
+        (kind, value, alert_id, ts) for kind, value in entities
+    ], [(old, incident_id) for old in merged]
+
+
+def _alert_row(alert: Alert):
+    return _row(
+        alert.alert_id,
+        alert.timestamp.timestamp(),
+        alert.rule_id,
+        int(alert.severity),
+        alert.incident_id,
+        alert.to_json(),
+        extract_entities(alert),
+        alert.merged_incidents,
+    )
+
+
+def _doc_row(line: bytes):
+    """Fila a partir de una línea JSONL ya escrita (para backfill)."""
+    doc = json.loads(line)
+    event = doc.get("event") or {}
+    return _row(
+        doc["alert_id"],
+        datetime.fromisoformat(doc["timestamp"]).timestamp(),
+        doc["rule_id"],
+        int(Severity[doc["severity"]]),
+        doc.get("incident_id"),
+        line,
+        entities_from_data(event.get("data") or {}),
+        doc.get("merged_incidents") or (),
+    )
+
+
+def parse_cursor(cursor: str) -> tuple[float, str]:
+    """Cursor de paginación "ts:alert_id" (devuelto como next_cursor)."""
+    ts, _, alert_id = cursor.partition(":")
+    return float(ts), alert_id
+
+
+class AlertStore:
+    """Store SQLite de alertas. Thread-safe (una conexión + lock).
+
+    Los métodos son síncronos: desde asyncio llamarlos via run_in_executor.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _insert(self, rows: list) -> int:
+        alerts = [r[0] for r in rows]
+        entities = [e for r in rows for e in r[1]]
+        merges = [m for r in rows for m in r[2]]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO alerts VALUES (?, ?, ?, ?, ?, ?)", alerts)
+            inserted = self._conn.total_changes - before
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO alert_entities VALUES (?, ?, ?, ?)", entities)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO incident_merges VALUES (?, ?)", merges)
+        return inserted
+
+    def insert_many(self, alerts: list[Alert]) -> int:
+        """Inserta un batch en una sola transacción. Retorna cuántas eran nuevas."""
+        return self._insert([_alert_row(a) for a in alerts])
+
+    def import_jsonl(self, path: str | Path) -> tuple[int, int]:
+        """Backfill desde un alerts.jsonl leyendo en streaming.
+
+        Idempotente (alert_id es PK). Retorna (importadas, líneas inválidas).
+        """
+        imported = invalid = 0
+        batch = []
+        with Path(path).open("rb") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    batch.append(_doc_row(line))
+                except (ValueError, KeyError, TypeError):
+                    invalid += 1
+                    continue
+                if len(batch) >= _IMPORT_BATCH:
+                    imported += self._insert(batch)
+                    batch.clear()
+        if batch:
+            imported += self._insert(batch)
+        log.info("Backfill %s: %d alertas nuevas, %d líneas inválidas", path, imported, invalid)
+        return imported, invalid
+
+    def query(self, since: float | None = None, until: float | None = None,
+              rule_id: str | None = None, min_severity: Severity | None = None,
+              entity: tuple[str, str] | None = None, incident_id: str | None = None,
+              limit: int = 100, cursor: str | None = None) -> tuple[list[bytes], str | None]:
+        """Consulta alertas, más recientes primero.
+
+        Paginación por keyset: pasar el next_cursor devuelto para la página
+        siguiente. Retorna (documentos JSON, next_cursor o None).
+        """
+        where, params = [], []
+        if since is not None:
+            where.append("a.ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("a.ts < ?")
+            params.append(until)
+        if rule_id:
+            where.append("a.rule_id = ?")
+            params.append(rule_id)
+        if min_severity is not None:
+            where.append("a.severity >= ?")
+            params.append(int(min_severity))
+        if incident_id:
+            # El incidente y todos los que absorbió (transitivamente)
+            where.append("a.incident_id IN (WITH RECURSIVE inc(id) AS (VALUES(?) UNION "
+                         "SELECT m.incident_id FROM incident_merges m "
+                         "JOIN inc ON m.merged_into = inc.id) SELECT id FROM inc)")
+            params.append(incident_id)
+        if cursor:
+            ts, alert_id = parse_cursor(cursor)
+            where.append("(a.ts < ? OR (a.ts = ? AND a.alert_id < ?))")
+            params.extend((ts, ts, alert_id))
+
+        sql = "SELECT a.ts, a.alert_id, a.doc FROM alerts a"
+        if entity:
+            sql += " JOIN alert_entities e ON e.alert_id = a.alert_id"
+            where.append("e.kind = ? AND e.value = ?")
+            params.extend(entity)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY a.ts DESC, a.alert_id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            ts, alert_id, _ = rows[-1]
+            next_cursor = f"{ts!r}:{alert_id}"
+        return [bytes(doc) for _, _, doc in rows], next_cursor
+
+    def iter_query(self, **filters) -> Iterator[bytes]:
+        """Itera todas las páginas de una consulta."""
+        cursor = None
+        while True:
+            docs, cursor = self.query(cursor=cursor, **filters)
+            yield from docs
+            if cursor is None:
+                return
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM alerts").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1 @@
+"""Benchmarks de Vigil. Ejecutar con: python -m vigil.bench.<nombre>"""
@@ -0,0 +1,91 @@
+"""Benchmark: alertas enriquecidas por minuto, prompts individuales vs batch.
+
+Simula una ráfaga de alertas MEDIUM distintas contra el stub de Ollama,
+respetando rate_limit entre llamadas. El costo de generación del stub
+escala con los tokens de la respuesta (latencia base + demora por
+palabra), así que un batch no es gratis: ahorra la espera del rate limit
+y la latencia fija por llamada.
+
+Uso: python -m vigil.bench.batching [-n 30] [--rate-limit 2.0] [--batch-size 8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import re
+import time
+
+from ..core.config import OllamaConfig
+from ..core.events import Alert, SecurityEvent, Severity
+from ..intelligence.analyzer import OllamaAnalyzer
+from .stub_ollama import StubOllama
+
+_SENTENCE = ("El proceso abrió un puerto de escucha que no estaba antes y no figura "
+             "en la lista de confianza; si no lo reconocés, revisá su origen. ")
+
+
+def _respond(prompt: str) -> str:
+    """Respuesta del stub: una entrada [n] por alerta del prompt."""
+    items = re.findall(r"^\[(\d+)\]", prompt, re.MULTILINE)
+    if not items:
+        return _SENTENCE
+    return "\n".join(f"[{i}] {_SENTENCE}" for i in items)
+
+
+def _burst(n: int) -> list[Alert]:
+    return [
+        Alert(
+            rule_id="NET001",
+            severity=Severity.MEDIUM,
+            title=f"Nuevo listener: app{i}.exe en puerto {20000 + i}",
+            description=f"El proceso app{i}.exe abrió el puerto {20000 + i}/TCP",
+            event=SecurityEvent(source="network", event_type="new_listener", data={
+                "proto": "TCP", "local_addr": "0.0.0.0", "local_port": 20000 + i,
+                "pid": 4000 + i, "process": f"app{i}.exe", "state": "LISTENING", "trusted": False,
+            }),
+        )
+        for i in range(n)
+    ]
+
+
+async def _run(url: str, n: int, rate_limit: float, batch_size: int, window: float) -> tuple[float, int, dict]:
+    config = OllamaConfig(url=url, rate_limit=rate_limit, stream=False, cache_path="",
+                          batch_size=batch_size, batch_window=window)
+    analyzer = OllamaAnalyzer(config)
+    try:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(analyzer.analyze(a) for a in _burst(n)))
+        elapsed = time.perf_counter() - start
+        stats = analyzer.batcher.get_stats() if analyzer.batcher else {}
+    finally:
+        await analyzer.aclose()
+    return elapsed, sum(1 for r in results if r), stats
+
+
+async def _main(args: argparse.Namespace) -> None:
+    async with StubOllama(latency=args.latency, token_delay=args.token_delay, response=_respond) as stub:
+        print(f"Ráfaga de {args.n} alertas, rate_limit {args.rate_limit}s, "
+              f"latencia stub {args.latency}s + {args.token_delay * 1000:.0f} ms/palabra")
+        for label, size in (("individual", 1), (f"batch x{args.batch_size}", args.batch_size)):
+            before = stub.requests
+            elapsed, ok, stats = await _run(stub.url, args.n, args.rate_limit, size, args.window)
+            calls = stub.requests - before
+            extra = f", fallbacks {stats['fallbacks']}" if stats else ""
+            print(f"  {label:<12} {elapsed:6.1f}s  {ok / elapsed * 60:7.1f} alertas/min  "
+                  f"({ok}/{args.n} enriquecidas, {calls} llamadas{extra})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=30, help="alertas en la ráfaga")
+    parser.add_argument("--rate-limit", type=float, default=2.0, help="segundos entre llamadas")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--window", type=float, default=0.5, help="ventana de batching (s)")
+    parser.add_argument("--latency", type=float, default=0.5, help="latencia fija por llamada (s)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="segundos por palabra")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
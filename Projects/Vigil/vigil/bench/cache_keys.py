@@ -0,0 +1,154 @@
+"""Benchmark: hit rate del cache LLM con keys crudas vs normalizadas.
+
+Re-ejecuta un corpus de alertas (alerts.jsonl real o uno sintético) contra
+un cache con TTL, comparando la key anterior (todos los campos de
+event.data tal cual) con las keys por template de las reglas.
+
+Uso: python -m vigil.bench.cache_keys [--corpus alerts.jsonl] [--rules path] [--ttl 600]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from ..core.rule_engine import RuleEngine
+from ..intelligence.cache_keys import CacheKeyBuilder
+
+_DEFAULT_RULES = Path(__file__).resolve().parent.parent / "rules" / "default_rules.yaml"
+
+
+def _legacy_key(rule_id: str, data: dict) -> str:
+    """Key anterior: rule_id + todos los campos sin normalizar."""
+    parts = [rule_id]
+    for k in sorted(data):
+        parts.append(f"{k}:{data[k]}")
+    return "|".join(parts)
+
+
+def _synthetic(n: int, seed: int = 7) -> list[tuple[float, str, dict]]:
+    """Corpus con la forma de los monitors: mismas situaciones, datos volátiles."""
+    rng = random.Random(seed)
+    users = ["ana", "bruno", "carla"]
+    dev = ["node.exe", "python.exe", "java.exe", "ruby.exe"]
+    scripts = [
+        "Get-ChildItem $env:TEMP | Remove-Item -Force",
+        "Invoke-WebRequest -Uri http://example.com/a.ps1 -OutFile a.ps1",
+        "Get-Process | Sort-Object CPU -Descending | Select -First 5",
+    ]
+    corpus = []
+    ts = 1_700_000_000.0
+    for _ in range(n):
+        ts += rng.expovariate(1 / 20)
+        kind = rng.random()
+        if kind < 0.45:
+            proc = rng.choice(dev)
+            port = rng.choice([3000, 3001, 5173, 8000, 8080, 5000, rng.randint(10000, 40000)])
+            corpus.append((ts, "NET001", {
+                "proto": "TCP", "local_addr": rng.choice(["0.0.0.0", "127.0.0.1", "[::]"]),
+                "local_port": port, "pid": rng.randint(1000, 60000), "process": proc,
+                "state": "LISTENING", "trusted": False,
+            }))
+        elif kind < 0.60:
+            user = rng.choice(users)
+            name = f"tmp{rng.randint(0, 0xFFFF):04x}.exe"
+            corpus.append((ts, "PROC002", {
+                "process": name, "pid": rng.randint(1000, 60000),
+                "path": f"C:\\Users\\{user}\\AppData\\Local\\Temp\\{name}", "reason": "temp_path",
+            }))
+        elif kind < 0.80:
+            corpus.append((ts, "EVT001", {
+                "event_id": 4625, "channel": "Security", "source_name": "Microsoft-Windows-Security-Auditing",
+                "time_generated": datetime.fromtimestamp(ts).isoformat(),
+                "target_user": rng.choice(users + ["Administrator"]), "workstation": "DESKTOP-1",
+                "ip_address": f"192.168.1.{rng.randint(2, 254)}", "logon_type": rng.choice(["3", "10"]),
+            }))
+        elif kind < 0.95:
+            script = rng.choice(scripts)
+            if rng.random() < 0.5:
+                script = "  " + script.replace(" ", "   ") + "\r\n"
+            corpus.append((ts, "EVT004", {
+                "event_id": 4104, "channel": "Microsoft-Windows-PowerShell/Operational",
+                "source_name": "Microsoft-Windows-PowerShell",
+                "time_generated": datetime.fromtimestamp(ts).isoformat(),
+                "script_block": script, "script_path": "",
+            }))
+        else:
+            ports = sorted(rng.sample(range(1, 1024), rng.randint(21, 60)))
+            corpus.append((ts, "SCAN001", {
+                "remote_ip": f"203.0.113.{rng.randint(1, 254)}", "unique_ports": len(ports),
+                "window_seconds": 120, "sample_ports": ports[:20],
+            }))
+    return corpus
+
+
+def _load_corpus(path: str) -> list[tuple[float, str, dict]]:
+    corpus = []
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                doc = json.loads(line)
+                ts = datetime.fromisoformat(doc["timestamp"]).timestamp()
+                data = (doc.get("event") or {}).get("data") or {}
+                corpus.append((ts, doc["rule_id"], data))
+            except (ValueError, KeyError, TypeError):
+                continue
+    corpus.sort(key=lambda item: item[0])
+    return corpus
+
+
+def _replay(corpus, key_fn, ttl: float) -> tuple[int, int]:
+    """Simula el cache: miss → se genera y guarda; hit si la key vive en TTL."""
+    cache: dict[str, float] = {}
+    hits = 0
+    for ts, rule_id, data in corpus:
+        key = key_fn(rule_id, data)
+        stored = cache.get(key)
+        if stored is not None and ts - stored <= ttl:
+            hits += 1
+        else:
+            cache[key] = ts
+    return hits, len(cache)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="alerts.jsonl a re-ejecutar (default: sintético)")
+    parser.add_argument("-n", type=int, default=5000, help="alertas del corpus sintético")
+    parser.add_argument("--rules", default=str(_DEFAULT_RULES), help="YAML de reglas con templates")
+    parser.add_argument("--ttl", type=float, default=600, help="TTL del cache simulado (s)")
+    args = parser.parse_args()
+
+    corpus = _load_corpus(args.corpus) if args.corpus else _synthetic(args.n)
+    if not corpus:
+        print("Corpus vacío")
+        return
+
+    rules = RuleEngine()
+    rules.load_rules(args.rules)
+    builder = CacheKeyBuilder(rules.cache_key_templates())
+
+    total = len(corpus)
+    by_rule = Counter(rule_id for _, rule_id, _ in corpus)
+    print(f"Corpus: {total} alertas ({'archivo' if args.corpus else 'sintético'}), TTL {args.ttl:.0f}s")
+    print(f"  {'':<12}{'hits':>8}{'hit rate':>10}{'keys':>8}")
+    for label, fn in (("crudas", _legacy_key), ("template", builder.key)):
+        hits, keys = _replay(corpus, fn, args.ttl)
+        print(f"  {label:<12}{hits:>8}{hits / total:>10.1%}{keys:>8}")
+
+    print("\n  Por regla (crudas → template):")
+    for rule_id, count in by_rule.most_common():
+        subset = [item for item in corpus if item[1] == rule_id]
+        legacy, _ = _replay(subset, _legacy_key, args.ttl)
+        templated, _ = _replay(subset, builder.key, args.ttl)
+        print(f"  {rule_id:<10}{count:>6}  {legacy / count:>6.1%} → {templated / count:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark: generaciones duplicadas evitadas por single-flight.
+
+Re-ejecuta el corpus sintético de bench.cache_keys en ráfagas: las
+alertas de cada ráfaga llegan juntas al analizador (como desde las tasks
+de enriquecimiento del pipeline), así que varias con la misma key están
+en vuelo a la vez antes de que la primera llegue al cache.
+
+Uso: python -m vigil.bench.coalescing [-n 600] [--burst 20] [--latency 0.2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from ..core.config import OllamaConfig
+from ..core.events import Alert, SecurityEvent, Severity
+from ..core.rule_engine import RuleEngine
+from ..intelligence.analyzer import OllamaAnalyzer
+from .cache_keys import _DEFAULT_RULES, _synthetic
+from .stub_ollama import StubOllama
+
+
+def _alerts(n: int) -> list[Alert]:
+    return [
+        Alert(rule_id=rule_id, severity=Severity.MEDIUM, title=rule_id, description="",
+              event=SecurityEvent(source="bench", event_type="bench", data=data))
+        for _, rule_id, data in _synthetic(n)
+    ]
+
+
+async def _main(args: argparse.Namespace) -> None:
+    rules = RuleEngine()
+    rules.load_rules(_DEFAULT_RULES)
+    alerts = _alerts(args.n)
+
+    async with StubOllama(latency=args.latency) as stub:
+        config = OllamaConfig(url=stub.url, rate_limit=0, stream=False, cache_path="",
+                              min_severity="LOW", max_concurrency=4)
+        analyzer = OllamaAnalyzer(config, key_templates=rules.cache_key_templates())
+        try:
+            start = time.perf_counter()
+            for i in range(0, len(alerts), args.burst):
+                burst = alerts[i:i + args.burst]
+                await asyncio.gather(*(analyzer.analyze(a) for a in burst))
+            elapsed = time.perf_counter() - start
+            stats = analyzer.cache_stats()
+        finally:
+            await analyzer.aclose()
+
+    hits = stats["memory"]["hits"]
+    print(f"Corpus: {len(alerts)} alertas en ráfagas de {args.burst}, latencia stub {args.latency}s")
+    print(f"  generaciones al LLM:      {stub.requests}")
+    print(f"  coalescidas (evitadas):   {stats['coalesced']}")
+    print(f"  hits de cache:            {hits}")
+    print(f"  sin single-flight:        {stub.requests + stats['coalesced']} generaciones")
+    print(f"  tiempo total:             {elapsed:.1f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=600, help="alertas del corpus sintético")
+    parser.add_argument("--burst", type=int, default=20, help="alertas concurrentes por ráfaga")
+    parser.add_argument("--latency", type=float, default=0.2, help="latencia del stub (s)")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
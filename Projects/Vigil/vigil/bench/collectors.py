@@ -0,0 +1,106 @@
+"""Benchmark: backend procfs contra el camino por subproceso (Linux).
+
+Mide cuánto cuesta obtener la tabla de conexiones y la lista de procesos:
+- subproceso: lanzar `ss -tanup` / `ps` y leer su salida (sin parsear,
+  cota inferior del camino tipo netstat/tasklist)
+- procfs frío: collector nuevo, escaneo completo de /proc/<pid>/fd
+- procfs incremental: mismo collector entre consultas (sólo PIDs nuevos),
+  con filas por sock_diag y, para comparar, leyendo el texto de /proc/net
+
+Para agrandar la tabla abre --sockets conexiones TCP por loopback y lanza
+--children procesos hijos que quedan dormidos durante la medición.
+
+Uso: python -m vigil.bench.collectors [-n 20] [--sockets 2000] [--children 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+from ..monitors.procfs import ProcFSCollector
+
+
+def _open_sockets(n: int) -> list[socket.socket]:
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(n)
+    socks = [server]
+    for _ in range(n):
+        client = socket.create_connection(server.getsockname())
+        conn, _ = server.accept()
+        socks += [client, conn]
+    return socks
+
+
+async def _timed(label: str, rounds: int, call) -> None:
+    start = time.perf_counter()
+    result = None
+    for _ in range(rounds):
+        result = await call()
+    elapsed = (time.perf_counter() - start) / rounds
+    rows = len(result) if hasattr(result, "__len__") else "-"
+    print(f"  {label:<30}{elapsed * 1000:8.2f} ms/consulta   filas {rows}")
+
+
+async def _spawn(argv: list[str]) -> list[bytes]:
+    proc = await asyncio.create_subprocess_exec(*argv, stdout=asyncio.subprocess.PIPE,
+                                                stderr=asyncio.subprocess.DEVNULL)
+    stdout, _ = await proc.communicate()
+    return stdout.splitlines()
+
+
+async def _main(args: argparse.Namespace) -> None:
+    socks = _open_sockets(args.sockets)
+    children = [subprocess.Popen(["sleep", "600"]) for _ in range(args.children)]
+    try:
+        print(f"{args.sockets * 2 + 1} sockets propios, {args.children} hijos, "
+              f"{args.n} consultas por variante")
+        print("Conexiones:")
+        ss = [shutil.which("ss"), "-tanup"] if shutil.which("ss") else \
+            [shutil.which("netstat") or "netstat", "-tanup"]
+        await _timed(f"subproceso ({os.path.basename(ss[0])})", args.n, lambda: _spawn(ss))
+        await _timed("procfs frío", args.n, lambda: ProcFSCollector().connections())
+        warm = ProcFSCollector()
+        await warm.connections()
+        await _timed("procfs incremental", args.n, warm.connections)
+        text = ProcFSCollector(netlink=False)
+        await text.connections()
+        await _timed("procfs incremental (/proc/net)", args.n, text.connections)
+        stats = warm.get_stats()
+        print(f"    filas: {stats['source']}  fds leídos: {stats['fd_links']}  rescans completos: {stats['full_rescans']}  "
+              f"sin dueño: {stats['unresolved']}")
+
+        print("Procesos:")
+        await _timed("subproceso (ps)", args.n,
+                     lambda: _spawn(["ps", "-eo", "pid,comm,sess,rss"]))
+        await _timed("procfs", args.n, warm.processes)
+        await _timed("procfs paths", args.n, warm.process_paths)
+    finally:
+        for child in children:
+            child.kill()
+            child.wait()
+        for sock in socks:
+            sock.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=20, help="consultas por variante")
+    parser.add_argument("--sockets", type=int, default=2000, help="conexiones TCP por loopback")
+    parser.add_argument("--children", type=int, default=200, help="procesos hijos dormidos")
+    args = parser.parse_args()
+    if not sys.platform.startswith("linux"):
+        print("Este benchmark necesita Linux (/proc)")
+        return
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Benchmark: histogramas de estados TCP y detección de picos con ConnStateDetector.
+
+1. Costo: una pasada de ConnectionTable.state_histograms() sobre una tabla
+   de --rows conexiones, comparada con los recorridos que ya hacen los
+   monitors (listeners() y with_state("ESTABLISHED")).
+2. Detección: --polls snapshots con ruido de fondo (TIME_WAIT y
+   SYN_RECEIVED variables, conexiones establecidas que van y vienen) y
+   tres ataques inyectados en polls conocidos:
+   - SYN flood distribuido al puerto 443 (muchas IPs, pocas conexiones c/u)
+   - una IP que deja conexiones half-open contra el puerto 22
+   - fuga de CLOSE_WAIT en el puerto 8080 que crece de a poco
+   Reporta en qué poll alertó cada uno y los falsos positivos.
+
+Uso: python -m vigil.bench.connstate [--rows 100000] [--polls 200] [--seed 1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from ..monitors.connections import ConnectionTable
+from ..monitors.connstate import ConnStateDetector
+from ..monitors.parsers import Connection
+
+_LOCAL = "192.168.1.10"
+_ATTACK_STATES = {"flood": "SYN_RECEIVED", "burst": "SYN_RECEIVED", "leak": "CLOSE_WAIT"}
+
+
+def _ip(prefix: int, i: int) -> str:
+    return f"{prefix}.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+
+def _conn(state: str, lport: int, remote: str, rport: int) -> Connection:
+    return Connection("TCP", _LOCAL, lport, remote, rport, state, 1234)
+
+
+def _background(rng: random.Random, rows: int) -> list[Connection]:
+    """Tráfico normal: establecidas, TIME_WAIT de clientes cortos y algún half-open."""
+    conns = [_conn("LISTENING", p, "0.0.0.0", 0) for p in (22, 80, 443, 8080)]
+    for i in range(rows):
+        conns.append(_conn("ESTABLISHED", rng.choice((443, 443, 80, 22)),
+                           _ip(10, rng.randrange(200000)), 50000 + i % 15000))
+    for i in range(int(rng.gauss(300, 30))):
+        conns.append(_conn("TIME_WAIT", rng.choice((443, 80)), _ip(10, rng.randrange(200000)),
+                           50000 + i))
+    for i in range(rng.randint(0, 4)):
+        conns.append(_conn("SYN_RECEIVED", 443, _ip(10, rng.randrange(200000)), 40000 + i))
+    for i in range(rng.randint(0, 3)):
+        conns.append(_conn("CLOSE_WAIT", 8080, _ip(10, rng.randrange(200000)), 41000 + i))
+    for i in range(rng.randint(0, 3)):
+        conns.append(_conn("SYN_SENT", 50000 + i, _ip(52, rng.randrange(1000)), 443))
+    return conns
+
+
+def _cost(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    table = ConnectionTable(_background(rng, args.rows), 0.0)
+    n = 20
+    start = time.perf_counter()
+    for _ in range(n):
+        table.listeners()
+        table.with_state("ESTABLISHED")
+    existing = (time.perf_counter() - start) / n
+    start = time.perf_counter()
+    for _ in range(n):
+        table._histograms = None
+        table.state_histograms()
+    hist = (time.perf_counter() - start) / n
+    print(f"Costo por snapshot ({len(table)} filas):")
+    print(f"  listeners + ESTABLISHED (existente) {existing * 1000:7.1f} ms")
+    print(f"  state_histograms (una pasada)       {hist * 1000:7.1f} ms  "
+          f"(cacheado en la tabla para los demás consumidores)")
+
+
+def _detection(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    detector = ConnStateDetector()
+    flood_at, burst_at, leak_from = args.polls // 2, args.polls // 2 + 20, args.polls // 2 + 40
+    attacks = {"flood": ("port_state_spike", 443, flood_at),
+               "burst": ("remote_state_spike", "203.0.113.9", burst_at),
+               "leak": ("port_state_spike", 8080, leak_from)}
+    detected: dict[str, int] = {}
+    false_positives: list[tuple[int, str, dict]] = []
+    rows = max(args.rows // 20, 1000)
+
+    for poll in range(args.polls):
+        conns = _background(rng, rows)
+        if flood_at <= poll < flood_at + 5:
+            conns += [_conn("SYN_RECEIVED", 443, _ip(45, rng.randrange(1 << 20)), 1024 + k)
+                      for k in range(400)]
+        if burst_at <= poll < burst_at + 3:
+            conns += [_conn("SYN_RECEIVED", 22, "203.0.113.9", 30000 + k) for k in range(25)]
+        if poll >= leak_from:
+            conns += [_conn("CLOSE_WAIT", 8080, _ip(10, k), 42000 + k)
+                      for k in range(3 * (poll - leak_from))]
+        table = ConnectionTable(conns, float(poll))
+        hist = table.state_histograms()
+        if poll == 0:
+            detector.prime(hist)
+            continue
+        for event_type, data in detector.update(hist):
+            key = data.get("local_port", data.get("remote_ip"))
+            name = next((n for n, (et, k, _) in attacks.items()
+                         if et == event_type and k == key), None)
+            if name is None and event_type == "state_spike":
+                # El mismo ataque también mueve el total del estado
+                name = next((f"{n} (total)" for n, (_, _, at) in attacks.items()
+                             if poll >= at and data["state"] == _ATTACK_STATES[n]), None)
+            if name is None and key == 22 and poll in range(burst_at, burst_at + 3):
+                name = "burst (puerto 22)"
+            if name is None:
+                false_positives.append((poll, event_type, data))
+            else:
+                detected.setdefault(name, poll)
+
+    print(f"Detección ({args.polls} polls, {rows} filas de fondo):")
+    for name, (_, key, at) in attacks.items():
+        found = detected.get(name)
+        lag = f"poll {found} (+{found - at})" if found is not None else "NO detectado"
+        print(f"  {name:<6} {str(key):<14} desde poll {at:<4} -> {lag}")
+    for extra in sorted(set(detected) - set(attacks)):
+        print(f"  también {extra}: poll {detected[extra]}")
+    print(f"  falsos positivos: {len(false_positives)}")
+    for poll, event_type, data in false_positives[:5]:
+        print(f"    poll {poll}: {event_type} {data}")
+    print(f"  estado: {detector.get_stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="conexiones establecidas")
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    _cost(args)
+    _detection(args)
+
+
+if __name__ == "__main__":
+    main()
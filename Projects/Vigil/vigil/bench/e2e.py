@@ -0,0 +1,181 @@
+"""Benchmark end-to-end: AlertPipeline + OllamaAnalyzer contra el stub.
+
+Re-ejecuta un corpus de alertas (alerts.jsonl grabado o el sintético de
+bench.cache_keys) por el pipeline real, con el analizador apuntando a
+StubOllama, y reporta alertas enriquecidas por minuto, latencia de
+enriquecimiento p50/p99 y hit rate del cache. Sirve para comparar cambios
+de cache o scheduling con los mismos parámetros:
+
+    python -m vigil.bench.e2e --latency lognormal:0.8,0.4 --error-rate 0.02
+    python -m vigil.bench.e2e --batch-size 8 --max-concurrency 4
+
+El corpus se reproduce comprimido en el tiempo (--speed). Dedup, throttle
+e incidentes usan el reloj real, así que por defecto se desactivan para
+que cada alerta llegue al analizador; --pipeline-defaults los restaura.
+
+Uso: python -m vigil.bench.e2e [--corpus alerts.jsonl] [-n 1000] [--speed 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from ..alerts.pipeline import AlertPipeline
+from ..core.config import AlertConfig, OllamaConfig
+from ..core.events import Alert, SecurityEvent, Severity
+from ..core.rule_engine import RuleEngine
+from ..intelligence.analyzer import OllamaAnalyzer
+from ..intelligence.explanations import ExplanationTemplates, explanations_path
+from .cache_keys import _DEFAULT_RULES, _load_corpus, _synthetic
+from .stub_ollama import StubOllama
+
+
+class _TimedEnricher:
+    """Envuelve al analizador midiendo la latencia de cada enriquecimiento."""
+
+    def __init__(self, analyzer: OllamaAnalyzer):
+        self.analyzer = analyzer
+        self.latencies: list[float] = []
+        self.enriched = 0
+        self.failed = 0
+
+    async def analyze(self, alert: Alert, on_partial=None) -> str | None:
+        start = time.perf_counter()
+        result = await self.analyzer.analyze(alert, on_partial=on_partial)
+        self.latencies.append(time.perf_counter() - start)
+        if result:
+            self.enriched += 1
+        else:
+            self.failed += 1
+        return result
+
+
+def _build_alerts(corpus, rules: RuleEngine) -> list[tuple[float, Alert]]:
+    """Reconstruye alertas con la severidad y textos de su regla."""
+    by_id = {rule.id: rule for rule in rules.rules}
+    alerts = []
+    for ts, rule_id, data in corpus:
+        rule = by_id.get(rule_id)
+        if rule is not None:
+            event = SecurityEvent(source=rule.source, event_type=rule.event_type, data=data)
+            alert = rule.create_alert(event)
+        else:
+            event = SecurityEvent(source="bench", event_type="bench", data=data)
+            alert = Alert(rule_id=rule_id, severity=Severity.MEDIUM, title=rule_id,
+                          description="", event=event)
+        alerts.append((ts, alert))
+    return alerts
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def _main(args: argparse.Namespace) -> None:
+    rules = RuleEngine()
+    rules.load_rules(args.rules)
+    corpus = _load_corpus(args.corpus) if args.corpus else _synthetic(args.n)
+    if not corpus:
+        print("Corpus vacío")
+        return
+    alerts = _build_alerts(corpus, rules)
+
+    tmp = tempfile.TemporaryDirectory()
+    alert_config = AlertConfig(log_file=str(Path(tmp.name) / "alerts.jsonl"), store_path="",
+                               toast_enabled=False)
+    if not args.pipeline_defaults:
+        alert_config.dedup_window = 0
+        alert_config.throttle_per_rule = 0
+        alert_config.incident_window = 0
+
+    async with StubOllama(latency=args.latency, token_rate=args.token_rate,
+                          error_rate=args.error_rate, seed=args.seed) as stub:
+        config = OllamaConfig(
+            url=stub.url, rate_limit=args.rate_limit, burst=args.burst,
+            max_concurrency=args.max_concurrency, min_severity=args.min_severity,
+            stream=False, cache_path="", batch_size=args.batch_size,
+            semantic_cache=args.semantic, breaker_failures=10**9,
+        )
+        explanations = None
+        if args.explanations:
+            explanations = ExplanationTemplates.load(explanations_path(args.rules), rules.rules)
+        analyzer = OllamaAnalyzer(config, key_templates=rules.cache_key_templates(),
+                                  explanations=explanations)
+        enricher = _TimedEnricher(analyzer)
+        pipeline = AlertPipeline(alert_config, enricher=enricher)
+        await pipeline.start()
+
+        emitted = 0
+        start = time.perf_counter()
+        previous = alerts[0][0]
+        try:
+            for ts, alert in alerts:
+                gap = (ts - previous) / args.speed
+                previous = ts
+                if gap > 0:
+                    await asyncio.sleep(gap)
+                if await pipeline.process(alert):
+                    emitted += 1
+            await pipeline.stop(timeout=args.drain)
+            elapsed = time.perf_counter() - start
+            cache = analyzer.cache_stats()
+            scheduler = analyzer.scheduler.get_stats()
+        finally:
+            await analyzer.aclose()
+            tmp.cleanup()
+
+    total = len(alerts)
+    lat = enricher.latencies
+    print(f"Corpus: {total} alertas ({'archivo' if args.corpus else 'sintético'}), "
+          f"speed x{args.speed:g}, stub latency={args.latency} error_rate={args.error_rate}")
+    print(f"  emitidas por el pipeline:  {emitted}")
+    print(f"  enriquecidas:              {enricher.enriched}  (sin explicación: {enricher.failed})")
+    print(f"  enriquecidas/min:          {enricher.enriched / elapsed * 60:.1f}")
+    print(f"  latencia p50 / p99:        {_percentile(lat, 0.5) * 1000:.0f} ms / "
+          f"{_percentile(lat, 0.99) * 1000:.0f} ms")
+    print(f"  hit rate del cache:        {cache['hit_rate']:.1%}  "
+          f"(coalescidas {cache['coalesced']}, precomputadas {cache['templated']}, "
+          f"generaciones {cache['generations']})")
+    print(f"  requests al stub:          {stub.requests} generate/tags, "
+          f"{stub.embeddings} embeddings, {stub.errors} errores")
+    print(f"  scheduler:                 espera p95 {scheduler['wait_p95_ms']} ms, "
+          f"descartadas {scheduler['dropped_deadline'] + scheduler['dropped_full']}")
+    print(f"  tiempo total:              {elapsed:.1f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="alerts.jsonl grabado (default: sintético)")
+    parser.add_argument("-n", type=int, default=1000, help="alertas del corpus sintético")
+    parser.add_argument("--rules", default=str(_DEFAULT_RULES), help="YAML de reglas")
+    parser.add_argument("--speed", type=float, default=200, help="factor de compresión temporal")
+    parser.add_argument("--drain", type=float, default=120, help="espera máxima al final (s)")
+    parser.add_argument("--pipeline-defaults", action="store_true",
+                        help="usar dedup/throttle/incidentes por defecto")
+    stub = parser.add_argument_group("stub")
+    stub.add_argument("--latency", default="lognormal:0.5,0.4",
+                      help="segundos o distribución: uniform:a,b | lognormal:mediana,sigma | exp:media")
+    stub.add_argument("--token-rate", type=float, default=0.0, help="tokens/s (0 = instantáneo)")
+    stub.add_argument("--error-rate", type=float, default=0.0, help="fracción de requests con 500")
+    stub.add_argument("--seed", type=int, default=1)
+    llm = parser.add_argument_group("analizador")
+    llm.add_argument("--min-severity", default="LOW")
+    llm.add_argument("--rate-limit", type=float, default=0.0, help="segundos entre llamadas")
+    llm.add_argument("--burst", type=int, default=1)
+    llm.add_argument("--max-concurrency", type=int, default=2)
+    llm.add_argument("--batch-size", type=int, default=1)
+    llm.add_argument("--semantic", action="store_true", help="activar cache semántico")
+    llm.add_argument("--explanations", action="store_true",
+                     help="usar <reglas>.explanations.yaml (explain-rules)")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
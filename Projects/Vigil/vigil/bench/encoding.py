@@ -0,0 +1,91 @@
+"""Benchmark: costo de serialización por alerta emitida.
+
+Compara el camino anterior (to_dict() + json.dumps en cada consumidor)
+contra to_json() cacheado compartido por log, dashboard y sinks.
+
+Uso: python -m vigil.bench.encoding [-n 20000] [--consumers 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from ..core.encoding import BACKEND, envelope
+from ..core.events import Alert, SecurityEvent, Severity
+
+
+def _make_alert(i: int) -> Alert:
+    event = SecurityEvent(
+        source="network",
+        event_type="new_listener",
+        data={
+            "proto": "TCP",
+            "local_addr": "0.0.0.0",
+            "local_port": 4444,
+            "pid": 1000 + i,
+            "process": "nc.exe",
+            "state": "LISTENING",
+            "trusted": False,
+        },
+    )
+    return Alert(
+        rule_id="NET002",
+        severity=Severity.HIGH,
+        title="Puerto sospechoso: 4444 (nc.exe)",
+        description="El puerto 4444 es conocido por uso malicioso. Proceso: nc.exe PID 1000",
+        event=event,
+        llm_explanation="Un proceso abrió un puerto asociado a shells reversas. " * 3,
+    )
+
+
+def _legacy(alerts: list[Alert], consumers: int) -> None:
+    for alert in alerts:
+        # Evento rearmado y codificado por el dashboard
+        ev = alert.event
+        json.dumps({"type": "event", "data": {
+            "source": ev.source, "event_type": ev.event_type, "data": ev.data,
+            "timestamp": ev.timestamp.isoformat(), "event_id": ev.event_id,
+        }})
+        # Log JSONL + broadcast del dashboard + sinks extra
+        json.dumps(alert.to_dict(), ensure_ascii=False)
+        json.dumps({"type": "alert", "data": alert.to_dict()})
+        for _ in range(consumers - 2):
+            json.dumps(alert.to_dict(), ensure_ascii=False)
+
+
+def _cached(alerts: list[Alert], consumers: int) -> None:
+    for alert in alerts:
+        envelope("event", alert.event.to_json())
+        alert.to_json() + b"\n"
+        envelope("alert", alert.to_json())
+        for _ in range(consumers - 2):
+            alert.to_json()
+
+
+def _run(fn, n: int, consumers: int) -> float:
+    alerts = [_make_alert(i) for i in range(n)]
+    start = time.perf_counter()
+    fn(alerts, consumers)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=20000, help="alertas a codificar")
+    parser.add_argument("--consumers", type=int, default=3,
+                        help="consumidores por alerta (log + dashboard + sinks)")
+    args = parser.parse_args()
+    consumers = max(args.consumers, 2)
+
+    legacy = _run(_legacy, args.n, consumers)
+    cached = _run(_cached, args.n, consumers)
+    print(f"backend:  {BACKEND}")
+    print(f"alertas:  {args.n}  consumidores: {consumers}")
+    print(f"legacy:   {legacy:8.2f} µs/alerta")
+    print(f"cacheado: {cached:8.2f} µs/alerta  ({legacy / cached:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
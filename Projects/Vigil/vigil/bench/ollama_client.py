@@ -0,0 +1,73 @@
+"""Benchmark: overhead por request de OllamaClient contra un stub local.
+
+Compara un httpx.AsyncClient nuevo por llamada (comportamiento anterior)
+contra el cliente persistente con pool y keep-alive.
+
+Uso: python -m vigil.bench.ollama_client [-n 300]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from ..core.config import OllamaConfig
+from ..intelligence.ollama import OllamaClient
+from .stub_ollama import StubOllama
+
+
+async def _per_call_client(config: OllamaConfig, n: int) -> float:
+    """Un AsyncClient por request, como antes del pool."""
+    start = time.perf_counter()
+    for _ in range(n):
+        async with httpx.AsyncClient() as client:
+            resp = await client.post(
+                f"{config.url}/api/generate",
+                json={"model": config.model, "prompt": "x", "stream": False},
+                timeout=config.timeout,
+            )
+            resp.json()
+    return (time.perf_counter() - start) / n * 1000
+
+
+async def _pooled_client(config: OllamaConfig, n: int) -> float:
+    client = OllamaClient(config)
+    try:
+        start = time.perf_counter()
+        for _ in range(n):
+            await client.generate("x")
+        return (time.perf_counter() - start) / n * 1000
+    finally:
+        await client.aclose()
+
+
+async def _main(n: int) -> None:
+    async with StubOllama() as stub:
+        config = OllamaConfig(url=stub.url, rate_limit=0)
+
+        base = stub.connections
+        per_call = await _per_call_client(config, n)
+        per_call_conns = stub.connections - base
+
+        base = stub.connections
+        pooled = await _pooled_client(config, n)
+        pooled_conns = stub.connections - base
+
+    print(f"requests:           {n}")
+    print(f"cliente por call:   {per_call:7.3f} ms/request  ({per_call_conns} conexiones)")
+    print(f"cliente persistente:{pooled:7.3f} ms/request  ({pooled_conns} conexiones)")
+    print(f"overhead eliminado: {per_call - pooled:7.3f} ms/request")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=300, help="requests por variante")
+    args = parser.parse_args()
+    asyncio.run(_main(args.n))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Benchmark: costo por fila de los parsers de netstat, tasklist y wmic.
+
+Compara el parseo anterior (decode de toda la salida + splitlines + split
+por línea, dicts por proceso) contra los parsers de monitors.parsers sobre
+los bytes crudos, en µs por fila y memoria retenida por fila.
+Por defecto genera salidas sintéticas grandes (50k filas de netstat con
+IPv4, IPv6, UDP y todos los estados, IPs remotas todas distintas; con
+--remotes N salen de un pool de N, como en una tabla real); también
+acepta salidas capturadas en una máquina real:
+
+    netstat -ano > netstat.txt
+    tasklist /FO CSV /NH > tasklist.csv
+    wmic process get ProcessId,ExecutablePath /format:csv > wmic.csv
+
+Uso: python -m vigil.bench.parsers [--rows 50000] [--remotes 0] [--netstat netstat.txt]
+     [--tasklist tasklist.csv] [--wmic wmic.csv] [--repeat 9]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+from ..monitors.parsers import (
+    Connection, iter_tasklist, iter_wmic_paths, parse_netstat,
+)
+
+_STATES = ["ESTABLISHED"] * 6 + ["LISTENING", "TIME_WAIT", "TIME_WAIT", "CLOSE_WAIT",
+                                 "SYN_SENT", "FIN_WAIT_2", "LAST_ACK"]
+
+
+def _synthetic_netstat(rows: int, rng: random.Random, remotes: int = 0) -> bytes:
+    """netstat sintético; con remotes > 0 las IPv4 remotas salen de ese pool."""
+    pool = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}."
+            f"{rng.randint(1, 254)}" for _ in range(remotes)]
+    lines = ["", "Active Connections", "",
+             "  Proto  Local Address          Foreign Address        State           PID"]
+    for _ in range(rows):
+        kind = rng.random()
+        pid = rng.randint(4, 30000)
+        if kind < 0.15:
+            local = f"0.0.0.0:{rng.randint(1, 65535)}"
+            lines.append(f"  UDP    {local:<23}*:*                                    {pid}")
+            continue
+        state = rng.choice(_STATES)
+        if kind < 0.3:
+            local = f"[::]:{rng.randint(1, 65535)}"
+            remote = f"[2001:db8::{rng.randint(1, 0xffff):x}]:{rng.randint(1, 65535)}"
+        else:
+            local = f"192.168.1.{rng.randint(2, 254)}:{rng.randint(49152, 65535)}"
+            ip = rng.choice(pool) if pool else f"{rng.randint(1, 223)}.{rng.randint(0, 255)}." \
+                f"{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+            remote = f"{ip}:{rng.choice((80, 443, 443, 22, 3389))}"
+        lines.append(f"  TCP    {local:<23}{remote:<23}{state:<16}{pid}")
+    return "\r\n".join(lines).encode() + b"\r\n"
+
+
+def _synthetic_tasklist(rows: int, rng: random.Random) -> bytes:
+    names = ["svchost.exe", "chrome.exe", "explorer.exe", "Code.exe", "python.exe",
+             "RuntimeBroker.exe", "conhost.exe", "MsMpEng.exe"]
+    lines = [f'"{rng.choice(names)}","{pid}","{rng.choice(("Services", "Console"))}",'
+             f'"{rng.randint(0, 1)}","{rng.randint(100, 900000):,} K"'
+             for pid in range(4, 4 + rows * 4, 4)]
+    return "\r\n".join(lines).encode() + b"\r\n"
+
+
+def _synthetic_wmic(rows: int, rng: random.Random) -> bytes:
+    lines = ["", "Node,ExecutablePath,ProcessId"]
+    for pid in range(4, 4 + rows * 4, 4):
+        path = "" if rng.random() < 0.2 else \
+            f"C:\\Program Files\\App{rng.randint(1, 50)}\\bin\\tool{rng.randint(1, 9)}.exe"
+        lines.append(f"DESKTOP-BENCH,{path},{pid}")
+    return "\r\r\n".join(lines).encode() + b"\r\r\n"
+
+
+# --- Parsers anteriores (decode + splitlines + split), para comparar ---
+
+def _legacy_netstat(data: bytes) -> list[Connection]:
+    rows = []
+    for line in data.decode("utf-8", errors="replace").splitlines():
+        parts = line.split()
+        if len(parts) < 4:
+            continue
+        proto = parts[0].upper()
+        if proto == "TCP":
+            if len(parts) < 5:
+                continue
+            state, pid_str = parts[3], parts[4]
+        elif proto == "UDP":
+            state, pid_str = "", parts[-1]
+        else:
+            continue
+        try:
+            local_addr, _, local_port = parts[1].rpartition(":")
+            remote_addr, _, remote_port = parts[2].rpartition(":")
+            rows.append(Connection(proto, local_addr, int(local_port) if local_port != "*" else 0,
+                                   remote_addr, int(remote_port) if remote_port != "*" else 0,
+                                   state, int(pid_str)))
+        except ValueError:
+            continue
+    return rows
+
+
+def _legacy_tasklist(data: bytes) -> list[dict]:
+    processes = []
+    for line in data.decode("utf-8", errors="replace").splitlines():
+        line = line.strip()
+        if not line or not line.startswith('"'):
+            continue
+        parts = line.split('","')
+        if len(parts) < 5:
+            continue
+        try:
+            pid = int(parts[1].strip('"'))
+        except ValueError:
+            continue
+        processes.append({"name": parts[0].strip('"'), "pid": pid,
+                          "session": parts[2].strip('"'), "mem_usage": parts[4].strip('"'),
+                          "path": ""})
+    return processes
+
+
+def _legacy_wmic(data: bytes) -> dict[int, str]:
+    pid_path = {}
+    for line in data.decode("utf-8", errors="replace").splitlines():
+        parts = line.strip().split(",")
+        if len(parts) >= 3:
+            try:
+                path = parts[1].strip()
+                pid = int(parts[2].strip())
+                if path:
+                    pid_path[pid] = path
+            except (ValueError, IndexError):
+                continue
+    return pid_path
+
+
+def _best(fn: Callable, data: bytes, repeat: int) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(data)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _retained(fn: Callable, data: bytes) -> int:
+    """Bytes que siguen vivos tras parsear (el resultado)."""
+    tracemalloc.start()
+    result = fn(data)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def _compare(label: str, data: bytes, legacy: Callable, new: Callable, repeat: int,
+             check: Callable[[object, object], bool]) -> None:
+    old_t, old_rows = _best(legacy, data, repeat)
+    new_t, new_rows = _best(new, data, repeat)
+    rows = len(new_rows) or 1
+    old_mem, new_mem = _retained(legacy, data), _retained(new, data)
+    same = "ok" if check(old_rows, new_rows) else "DIFIERE"
+    print(f"  {label}: {len(new_rows)} filas, {len(data) / 1e6:.1f} MB, resultado {same}")
+    print(f"    anterior {old_t / rows * 1e6:6.2f} µs/fila  {old_mem / rows:6.0f} B/fila")
+    print(f"    bytes    {new_t / rows * 1e6:6.2f} µs/fila  {new_mem / rows:6.0f} B/fila  "
+          f"(tiempo x{old_t / new_t:.2f}, memoria x{old_mem / max(new_mem, 1):.2f})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000, help="filas de netstat sintético")
+    parser.add_argument("--remotes", type=int, default=0,
+                        help="IPs remotas distintas del netstat sintético (0 = todas distintas)")
+    parser.add_argument("--processes", type=int, default=2000, help="procesos sintéticos")
+    parser.add_argument("--netstat", help="salida capturada de netstat -ano")
+    parser.add_argument("--tasklist", help="salida capturada de tasklist /FO CSV /NH")
+    parser.add_argument("--wmic", help="salida capturada de wmic process get ... /format:csv")
+    parser.add_argument("--repeat", type=int, default=9, help="repeticiones (se toma la mejor)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    netstat = Path(args.netstat).read_bytes() if args.netstat \
+        else _synthetic_netstat(args.rows, rng, args.remotes)
+    tasklist = Path(args.tasklist).read_bytes() if args.tasklist \
+        else _synthetic_tasklist(args.processes, rng)
+    wmic = Path(args.wmic).read_bytes() if args.wmic else _synthetic_wmic(args.processes, rng)
+
+    print(f"Parsers sobre bytes vs decode+split (mejor de {args.repeat})")
+    _compare("netstat", netstat, _legacy_netstat, parse_netstat, args.repeat,
+             lambda old, new: old == new)
+    _compare("tasklist", tasklist, _legacy_tasklist, lambda d: list(iter_tasklist(d)),
+             args.repeat, lambda old, new: [(p["name"], p["pid"], p["session"], p["mem_usage"])
+                                            for p in old] == [tuple(r) for r in new])
+    _compare("wmic", wmic, _legacy_wmic, lambda d: dict(iter_wmic_paths(d)), args.repeat,
+             lambda old, new: old == new)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Stress test: PortScanDetector con 100k IPs remotas.
+
+Simula una tabla con --ips clientes con conexiones largas (a 443/80),
+una fracción --churn de conexiones que se renuevan en cada poll y
+--scanners IPs que van tocando puertos nuevos. Compara el detector
+anterior (re-registra cada conexión ESTABLISHED en cada poll y recorre
+toda la historia) contra el incremental (diff por 4-tupla, mapa
+puerto -> último visto y heap de vencimientos). El reloj es simulado:
+cada poll avanza --interval segundos, así la ventana expira de verdad.
+
+--verify corre en cambio chequeos de comportamiento (assert) del
+detector incremental: conexión larga contada una vez, puerto re-visto
+tras vencer vuelve a contar, _alerted_ips se re-arma al vaciarse la IP,
+el resync del camino con sampler no recuenta conexiones largas y un
+snapshot fallido no vacía la base.
+
+Uso: python -m vigil.bench.portscan [--ips 100000] [--polls 30] [--churn 0.02]
+     python -m vigil.bench.portscan --verify
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+from unittest import mock
+
+from ..monitors.connections import ConnectionTable
+from ..monitors.parsers import Connection
+from ..monitors.portscan import PortScanDetector
+from ..monitors.sampler import ChangeRing, ConnChange
+
+
+class _Snapshots:
+    """Provider falso: sirve la tabla armada por el benchmark."""
+
+    def __init__(self):
+        self.table = ConnectionTable([], 0.0)
+
+    async def get(self, max_age: float | None = None) -> ConnectionTable:
+        return self.table
+
+
+class _LegacyDetector:
+    """Algoritmo anterior: (now, port) por conexión y poll, recorrido completo."""
+
+    def __init__(self, threshold: int, window: int):
+        self.threshold = threshold
+        self.window = window
+        self.connections: dict[str, list[tuple[float, int]]] = {}
+        self.alerted: set[str] = set()
+
+    def poll(self, table: ConnectionTable, now: float) -> int:
+        detected = 0
+        for c in table.with_state("ESTABLISHED"):
+            if c.local_port >= 49152:
+                continue
+            self.connections.setdefault(c.remote_addr, []).append((now, c.local_port))
+        for ip, entries in list(self.connections.items()):
+            entries[:] = [(ts, p) for ts, p in entries if now - ts <= self.window]
+            if not entries:
+                del self.connections[ip]
+                self.alerted.discard(ip)
+                continue
+            if len(set(p for _, p in entries)) > self.threshold and ip not in self.alerted:
+                self.alerted.add(ip)
+                detected += 1
+        return detected
+
+
+def _ip(i: int) -> str:
+    return f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+
+class _Workload:
+    def __init__(self, args: argparse.Namespace):
+        self.rng = random.Random(args.seed)
+        self.args = args
+        self.next_port = 50000
+        self.rows = [self._client(i) for i in range(args.ips)]
+        self.scanners = [_ip(args.ips + i) for i in range(args.scanners)]
+        self.scan_port = 1
+
+    def _client(self, i: int) -> Connection:
+        self.next_port = self.next_port + 1 if self.next_port < 65000 else 50000
+        return Connection("TCP", "192.168.1.10", self.rng.choice((443, 80)), _ip(i),
+                          self.next_port, "ESTABLISHED", 1234)
+
+    def step(self) -> ConnectionTable:
+        """Renueva una fracción de conexiones y agrega el barrido de los scanners."""
+        for i in self.rng.sample(range(len(self.rows)), int(len(self.rows) * self.args.churn)):
+            self.rows[i] = self._client(i)
+        scans = [Connection("TCP", "192.168.1.10", self.scan_port + k, ip, 40000 + k,
+                            "ESTABLISHED", 4)
+                 for ip in self.scanners for k in range(self.args.scan_rate)]
+        self.scan_port += self.args.scan_rate
+        return ConnectionTable(self.rows + scans, 0.0)
+
+
+def _run(args: argparse.Namespace, legacy: bool) -> tuple[list[float], int, int]:
+    workload = _Workload(args)
+    snapshots = _Snapshots()
+    detector = PortScanDetector(threshold=args.threshold, window=args.window,
+                                snapshots=snapshots)
+    old = _LegacyDetector(args.threshold, args.window)
+    clock = [1_000_000.0]
+    times, detected = [], 0
+    with mock.patch("vigil.monitors.portscan.time.time", lambda: clock[0]):
+        for _ in range(args.polls):
+            snapshots.table = workload.step()
+            clock[0] += args.interval
+            start = time.perf_counter()
+            if legacy:
+                detected += old.poll(snapshots.table, clock[0])
+            else:
+                detected += len(asyncio.run(detector.poll()))
+            times.append(time.perf_counter() - start)
+    state = sum(len(e) for e in old.connections.values()) if legacy else \
+        sum(len(p) for p in detector._ports.values())
+    return times, detected, state
+
+
+def _inbound(port: int, ip: str, rport: int = 40000) -> Connection:
+    return Connection("TCP", "192.168.1.10", port, ip, rport, "ESTABLISHED", 4)
+
+
+def _verify() -> None:
+    """Chequeos de comportamiento del detector incremental (falla con AssertionError)."""
+    clock = [1_000_000.0]
+    snapshots = _Snapshots()
+
+    def poll(detector: PortScanDetector, rows: list[Connection], advance: float = 10.0):
+        clock[0] += advance
+        snapshots.table = ConnectionTable(rows, 0.0)
+        return asyncio.run(detector.poll())
+
+    def counted(detector: PortScanDetector, ip: str) -> int:
+        return len(detector._ports.get(ip, {}))
+
+    with mock.patch("vigil.monitors.portscan.time.time", lambda: clock[0]):
+        # 1. Una conexión larga cuenta una vez y vence aunque siga abierta
+        d = PortScanDetector(threshold=3, window=60, snapshots=snapshots)
+        longlived = [_inbound(443, "10.0.0.1")]
+        poll(d, longlived)
+        first_seen = d._ports["10.0.0.1"][443]
+        for _ in range(3):
+            poll(d, longlived)
+        assert d._ports["10.0.0.1"][443] == first_seen, "conexión larga re-registrada"
+        assert len(d._expiry) == 1, "vencimientos duplicados por conexión larga"
+        for _ in range(6):
+            poll(d, longlived)
+        assert counted(d, "10.0.0.1") == 0, "puerto no venció fuera de la ventana"
+
+        # 2. El mismo puerto en una conexión nueva tras vencer vuelve a contar
+        poll(d, [_inbound(443, "10.0.0.1", rport=40001)])
+        assert counted(d, "10.0.0.1") == 1, "puerto re-visto tras vencer no contó"
+
+        # 3. Alerta una vez por ventana y se re-arma cuando la IP se vacía
+        scan = [_inbound(p, "10.0.0.2") for p in range(1, 5)]
+        events = poll(d, scan)
+        assert [e.event_type for e in events] == ["port_scan_detected"]
+        assert "10.0.0.2" in d._alerted_ips
+        assert not poll(d, scan + [_inbound(5, "10.0.0.2")]), "alertó dos veces en la ventana"
+        for _ in range(7):
+            poll(d, [])
+        assert "10.0.0.2" not in d._alerted_ips, "_alerted_ips no se re-armó"
+        events = poll(d, [_inbound(p, "10.0.0.2", rport=41000) for p in range(1, 5)])
+        assert [e.event_type for e in events] == ["port_scan_detected"], "no re-alertó"
+
+        # 4. Sampler: el resync por cambios perdidos no recuenta conexiones largas
+        ring = ChangeRing(4)
+        d = PortScanDetector(threshold=3, window=600, snapshots=snapshots,
+                             changes=ring.reader("portscan"))
+        longlived = [_inbound(p, f"10.1.{p}.1") for p in range(1, 30)]
+        poll(d, longlived)
+        assert d.get_state()["tracked_connections"] == len(longlived)
+        before = {ip: dict(ports) for ip, ports in d._ports.items()}
+        burst = [_inbound(80, "10.2.0.1", rport=42000 + k) for k in range(10)]
+        ring.extend([ConnChange(clock[0], "open", c) for c in burst])  # desborda el ring
+        assert not poll(d, longlived + burst), "resync disparó un falso scan"
+        assert d._changes.dropped > 0
+        assert all(d._ports[ip] == ports for ip, ports in before.items()), \
+            "resync recontó conexiones largas"
+        assert d.get_state()["tracked_connections"] == len(longlived) + len(burst)
+
+        # 5. Sampler: open + close entre polls cuenta; el close saca la base
+        short = _inbound(22, "10.3.0.1")
+        ring.extend([ConnChange(clock[0], "open", short), ConnChange(clock[0], "close", short)])
+        poll(d, longlived + burst)
+        assert counted(d, "10.3.0.1") == 1, "conexión corta del sampler no contó"
+        assert d.get_state()["tracked_connections"] == len(longlived) + len(burst)
+
+        # 6. Un snapshot fallido (tabla vacía) no borra la base: al volver,
+        #    las conexiones largas ya vencidas no cuentan de nuevo
+        d = PortScanDetector(threshold=3, window=60, snapshots=snapshots)
+        longlived = [_inbound(p, "10.4.0.1") for p in range(1, 5)]
+        poll(d, longlived)
+        for _ in range(7):
+            poll(d, longlived)
+        assert counted(d, "10.4.0.1") == 0
+        clock[0] += 10
+        snapshots.table = ConnectionTable([], 0.0, failed=True)
+        asyncio.run(d.poll())
+        assert d.get_state()["tracked_connections"] == len(longlived), "el fallo vació la base"
+        assert not poll(d, longlived), "falso scan tras un snapshot fallido"
+        assert counted(d, "10.4.0.1") == 0, "conexiones largas recontadas tras el fallo"
+    print("portscan: chequeos OK")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ips", type=int, default=100000, help="IPs remotas con conexión larga")
+    parser.add_argument("--polls", type=int, default=30)
+    parser.add_argument("--interval", type=float, default=10, help="segundos simulados por poll")
+    parser.add_argument("--window", type=int, default=120)
+    parser.add_argument("--threshold", type=int, default=20)
+    parser.add_argument("--churn", type=float, default=0.02, help="fracción renovada por poll")
+    parser.add_argument("--scanners", type=int, default=5)
+    parser.add_argument("--scan-rate", type=int, default=3, help="puertos nuevos por scanner y poll")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skip-legacy", action="store_true")
+    parser.add_argument("--verify", action="store_true", help="sólo chequeos de comportamiento")
+    args = parser.parse_args()
+    if args.verify:
+        _verify()
+        return
+
+    print(f"{args.ips} IPs, {args.polls} polls cada {args.interval:g}s simulados, "
+          f"ventana {args.window}s, churn {args.churn:.0%}, {args.scanners} scanners")
+    variants = [("incremental", False)] + ([] if args.skip_legacy else [("anterior", True)])
+    for label, legacy in variants:
+        times, detected, state = _run(args, legacy)
+        ordered = sorted(times)
+        print(f"  {label:<12} poll medio {sum(times) / len(times) * 1000:8.1f} ms   "
+              f"p99 {ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] * 1000:8.1f} ms   "
+              f"último {times[-1] * 1000:8.1f} ms   estado {state} entradas   "
+              f"scans detectados {detected}")
+
+
+if __name__ == "__main__":
+    main()
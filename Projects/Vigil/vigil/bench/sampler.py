@@ -0,0 +1,145 @@
+"""Benchmark: conexiones cortas vistas por ConnectionSampler contra polls (Linux).
+
+Durante --duration segundos abre conexiones TCP por loopback que viven
+entre --min-life y --max-life segundos (reverse shell que conecta y
+sale, ráfaga de exfiltración), con --sockets conexiones largas de fondo
+para agrandar la tabla. Mientras tanto corre el sampler real sobre
+ProcFSCollector y al final drena su buffer.
+
+Reporta:
+- conexiones cortas vistas por el sampler (open en el buffer)
+- las que vería un poll cada --poll segundos (calculado con los tiempos
+  de vida reales y una fase al azar)
+- costo del hilo: CPU %, ms por muestra, muestras salteadas y cambios
+  perdidos (probar con --capacity chico)
+
+Uso: python -m vigil.bench.sampler [--duration 20] [--interval 0.25] [--sockets 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import socket
+import sys
+import threading
+import time
+
+from ..monitors.procfs import ProcFSCollector
+from ..monitors.sampler import ConnectionSampler
+
+
+def _open_background(n: int) -> list[socket.socket]:
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(n)
+    socks = [server]
+    for _ in range(n):
+        client = socket.create_connection(server.getsockname())
+        conn, _ = server.accept()
+        socks += [client, conn]
+    return socks
+
+
+def _short_lived(args: argparse.Namespace, stop: threading.Event,
+                 lives: list[tuple[int, float, float]]) -> None:
+    """Abre conexiones cortas a ritmo --rate por segundo; registra (puerto, abre, cierra)."""
+    rng = random.Random(args.seed)
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", 0))
+    server.listen(128)
+    open_conns: list[tuple[float, socket.socket, socket.socket, int, float]] = []
+    next_open = time.monotonic()
+    while not stop.is_set():
+        now = time.monotonic()
+        if now >= next_open:
+            client = socket.create_connection(server.getsockname())
+            conn, _ = server.accept()
+            opened = time.monotonic()
+            close_at = opened + rng.uniform(args.min_life, args.max_life)
+            open_conns.append((close_at, client, conn, client.getsockname()[1], opened))
+            next_open += rng.expovariate(args.rate)
+        for item in [c for c in open_conns if c[0] <= now]:
+            close_at, client, conn, port, opened = item
+            client.close()
+            conn.close()
+            lives.append((port, opened, time.monotonic()))
+            open_conns.remove(item)
+        time.sleep(0.005)
+    for _, client, conn, port, opened in open_conns:
+        client.close()
+        conn.close()
+        lives.append((port, opened, time.monotonic()))
+    server.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--interval", type=float, default=0.25, help="segundos entre muestras")
+    parser.add_argument("--capacity", type=int, default=65536)
+    parser.add_argument("--poll", type=float, default=10, help="intervalo de poll a comparar")
+    parser.add_argument("--rate", type=float, default=5, help="conexiones cortas por segundo")
+    parser.add_argument("--min-life", type=float, default=0.3)
+    parser.add_argument("--max-life", type=float, default=3.0)
+    parser.add_argument("--sockets", type=int, default=2000, help="conexiones largas de fondo")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if not sys.platform.startswith("linux"):
+        print("Este benchmark necesita Linux (/proc)")
+        return
+
+    background = _open_background(args.sockets)
+    sampler = ConnectionSampler(ProcFSCollector(), interval=args.interval,
+                                capacity=args.capacity)
+    reader = sampler.reader("bench")
+    lives: list[tuple[int, float, float]] = []
+    stop = threading.Event()
+    worker = threading.Thread(target=_short_lived, args=(args, stop, lives))
+    try:
+        sampler.start()
+        time.sleep(args.interval * 2)  # primera muestra = baseline
+        started = time.monotonic()
+        worker.start()
+        # Drenar como lo haría un monitor, cada --poll segundos (o al final)
+        changes = []
+        while time.monotonic() - started < args.duration:
+            time.sleep(min(args.poll, args.duration))
+            batch, _ = reader.drain()
+            changes += batch
+        stop.set()
+        worker.join()
+        time.sleep(args.interval * 2)
+        batch, _ = reader.drain()
+        changes += batch
+    finally:
+        sampler.stop()
+        for sock in background:
+            sock.close()
+
+    opened_ports = {c.conn.local_port for c in changes
+                    if c.kind == "open" and c.conn.remote_port != 0}
+    seen = sum(1 for port, _, _ in lives if port in opened_ports)
+    rng = random.Random(args.seed)
+    phase = rng.uniform(0, args.poll)
+    by_poll = 0
+    for _, opened, closed in lives:
+        first = phase + args.poll * max(0, int((opened - started - phase) // args.poll) + 1)
+        by_poll += started + first <= closed
+    stats = sampler.get_stats()
+
+    print(f"{len(lives)} conexiones cortas de {args.min_life:g}-{args.max_life:g}s en "
+          f"{args.duration:g}s, {args.sockets * 2 + 1} sockets de fondo")
+    print(f"  vistas por el sampler ({args.interval * 1000:.0f} ms): {seen:5d} "
+          f"({seen / max(len(lives), 1):.0%})")
+    print(f"  vistas por polls cada {args.poll:g}s:       {by_poll:5d} "
+          f"({by_poll / max(len(lives), 1):.0%})")
+    print(f"  muestras {stats['samples']}  cambios {stats['changes']}  "
+          f"salteadas {stats['skipped_samples']}  perdidos {stats['dropped']}")
+    print(f"  costo del hilo: {stats['cpu_percent']:.1f}% CPU, "
+          f"{stats['avg_sample_ms']:.1f} ms por muestra")
+
+
+if __name__ == "__main__":
+    main()
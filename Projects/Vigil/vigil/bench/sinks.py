@@ -0,0 +1,272 @@
+"""Benchmark: sinks de alertas contra receptores locales.
+
+Levanta receptores en 127.0.0.1 (syslog UDP y TCP con framing
+octet-counting, un webhook aiohttp con respuestas programables y un
+lector de Unix socket) y mide alertas/s de cada sink detrás de su
+SinkWorker. Antes corre chequeos de comportamiento (assert):
+
+- webhook 503/503/200 y 429/200: el batch se reintenta y se entrega una vez
+- webhook 400: se descarta sin reintentar
+- cola llena: enqueue() descarta y cuenta, sin bloquear al pipeline
+- todo lo que el worker cuenta como enviado llega al receptor
+
+Uso: python -m vigil.bench.sinks [-n 5000] [--batch-size 50] [--checks-only]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+
+from aiohttp import web
+
+from ..alerts.sinks import AlertSink, StreamSink, SinkWorker, SyslogSink, WebhookSink
+from ..core.config import SinkConfig
+from ..core.events import Alert, SecurityEvent, Severity
+
+
+def _alerts(n: int) -> list[Alert]:
+    return [
+        Alert(
+            rule_id="NET001",
+            severity=Severity.HIGH,
+            title=f"Nuevo listener: app{i}.exe en puerto {20000 + i % 40000}",
+            description=f"El proceso app{i}.exe abrió el puerto {20000 + i % 40000}/TCP",
+            event=SecurityEvent(source="network", event_type="new_listener", data={
+                "proto": "TCP", "local_addr": "0.0.0.0", "local_port": 20000 + i % 40000,
+                "pid": 4000 + i, "process": f"app{i}.exe", "state": "LISTENING",
+            }),
+        )
+        for i in range(n)
+    ]
+
+
+# --- Receptores locales -------------------------------------------------
+
+class _UdpSyslog(asyncio.DatagramProtocol):
+    """Receptor syslog UDP: un mensaje por datagrama."""
+
+    def __init__(self):
+        self.received = 0
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        assert data.startswith(b"<"), "datagrama sin PRI"
+        self.received += 1
+
+
+class _TcpSyslog:
+    """Receptor syslog TCP que desarma el framing "<len> <msg>" (RFC 6587)."""
+
+    def __init__(self):
+        self.received = 0
+        self.server: asyncio.base_events.Server | None = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                length = await reader.readuntil(b" ")
+                msg = await reader.readexactly(int(length[:-1]))
+                assert msg.startswith(b"<"), "frame sin PRI"
+                self.received += 1
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class _Webhook:
+    """Webhook aiohttp: responde los códigos de `script` en orden y después 200."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.script: list[int] = []
+        self.requests = 0
+        self.received = 0
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+
+    async def _post(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        body = await request.read()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        status = self.script.pop(0) if self.script else 200
+        if status == 200:
+            self.received += len(json.loads(body))
+        return web.Response(status=status)
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/hook", self._post)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/hook"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def reset(self, script: list[int] | None = None, delay: float = 0.0) -> None:
+        self.script = list(script or [])
+        self.delay = delay
+        self.requests = 0
+        self.received = 0
+
+
+class _UnixReader:
+    """Lector NDJSON en un Unix socket."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.received = 0
+        self.server: asyncio.base_events.Server | None = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        async for line in reader:
+            json.loads(line)
+            self.received += 1
+        writer.close()
+
+
+# --- Ejecución ----------------------------------------------------------
+
+def _config(kind: str, args: argparse.Namespace, **overrides) -> SinkConfig:
+    values = dict(type=kind, queue_size=args.n, batch_size=args.batch_size,
+                  flush_interval=0.05, max_retries=3, retry_backoff=0.01, max_backoff=0.05)
+    values.update(overrides)
+    return SinkConfig(**values)
+
+
+async def _drive(sink: AlertSink, config: SinkConfig, alerts: list[Alert]) -> tuple[SinkWorker, float]:
+    """Encola todas las alertas de una vez y espera a que el worker vacíe la cola."""
+    worker = SinkWorker(sink, config)
+    worker.start()
+    start = time.perf_counter()
+    for alert in alerts:
+        worker.enqueue(alert)
+    await worker.stop(timeout=60.0)
+    return worker, time.perf_counter() - start
+
+
+async def _checks(hook: _Webhook, args: argparse.Namespace) -> None:
+    """Retry ante 5xx/429, descarte sin retry ante 4xx y cola llena."""
+    cases = [
+        ("webhook 503,503 -> 200", [503, 503], 2, 0),
+        ("webhook 429 -> 200", [429], 1, 0),
+        ("webhook 400", [400], 0, 1),
+    ]
+    for label, script, retries, failed_batches in cases:
+        hook.reset(script)
+        alerts = _alerts(3)
+        worker, _ = await _drive(WebhookSink(hook.url), _config("webhook", args, batch_size=3), alerts)
+        stats = worker.get_stats()
+        assert stats["retries"] == retries, f"{label}: {stats['retries']} reintentos, esperaba {retries}"
+        assert stats["failed"] == 3 * failed_batches, f"{label}: failed={stats['failed']}"
+        assert hook.requests == retries + 1, f"{label}: {hook.requests} requests"
+        assert hook.received == stats["sent"], f"{label}: recibidas {hook.received} != enviadas {stats['sent']}"
+        print(f"  ok  {label:<24} requests {hook.requests}, reintentos {stats['retries']}, "
+              f"enviadas {stats['sent']}, descartadas {stats['failed']}")
+
+    # 5xx en todos los intentos: se agotan max_retries y el batch se descarta
+    hook.reset([500] * 10)
+    worker, _ = await _drive(WebhookSink(hook.url), _config("webhook", args, batch_size=3, max_retries=2),
+                             _alerts(3))
+    stats = worker.get_stats()
+    assert stats["retries"] == 2 and stats["failed"] == 3 and hook.requests == 3, stats
+    print(f"  ok  {'webhook 500 x3':<24} requests {hook.requests}, reintentos {stats['retries']}, "
+          f"enviadas {stats['sent']}, descartadas {stats['failed']}")
+
+    # Cola llena: enqueue() no cede el loop, así que entran exactamente queue_size
+    hook.reset(delay=0.05)
+    queue_size, n = 10, 100
+    worker, _ = await _drive(WebhookSink(hook.url),
+                             _config("webhook", args, queue_size=queue_size, batch_size=5), _alerts(n))
+    stats = worker.get_stats()
+    assert stats["dropped"] == n - queue_size, f"cola llena: dropped={stats['dropped']}"
+    assert stats["sent"] == queue_size == hook.received, stats
+    print(f"  ok  {'cola llena':<24} encoladas {n}, cola {queue_size}, "
+          f"descartadas {stats['dropped']}, entregadas {hook.received}")
+
+
+async def _throughput(hook: _Webhook, args: argparse.Namespace) -> None:
+    loop = asyncio.get_running_loop()
+    alerts = _alerts(args.n)
+    for alert in alerts:
+        alert.to_json()  # codificación fuera de la medición, como en el pipeline
+
+    udp = _UdpSyslog()
+    transport, _ = await loop.create_datagram_endpoint(lambda: udp, local_addr=("127.0.0.1", 0))
+    transport.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 << 20)
+    tcp = _TcpSyslog()
+    tcp.server = await asyncio.start_server(tcp._handle, "127.0.0.1", 0)
+
+    runs: list[tuple[str, AlertSink, SinkConfig, object]] = [
+        ("syslog udp", SyslogSink(port=transport.get_extra_info("sockname")[1], protocol="udp"),
+         _config("syslog", args), udp),
+        ("syslog tcp", SyslogSink(port=tcp.server.sockets[0].getsockname()[1], protocol="tcp"),
+         _config("syslog", args), tcp),
+        ("webhook", WebhookSink(hook.url), _config("webhook", args), hook),
+    ]
+    unix = None
+    tmpdir = tempfile.mkdtemp(prefix="vigil-sinks-")
+    if hasattr(socket, "AF_UNIX"):
+        unix = _UnixReader(os.path.join(tmpdir, "stream.sock"))
+        unix.server = await asyncio.start_unix_server(unix._handle, unix.path)
+        runs.append(("stream unix", StreamSink(unix.path), _config("stream", args), unix))
+
+    hook.reset()
+    print(f"{args.n} alertas, batch {args.batch_size}")
+    try:
+        for label, sink, config, receiver in runs:
+            worker, elapsed = await _drive(sink, config, alerts)
+            await asyncio.sleep(0.1)  # lo último en vuelo hacia el receptor
+            stats = worker.get_stats()
+            print(f"  {label:<12} {elapsed * 1000:8.1f} ms  {stats['sent'] / elapsed:10.0f} alertas/s  "
+                  f"recibidas {receiver.received}/{stats['sent']}  reintentos {stats['retries']}  "
+                  f"descartadas {stats['dropped'] + stats['failed']}")
+            if label != "syslog udp":
+                assert receiver.received == stats["sent"] == args.n, f"{label}: alertas perdidas"
+    finally:
+        transport.close()
+        tcp.server.close()
+        if unix is not None:
+            unix.server.close()
+            os.unlink(unix.path)
+        os.rmdir(tmpdir)
+    if unix is None:
+        print("  stream unix  omitido (sin AF_UNIX en esta plataforma)")
+
+
+async def _main(args: argparse.Namespace) -> None:
+    hook = _Webhook()
+    await hook.start()
+    try:
+        print("Chequeos:")
+        await _checks(hook, args)
+        if not args.checks_only:
+            await _throughput(hook, args)
+    finally:
+        await hook.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=5000, help="alertas por sink")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--checks-only", action="store_true", help="sólo chequeos de comportamiento")
+    # Los descartes y fallos son esperados en los chequeos: sin un warning por alerta
+    logging.getLogger("vigil.sinks").setLevel(logging.ERROR)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
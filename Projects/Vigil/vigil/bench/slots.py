@@ -0,0 +1,72 @@
+"""Benchmark: throughput de enriquecimiento contra un servidor con slots paralelos.
+
+Levanta el stub en modo OpenAI-compatible con N slots (como un llama.cpp
+server con --parallel N) y enriquece una ráfaga de alertas distintas
+(sin hits de cache). Compara el scheduler con su concurrencia por defecto
+(AIMD desde 1 hasta max_concurrency) contra la cantidad de slots
+descubierta en /props.
+
+Uso: python -m vigil.bench.slots [-n 40] [--slots 4] [--latency 1.0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from ..core.config import OllamaConfig
+from ..core.events import Alert, SecurityEvent, Severity
+from ..intelligence.analyzer import OllamaAnalyzer
+from .stub_ollama import StubOllama
+
+
+def _burst(n: int) -> list[Alert]:
+    """Alertas con situaciones distintas: cada una necesita su generación."""
+    return [
+        Alert(rule_id="NET001", severity=Severity.HIGH, title=f"Puerto {9000 + i} abierto",
+              description="bench", event=SecurityEvent(
+                  source="network", event_type="new_listener",
+                  data={"process": f"svc{i}.exe", "local_port": 9000 + i, "proto": "TCP"}))
+        for i in range(n)
+    ]
+
+
+async def _run(args: argparse.Namespace, discover: bool) -> tuple[float, int, int]:
+    async with StubOllama(latency=args.latency, slots=args.slots) as stub:
+        config = OllamaConfig(backend="openai", url=stub.url, rate_limit=0, stream=False,
+                              cache_path="", min_severity="LOW",
+                              max_concurrency=args.max_concurrency)
+        analyzer = OllamaAnalyzer(config)
+        try:
+            if discover:
+                await analyzer.prepare(warmup=False)
+            start = time.perf_counter()
+            results = await asyncio.gather(*(analyzer.analyze(a) for a in _burst(args.n)))
+            elapsed = time.perf_counter() - start
+        finally:
+            await analyzer.aclose()
+    return elapsed, sum(1 for r in results if r), stub.max_parallel
+
+
+async def _main(args: argparse.Namespace) -> None:
+    print(f"Ráfaga de {args.n} alertas, servidor con {args.slots} slots, latencia {args.latency}s")
+    for label, discover in ((f"max_concurrency={args.max_concurrency}", False),
+                            ("slots descubiertos", True)):
+        elapsed, ok, parallel = await _run(args, discover)
+        print(f"  {label:<22}{elapsed:7.1f}s  {ok / elapsed * 60:7.1f} alertas/min  "
+              f"({ok}/{args.n} enriquecidas, máx. {parallel} en paralelo)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=40, help="alertas de la ráfaga")
+    parser.add_argument("--slots", type=int, default=4, help="slots paralelos del stub")
+    parser.add_argument("--latency", type=float, default=1.0, help="latencia por generación (s)")
+    parser.add_argument("--max-concurrency", type=int, default=2,
+                        help="concurrencia configurada sin descubrimiento")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
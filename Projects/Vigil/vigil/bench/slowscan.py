@@ -0,0 +1,126 @@
+"""Stream sintético para SlowScanTracker: detección, falsos positivos y memoria.
+
+Simula --hours horas de conexiones nuevas (ticks de --tick segundos, como
+los polls de PortScanDetector) con:
+- fondo: --clients IPs que se conectan a 443/80 a --rate conexiones/s
+- servicios: IPs que usan 3-6 puertos de mail/web (no deben alertar)
+- pesadas: IPs que abren una conexión a 443 en cada tick (no deben alertar)
+- scanners lentos: un puerto nuevo cada --probe-interval segundos
+- un scanner rápido: 100 puertos en un minuto
+- opcional --botnet N: IPs distintas con pocos puertos cada una, para
+  verificar que la memoria no crece con el volumen
+
+Reporta cuándo y en qué horizonte se detectó cada scanner, la estimación
+HLL contra el valor real, falsos positivos, costo por observación y
+memoria fija de los sketches.
+
+Uso: python -m vigil.bench.slowscan [--hours 24] [--probe-interval 300] [--botnet 200000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from ..monitors.sketches import SlowScanTracker
+
+_SERVICE_PORTS = [25, 110, 143, 465, 587, 993, 995, 80, 443]
+
+
+def _ip(prefix: int, i: int) -> str:
+    return f"{prefix}.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--tick", type=int, default=10, help="segundos por poll")
+    parser.add_argument("--clients", type=int, default=100000)
+    parser.add_argument("--rate", type=float, default=3.0, help="conexiones/s de fondo")
+    parser.add_argument("--services", type=int, default=200, help="IPs multi-servicio")
+    parser.add_argument("--heavy", type=int, default=20, help="IPs con una conexión por tick")
+    parser.add_argument("--slow", type=int, default=5, help="scanners lentos")
+    parser.add_argument("--probe-interval", type=float, default=300,
+                        help="segundos entre puertos de cada scanner lento")
+    parser.add_argument("--botnet", type=int, default=0, help="IPs de un scan distribuido")
+    parser.add_argument("--max-sources", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tracker = SlowScanTracker(max_sources=args.max_sources)
+    start_ts = 1_700_000_000.0
+    ticks = int(args.hours * 3600 / args.tick)
+
+    scanners = {_ip(203, i): {"ports": set(), "next": start_ts + rng.uniform(0, args.probe_interval)}
+                for i in range(args.slow)}
+    fast_ip, fast_at = "198.51.100.7", start_ts + 3600
+    services = [_ip(172, i) for i in range(args.services)]
+    service_ports = {ip: rng.sample(_SERVICE_PORTS, rng.randint(3, 6)) for ip in services}
+    heavy = [_ip(100, i) for i in range(args.heavy)]
+    bots_per_tick = args.botnet / ticks if args.botnet else 0
+    next_bot = 0
+
+    detected: dict[str, tuple[float, str, int]] = {}
+    false_positives: set[str] = set()
+    observations, observe_time = 0, 0.0
+
+    for t in range(ticks):
+        now = start_ts + t * args.tick
+        batch: list[tuple[str, int]] = []
+        for _ in range(int(args.rate * args.tick + rng.random())):
+            batch.append((_ip(10, rng.randrange(args.clients)), rng.choice((443, 443, 80))))
+        if rng.random() < 0.5:
+            ip = rng.choice(services)
+            batch.append((ip, rng.choice(service_ports[ip])))
+        batch.extend((ip, 443) for ip in heavy)
+        for ip, state in scanners.items():
+            while state["next"] <= now:
+                port = rng.randrange(1, 49152)
+                state["ports"].add(port)
+                batch.append((ip, port))
+                state["next"] += args.probe_interval
+        if fast_at <= now < fast_at + 60:
+            batch.extend((fast_ip, p) for p in range(1 + (t % 6) * 17, 18 + (t % 6) * 17))
+        if bots_per_tick:
+            count = int(bots_per_tick) + (rng.random() < bots_per_tick % 1)
+            for _ in range(count):
+                bot = _ip(45, next_bot)
+                next_bot += 1
+                batch.extend((bot, rng.randrange(1, 49152)) for _ in range(3))
+
+        started = time.perf_counter()
+        for ip, port in batch:
+            tracker.observe(ip, port, now)
+        results = tracker.evaluate({ip for ip, _ in batch}, now)
+        observe_time += time.perf_counter() - started
+        observations += len(batch)
+
+        for data in results:
+            ip = data["remote_ip"]
+            if ip in scanners or ip == fast_ip:
+                detected.setdefault(ip, (now - start_ts, data["horizon"], data["distinct_ports"]))
+            else:
+                false_positives.add(ip)
+
+    print(f"{args.hours:g}h simuladas, {observations} conexiones nuevas, "
+          f"scanners lentos: 1 puerto cada {args.probe_interval:g}s")
+    for ip in list(scanners) + [fast_ip]:
+        real = len(scanners[ip]["ports"]) if ip in scanners else 100
+        if ip in detected:
+            at, horizon, estimate = detected[ip]
+            print(f"  {ip:<16} detectado a las {at / 3600:5.2f}h en {horizon:<4} "
+                  f"(~{estimate} puertos estimados)   total real {real}")
+        else:
+            print(f"  {ip:<16} NO detectado   total real {real}")
+    stats = tracker.get_stats()
+    print(f"  falsos positivos:     {len(false_positives)}")
+    print(f"  fuentes seguidas:     {stats['tracked_sources']} (promovidas {stats['promoted']}, "
+          f"desalojadas {stats['evicted']})")
+    print(f"  memoria de sketches:  {stats['memory_bytes'] / 1e6:.1f} MB (fija)")
+    print(f"  costo:                {observe_time / observations * 1e6:.1f} µs por conexión")
+
+
+if __name__ == "__main__":
+    main()
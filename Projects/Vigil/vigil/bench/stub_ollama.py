@@ -0,0 +1,358 @@
+"""Servidor Ollama falso para benchmarks y pruebas locales (aiohttp).
+
+Implementa /api/tags, /api/generate (normal y streaming NDJSON) y
+/api/embeddings sin modelo real, más el dialecto OpenAI-compatible de
+llama.cpp server (/v1/models, /v1/chat/completions con SSE,
+/v1/embeddings, /props, /slots). `response` puede ser un texto fijo o una
+función prompt → texto.
+
+Comportamiento configurable:
+- `latency`: segundos fijos o una distribución ("uniform:0.2,1.5",
+  "lognormal:0.8,0.5" con mediana y sigma, "exp:0.5" con media).
+- `error_rate`: fracción de generate/embeddings que responden 500.
+- `token_delay` / `token_rate`: demora por token generado (o tokens/s).
+- `load_time`: se paga cuando el modelo no está cargado (primer request
+  o keep_alive vencido).
+- `prompt_delay`: por token de entrada que no comparte prefijo con el
+  request anterior (como el cache de prompt de Ollama).
+- `slots`: generaciones en paralelo (el resto espera slot libre);
+  0 = sin límite. Se anuncia en /props como total_slots.
+
+Uso como módulo:
+
+    async with StubOllama(latency="lognormal:0.8,0.4", error_rate=0.05) as stub:
+        url = stub.url
+
+O standalone, para apuntar config.yaml a él:
+
+    python -m vigil.bench.stub_ollama --port 11434 --latency uniform:0.5,2 --token-rate 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import zlib
+from typing import Callable
+
+from aiohttp import web
+
+# Dimensión de los embeddings falsos (la de nomic-embed-text)
+_EMBED_DIM = 768
+
+
+def latency_sampler(spec: float | str | None, rng: random.Random) -> Callable[[], float]:
+    """Convierte una especificación de latencia en una función → segundos."""
+    if spec is None or spec == "":
+        return lambda: 0.0
+    if isinstance(spec, (int, float)):
+        return lambda: float(spec)
+    kind, _, params = str(spec).partition(":")
+    if not params:
+        value = float(kind)
+        return lambda: value
+    args = [float(p) for p in params.split(",")]
+    if kind == "fixed":
+        return lambda: args[0]
+    if kind == "uniform":
+        return lambda: rng.uniform(args[0], args[1])
+    if kind == "lognormal":
+        mu = math.log(args[0])
+        return lambda: rng.lognormvariate(mu, args[1])
+    if kind == "exp":
+        return lambda: rng.expovariate(1 / args[0])
+    raise ValueError(f"Distribución de latencia desconocida: {spec}")
+
+
+class StubOllama:
+    """Stub HTTP que responde como Ollama. Cuenta requests, errores y conexiones."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float | str = 0.0,
+                 response: str | Callable[[str], str] = "Explicación de prueba.",
+                 token_delay: float = 0.0, token_rate: float = 0.0, load_time: float = 0.0,
+                 prompt_delay: float = 0.0, error_rate: float = 0.0, slots: int = 0,
+                 seed: int | None = None):
+        self.host = host
+        self.port = port
+        self._rng = random.Random(seed)
+        self.latency = latency
+        self._latency = latency_sampler(latency, self._rng)
+        self.response = response
+        # segundos por token generado; token_rate (tokens/s) tiene prioridad
+        self.token_delay = 1.0 / token_rate if token_rate else token_delay
+        self.load_time = load_time
+        self.prompt_delay = prompt_delay  # segundos por token de prompt evaluado
+        self.error_rate = error_rate
+        self.slots = slots
+        self._slots = asyncio.Semaphore(slots) if slots else None
+        self.max_parallel = 0  # máximo de generaciones simultáneas observado
+        self._active = 0
+
+        self.requests = 0          # generate + tags
+        self.embeddings = 0
+        self.errors = 0
+        self.tokens_sent = 0
+        self.loads = 0
+        self.prompt_tokens = 0     # tokens de prompt recibidos
+        self.prompt_evaluated = 0  # tokens efectivamente evaluados (sin prefijo reusado)
+        self._loaded_until: dict[str, float] = {}
+        self._last_prompt = ""
+        self._peers: set = set()
+        self._runner: web.AppRunner | None = None
+
+        self._app = web.Application()
+        self._app.router.add_get("/api/tags", self._tags)
+        self._app.router.add_post("/api/generate", self._generate)
+        self._app.router.add_post("/api/embeddings", self._embeddings)
+        self._app.router.add_get("/v1/models", self._tags)
+        self._app.router.add_post("/v1/chat/completions", self._chat)
+        self._app.router.add_post("/v1/embeddings", self._embeddings)
+        self._app.router.add_get("/props", self._props)
+        self._app.router.add_get("/slots", self._slot_list)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def connections(self) -> int:
+        """Conexiones TCP distintas vistas (puertos origen únicos)."""
+        return len(self._peers)
+
+    def _track(self, request: web.Request) -> None:
+        if request.transport is not None:
+            self._peers.add(request.transport.get_extra_info("peername"))
+
+    def _fail(self) -> web.Response | None:
+        """Error inyectado según error_rate (None = responder normal)."""
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({"error": "stub: error inyectado"}, status=500)
+        return None
+
+    async def _tags(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        self._track(request)
+        return web.json_response({"models": [{"name": "stub"}]})
+
+    @staticmethod
+    def _keep_alive_seconds(value) -> float:
+        """"30m", "1h", "90s", 300 o -1 (para siempre). Default de Ollama: 5m."""
+        if value is None:
+            return 300.0
+        if isinstance(value, (int, float)):
+            return float("inf") if value < 0 else float(value)
+        m = re.fullmatch(r"(-?\d+(?:\.\d+)?)([smh]?)", str(value).strip())
+        if not m:
+            return 300.0
+        seconds = float(m.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[m.group(2)]
+        return float("inf") if seconds < 0 else seconds
+
+    async def _evaluate(self, body: dict) -> None:
+        """Simula carga del modelo y evaluación del prompt (reusa el prefijo común)."""
+        now = time.monotonic()
+        model = body.get("model", "stub")
+        if self._loaded_until.get(model, 0.0) < now:
+            self.loads += 1
+            if self.load_time:
+                await asyncio.sleep(self.load_time)
+        self._loaded_until[model] = time.monotonic() + self._keep_alive_seconds(body.get("keep_alive"))
+
+        full = body.get("system", "") + "\n" + body.get("prompt", "")
+        shared = 0
+        for a, b in zip(full, self._last_prompt):
+            if a != b:
+                break
+            shared += 1
+        self._last_prompt = full
+        total = len(full) // 4  # ~4 caracteres por token
+        evaluated = total - shared // 4
+        self.prompt_tokens += total
+        self.prompt_evaluated += evaluated
+        if self.prompt_delay:
+            await asyncio.sleep(self.prompt_delay * evaluated)
+
+    def _render(self, body: dict) -> str:
+        if callable(self.response):
+            return self.response(body.get("prompt", ""))
+        return self.response
+
+    async def _generate(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        return await self._serve_generation(request, body, ollama=True)
+
+    async def _chat(self, request: web.Request) -> web.StreamResponse:
+        """/v1/chat/completions: mensajes → system + prompt como en Ollama."""
+        body = await request.json()
+        messages = body.get("messages") or []
+        body["system"] = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        body["prompt"] = "\n".join(m.get("content", "") for m in messages if m.get("role") != "system")
+        body.setdefault("stream", False)
+        return await self._serve_generation(request, body, ollama=False)
+
+    async def _serve_generation(self, request: web.Request, body: dict,
+                                ollama: bool) -> web.StreamResponse:
+        self.requests += 1
+        self._track(request)
+        failed = self._fail()
+        if failed is not None:
+            return failed
+        if self._slots is not None:
+            await self._slots.acquire()
+        self._active += 1
+        self.max_parallel = max(self.max_parallel, self._active)
+        try:
+            await self._evaluate(body)
+            delay = self._latency()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            text = self._render(body)
+            if body.get("stream", True):
+                return await self._generate_stream(request, body, text, ollama)
+            words = len(text.split())
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay * words)
+            self.tokens_sent += words
+            model = body.get("model", "stub")
+            if ollama:
+                return web.json_response({"model": model, "response": text, "done": True,
+                                          "eval_count": words})
+            return web.json_response({
+                "object": "chat.completion", "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": text}}],
+                "usage": {"completion_tokens": words},
+            })
+        finally:
+            self._active -= 1
+            if self._slots is not None:
+                self._slots.release()
+
+    async def _generate_stream(self, request: web.Request, body: dict, text: str,
+                               ollama: bool = True) -> web.StreamResponse:
+        """Un chunk por palabra (NDJSON en Ollama, SSE en OpenAI). Se corta si el cliente cierra."""
+        content_type = "application/x-ndjson" if ollama else "text/event-stream"
+        resp = web.StreamResponse(headers={"Content-Type": content_type})
+        await resp.prepare(request)
+        model = body.get("model", "stub")
+        try:
+            for word in text.split(" "):
+                if self.token_delay:
+                    await asyncio.sleep(self.token_delay)
+                if ollama:
+                    chunk = {"model": model, "response": word + " ", "done": False}
+                    await resp.write(json.dumps(chunk).encode() + b"\n")
+                else:
+                    chunk = {"object": "chat.completion.chunk", "model": model,
+                             "choices": [{"index": 0, "delta": {"content": word + " "},
+                                          "finish_reason": None}]}
+                    await resp.write(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+                self.tokens_sent += 1
+            if ollama:
+                await resp.write(json.dumps({"response": "", "done": True}).encode() + b"\n")
+            else:
+                await resp.write(b"data: [DONE]\n\n")
+        except (ConnectionResetError, asyncio.CancelledError):
+            return resp
+        await resp.write_eof()
+        return resp
+
+    async def _props(self, request: web.Request) -> web.Response:
+        """Propiedades estilo llama.cpp server (total_slots)."""
+        self._track(request)
+        return web.json_response({"total_slots": self.slots or 1})
+
+    async def _slot_list(self, request: web.Request) -> web.Response:
+        self._track(request)
+        return web.json_response([{"id": i, "is_processing": i < self._active}
+                                  for i in range(self.slots or 1)])
+
+    async def _embeddings(self, request: web.Request) -> web.Response:
+        """Vector determinístico por texto: palabras hasheadas, normalizado."""
+        body = await request.json()
+        self.embeddings += 1
+        self._track(request)
+        failed = self._fail()
+        if failed is not None:
+            return failed
+        delay = self._latency() / 10  # embeddings son mucho más baratos que generar
+        if delay > 0:
+            await asyncio.sleep(delay)
+        vec = [0.0] * _EMBED_DIM
+        text = body.get("prompt", body.get("input", ""))
+        for word in str(text).lower().split():
+            h = zlib.crc32(word.encode("utf-8"))
+            vec[h % _EMBED_DIM] += 1.0 if h & 0x80000000 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        vec = [v / norm for v in vec]
+        if request.path.startswith("/v1/"):
+            return web.json_response({"object": "list", "data": [{"index": 0, "embedding": vec}]})
+        return web.json_response({"embedding": vec})
+
+    def get_stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "embeddings": self.embeddings,
+            "errors": self.errors,
+            "tokens_sent": self.tokens_sent,
+            "loads": self.loads,
+            "max_parallel": self.max_parallel,
+            "connections": self.connections,
+        }
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self._app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def __aenter__(self) -> StubOllama:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    stub = StubOllama(host=args.host, port=args.port, latency=args.latency,
+                      token_rate=args.token_rate, load_time=args.load_time,
+                      error_rate=args.error_rate, slots=args.slots, seed=args.seed)
+    async with stub:
+        print(f"Stub de Ollama en {stub.url} (Ctrl+C para detener)")
+        try:
+            while True:
+                await asyncio.sleep(3600)
+        finally:
+            print(f"Stats: {stub.get_stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", default="0.5",
+                        help="segundos o distribución: uniform:a,b | lognormal:mediana,sigma | exp:media")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="tokens/s generados (0 = instantáneo)")
+    parser.add_argument("--load-time", type=float, default=0.0, help="carga del modelo (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fracción de requests con 500")
+    parser.add_argument("--slots", type=int, default=0, help="generaciones en paralelo (0 = sin límite)")
+    parser.add_argument("--seed", type=int, default=None)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
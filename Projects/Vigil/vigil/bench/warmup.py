@@ -0,0 +1,109 @@
+"""Benchmark: latencia fría vs caliente del enriquecimiento LLM.
+
+Compara el comportamiento anterior (sin warm-up, preámbulo largo repetido
+en cada prompt, datos del evento sin compactar) contra el actual (warm-up
+al arrancar, keep_alive, SYSTEM_PROMPT como prefijo compartido y datos
+compactados). El stub simula la carga del modelo y la evaluación del
+prompt con reuso del prefijo común.
+
+Uso: python -m vigil.bench.warmup [-n 20] [--load-time 2.0] [--prompt-delay 0.002]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from ..core.config import OllamaConfig
+from ..intelligence.analyzer import SYSTEM_PROMPT, OllamaAnalyzer
+from .coalescing import _alerts
+from .stub_ollama import StubOllama
+
+
+def _legacy_prompt(alert) -> str:
+    """Prompt de una alerta como lo armaba build_prompt antes."""
+    event_data = ""
+    if alert.event and alert.event.data:
+        event_data = "\n".join(f"  - {k}: {v}" for k, v in alert.event.data.items())
+    return f"""Eres un analista de seguridad explicando alertas de un IDS personal en Windows 11.
+
+Alerta detectada:
+- Regla: {alert.rule_id}
+- Severidad: {alert.severity.name}
+- Título: {alert.title}
+- Descripción: {alert.description}
+- Datos del evento:
+{event_data}
+
+Explica en español en 2-3 oraciones:
+1. Qué significa esta alerta para un usuario normal
+2. Si es probablemente benigno o preocupante
+3. Qué acción recomiendas (si alguna)
+
+Sé conciso y directo."""
+
+
+async def _run(args: argparse.Namespace, current: bool) -> dict:
+    alerts = _alerts(args.n)
+    async with StubOllama(latency=args.latency, load_time=args.load_time,
+                          prompt_delay=args.prompt_delay) as stub:
+        config = OllamaConfig(url=stub.url, rate_limit=0, stream=False, cache_path="")
+        analyzer = OllamaAnalyzer(config)
+        try:
+            startup = 0.0
+            if current:
+                start = time.perf_counter()
+                await analyzer.warmup()
+                startup = time.perf_counter() - start
+            base_tokens = stub.prompt_tokens
+            base_evaluated = stub.prompt_evaluated
+
+            latencies = []
+            for alert in alerts:
+                start = time.perf_counter()
+                if current:
+                    await analyzer.client.generate(analyzer.build_prompt(alert), system=SYSTEM_PROMPT)
+                else:
+                    await analyzer.client.generate(_legacy_prompt(alert))
+                latencies.append(time.perf_counter() - start)
+        finally:
+            await analyzer.aclose()
+
+    return {
+        "startup": startup,
+        "cold": latencies[0],
+        "warm": sum(latencies[1:]) / max(1, len(latencies) - 1),
+        "tokens": (stub.prompt_tokens - base_tokens) / len(alerts),
+        "evaluated": (stub.prompt_evaluated - base_evaluated) / len(alerts),
+        "loads": stub.loads,
+    }
+
+
+async def _main(args: argparse.Namespace) -> None:
+    before = await _run(args, current=False)
+    after = await _run(args, current=True)
+
+    print(f"{args.n} alertas, carga de modelo {args.load_time}s, "
+          f"{args.prompt_delay * 1000:.1f} ms/token de prompt, latencia base {args.latency}s")
+    print(f"{'':28}{'antes':>10}{'ahora':>10}")
+    print(f"{'warm-up al arrancar (s)':28}{before['startup']:10.2f}{after['startup']:10.2f}")
+    print(f"{'primera alerta (fría, s)':28}{before['cold']:10.2f}{after['cold']:10.2f}")
+    print(f"{'siguientes (caliente, s)':28}{before['warm']:10.2f}{after['warm']:10.2f}")
+    print(f"{'tokens de prompt/alerta':28}{before['tokens']:10.0f}{after['tokens']:10.0f}")
+    print(f"{'tokens evaluados/alerta':28}{before['evaluated']:10.0f}{after['evaluated']:10.0f}")
+    print(f"{'cargas del modelo':28}{before['loads']:10d}{after['loads']:10d}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=20, help="alertas a enriquecer")
+    parser.add_argument("--load-time", type=float, default=2.0, help="carga del modelo en el stub (s)")
+    parser.add_argument("--prompt-delay", type=float, default=0.002,
+                        help="evaluación de prompt por token en el stub (s)")
+    parser.add_argument("--latency", type=float, default=0.3, help="generación en el stub (s)")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
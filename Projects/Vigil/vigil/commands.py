@@ -0,0 +1,182 @@
+"""Subcomandos de línea de comandos además de `run` (query, import, explain-rules)."""
+
+from __future__ import annotations
+
+import json
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from .core.config import load_config
+from .core.events import Severity
+
+_RELATIVE = re.compile(r"^(\d+)\s*([smhd])$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value: str) -> float:
+    """Acepta tiempos relativos (30m, 2h, 7d) o ISO 8601. Retorna epoch."""
+    match = _RELATIVE.match(value.strip().lower())
+    if match:
+        return time.time() - int(match.group(1)) * _UNITS[match.group(2)]
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"tiempo inválido: {value!r} (usar 30m, 2h, 7d o ISO 8601)")
+
+
+def parse_entity(value: str) -> tuple[str, str]:
+    """Parsea "tipo=valor" (ej: ip=10.0.0.5, pid=4242, process=nc.exe)."""
+    kind, sep, val = value.partition("=")
+    if not sep or not val:
+        raise ValueError(f"entidad inválida: {value!r} (usar tipo=valor)")
+    return kind.strip().lower(), val.strip().lower()
+
+
+def _open_store(args):
+    from .alerts.store import AlertStore
+
+    config = load_config(args.config)
+    if not config.alerts.store_path:
+        print("Store deshabilitado (alerts.store_path vacío en config)", file=sys.stderr)
+        sys.exit(1)
+    return AlertStore(config.alerts.store_path)
+
+
+def _format_row(doc: dict) -> str:
+    ts = doc["timestamp"][:19].replace("T", " ")
+    return f"{ts}  {doc['severity']:<8}  {doc['rule_id']:<8}  {doc['title']}"
+
+
+def cmd_query(args) -> None:
+    """python -m vigil query --since 2h --rule NET002 --severity HIGH"""
+    try:
+        filters = {
+            "since": parse_time(args.since) if args.since else None,
+            "until": parse_time(args.until) if args.until else None,
+            "rule_id": args.rule,
+            "min_severity": Severity[args.severity.upper()] if args.severity else None,
+            "entity": parse_entity(args.entity) if args.entity else None,
+            "incident_id": args.incident,
+        }
+    except (ValueError, KeyError) as e:
+        print(f"Filtro inválido: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    store = _open_store(args)
+    try:
+        if args.all:
+            docs = store.iter_query(limit=500, **filters)
+            cursor = None
+        else:
+            docs, cursor = store.query(limit=args.limit, cursor=args.cursor, **filters)
+
+        count = 0
+        for doc in docs:
+            count += 1
+            if args.json:
+                sys.stdout.write(doc.decode("utf-8") + "\n")
+            else:
+                print(_format_row(json.loads(doc)))
+
+        if not args.json:
+            print(f"-- {count} alertas", file=sys.stderr)
+            if cursor:
+                print(f"-- más resultados: --cursor {cursor}", file=sys.stderr)
+    finally:
+        store.close()
+
+
+def cmd_import(args) -> None:
+    """python -m vigil import alerts.jsonl [otros.jsonl...]"""
+    store = _open_store(args)
+    try:
+        for path in args.files:
+            if not Path(path).exists():
+                print(f"No existe: {path}", file=sys.stderr)
+                continue
+            imported, invalid = store.import_jsonl(path)
+            print(f"{path}: {imported} alertas importadas, {invalid} líneas inválidas")
+        print(f"Total en store: {store.count()}")
+    finally:
+        store.close()
+
+
+def cmd_explain_rules(args) -> None:
+    """python -m vigil explain-rules [--rules reglas.yaml] [--only NET001 FS002] [--force]"""
+    import asyncio
+
+    from .core.rule_engine import RuleEngine
+    from .intelligence.backend import create_backend
+    from .intelligence.explanations import (
+        ExplanationTemplates, explanations_path, generate_templates, save_templates,
+    )
+
+    config = load_config(args.config)
+    rules_path = args.rules or config.rules_path
+    engine = RuleEngine()
+    if not engine.load_rules(rules_path):
+        print(f"No se cargaron reglas de {rules_path}", file=sys.stderr)
+        sys.exit(1)
+    output = Path(args.output) if args.output else explanations_path(rules_path)
+
+    # Conservar los templates vigentes; regenerar solo los que faltan o cambiaron
+    existing = ExplanationTemplates.load(output, engine.rules).templates
+    targets = [
+        rule for rule in engine.rules
+        if (not args.only or rule.id in args.only) and (args.force or rule.id not in existing)
+    ]
+    if not targets:
+        print(f"Todas las reglas tienen explicación vigente en {output}")
+        return
+
+    def report(rule, template, reason) -> None:
+        if template is not None:
+            print(f"  {rule.id:<8} {template}")
+        else:
+            print(f"  {rule.id:<8} descartada ({reason})", file=sys.stderr)
+
+    async def generate() -> dict[str, str]:
+        backend = create_backend(config.ollama)
+        try:
+            if not await backend.is_available():
+                print(f"Backend LLM no disponible en {config.ollama.url}", file=sys.stderr)
+                sys.exit(1)
+            return await generate_templates(backend, targets, on_result=report)
+        finally:
+            await backend.aclose()
+
+    print(f"Generando explicaciones para {len(targets)} reglas con {config.ollama.model}...")
+    generated = asyncio.run(generate())
+    save_templates(output, engine.rules, {**existing, **generated}, config.ollama.model)
+    print(f"{len(generated)}/{len(targets)} generadas, {len(existing) + len(generated)} en {output}")
+
+
+def add_subcommands(subparsers) -> None:
+    """Registra query, import y explain-rules en el parser principal."""
+    query = subparsers.add_parser("query", help="Consultar el store de alertas")
+    query.add_argument("--since", help="Desde (30m, 2h, 7d o ISO 8601)")
+    query.add_argument("--until", help="Hasta (30m, 2h, 7d o ISO 8601)")
+    query.add_argument("--rule", help="rule_id exacto (ej: NET002)")
+    query.add_argument("--severity", help="Severidad mínima (LOW, MEDIUM, HIGH, CRITICAL)")
+    query.add_argument("--entity", help="Entidad tipo=valor (pid, process, ip, path)")
+    query.add_argument("--incident", help="incident_id")
+    query.add_argument("--limit", type=int, default=50, help="Alertas por página (default: 50)")
+    query.add_argument("--cursor", help="Cursor de la página siguiente")
+    query.add_argument("--all", action="store_true", help="Recorrer todas las páginas")
+    query.add_argument("--json", action="store_true", help="Salida JSONL cruda")
+    query.set_defaults(func=cmd_query)
+
+    imp = subparsers.add_parser("import", help="Backfill del store desde archivos JSONL")
+    imp.add_argument("files", nargs="+", help="Archivos alerts.jsonl")
+    imp.set_defaults(func=cmd_import)
+
+    explain = subparsers.add_parser("explain-rules",
+                                    help="Precomputar explicaciones por regla con el LLM")
+    explain.add_argument("--rules", help="Archivo de reglas (default: rules_path de la config)")
+    explain.add_argument("--output", help="Destino (default: <reglas>.explanations.yaml)")
+    explain.add_argument("--only", nargs="+", metavar="RULE_ID", help="Solo estas reglas")
+    explain.add_argument("--force", action="store_true", help="Regenerar aunque estén vigentes")
+    explain.set_defaults(func=cmd_explain_rules)
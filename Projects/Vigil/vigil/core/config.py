@@ -16,19 +16,69 @@ class MonitorConfig:
 
 @dataclass
 class OllamaConfig:
+    backend: str = "ollama"       # ollama | openai (llama.cpp server, vLLM, LM Studio)
     url: str = "http://localhost:11434"
     model: str = "phi3"
+    api_key: str = ""             # Bearer token para backends openai
+    slots: int = 0                # requests paralelas del servidor (0 = descubrir)
     timeout: int = 30
     min_severity: str = "MEDIUM"  # severidad mínima para enriquecer con LLM
-    rate_limit: float = 2.0       # segundos entre llamadas
+    rate_limit: float = 2.0       # segundos entre llamadas (token bucket del scheduler)
+    burst: int = 1                # llamadas seguidas permitidas sin esperar rate_limit
+    max_concurrency: int = 2      # tope de requests en vuelo (AIMD arranca en 1)
+    target_latency: float = 20.0  # latencia por encima de la cual se reduce concurrencia
+    queue_deadline: float = 120.0  # LOW/MEDIUM en cola más de esto se descartan
+    max_queue: int = 200
+    breaker_failures: int = 3     # fallos seguidos que abren el circuito
+    breaker_probe_min: float = 5.0  # primer health check con el circuito abierto
+    breaker_probe_max: float = 300.0
+    connect_timeout: float = 3.0  # timeout de conexión (timeout = lectura)
+    max_connections: int = 4      # pool HTTP persistente
+    max_keepalive: int = 2        # conexiones ociosas reutilizables
+    keepalive_expiry: float = 60.0  # segundos antes de cerrar una conexión ociosa
+    keep_alive: str | int = "30m"  # tiempo que Ollama mantiene el modelo cargado (-1 = siempre)
+    warmup: bool = True           # cargar el modelo al arrancar
+    max_field_chars: int = 200    # truncar valores largos del evento en el prompt
+    stream: bool = True           # leer tokens en streaming y publicar parciales
+    max_sentences: int = 3        # cortar la generación al completar N oraciones (0 = sin corte)
+    cache_ttl: int = 600          # TTL del cache en memoria
+    cache_size: int = 200         # entradas en memoria (LRU)
+    cache_path: str = "llm_cache.db"  # tier en disco ("" = solo memoria)
+    cache_disk_ttl: int = 604800  # 7 días
+    cache_disk_max_entries: int = 5000
+    semantic_cache: bool = False  # reusar explicaciones de alertas casi iguales
+    semantic_embedder: str = "hashing"  # hashing (local) u ollama
+    embed_model: str = "nomic-embed-text"
+    semantic_threshold: float = 0.92  # similitud coseno mínima
+    semantic_max_entries: int = 2000
+    explanations: bool = True     # usar explicaciones precomputadas (explain-rules)
+    live_min_severity: str = "CRITICAL"  # desde esta severidad siempre LLM en vivo
+    batch_size: int = 1           # alertas por prompt combinado (1 = sin batching)
+    batch_window: float = 2.0     # segundos que se espera juntando alertas
+
+
+@dataclass
+class SinkConfig:
+    type: str                     # jsonl, toast, syslog, webhook, stream
+    options: dict = field(default_factory=dict)  # parámetros propios del sink
+    queue_size: int = 1000        # alertas en cola antes de descartar
+    batch_size: int = 1           # máximo de alertas por entrega
+    flush_interval: float = 1.0   # segundos máximos esperando completar un batch
+    max_retries: int = 3
+    retry_backoff: float = 1.0    # backoff inicial (se duplica en cada retry)
+    max_backoff: float = 30.0
 
 
 @dataclass
 class AlertConfig:
     log_file: str = "alerts.jsonl"
+    store_path: str = "alerts.db"  # store SQLite indexado ("" = deshabilitado)
     toast_enabled: bool = True
     dedup_window: int = 300       # segundos para considerar duplicado
     throttle_per_rule: int = 60   # mínimo segundos entre alertas de la misma regla
+    incident_window: int = 300    # segundos de inactividad antes de cerrar un incidente
+    max_incidents: int = 1000     # incidentes abiertos en memoria
+    sinks: list[SinkConfig] = field(default_factory=list)  # sinks extra además de log + toast
 
 
 @dataclass
@@ -38,6 +88,38 @@ class DashboardConfig:
     port: int = 8080
 
 
+@dataclass
+class RollupConfig:
+    enabled: bool = True
+    path: str = "rollups.npz"     # persistencia de contadores ("" = solo memoria)
+    persist_interval: int = 60    # segundos entre guardados
+
+
+@dataclass
+class SlowScanConfig:
+    enabled: bool = True
+    max_sources: int = 1024       # IPs seguidas con HyperLogLog (memoria fija, LRU)
+    promote_after: int = 4        # puertos distintos antes de seguir una IP
+    thresholds: dict = field(default_factory=dict)  # override por horizonte: {"6h": 80}
+
+
+@dataclass
+class ConnStateConfig:
+    enabled: bool = True
+    alpha: float = 0.1            # peso de cada snapshot en el baseline EWMA
+    sigma: float = 4.0            # desvíos sobre la media para considerar pico
+    warmup: int = 8               # polls de aprendizaje antes de alertar
+    min_counts: dict = field(default_factory=dict)  # override por estado: {"SYN_RECEIVED": 10}
+    max_keys: int = 5000          # baselines por puerto / por IP remota
+
+
+@dataclass
+class SamplerConfig:
+    enabled: bool = False         # hilo de muestreo sub-segundo (requiere backend nativo)
+    interval: float = 0.25        # segundos entre muestras
+    capacity: int = 65536         # cambios en el ring buffer antes de pisar los más viejos
+
+
 @dataclass
 class VigilConfig:
     monitors: dict[str, MonitorConfig] = field(default_factory=dict)
@@ -46,7 +128,13 @@ class VigilConfig:
     rules_path: str = ""
     watched_paths: list[str] = field(default_factory=list)
     trusted_processes: list[str] = field(default_factory=list)
+    snapshot_ttl: float = 5.0     # reuso del snapshot de netstat entre monitors de red
+    collector: str = "auto"       # fuente de conexiones/procesos: auto | windows | procfs
     dashboard: DashboardConfig = field(default_factory=DashboardConfig)
+    rollups: RollupConfig = field(default_factory=RollupConfig)
+    slow_scan: SlowScanConfig = field(default_factory=SlowScanConfig)
+    conn_states: ConnStateConfig = field(default_factory=ConnStateConfig)
+    sampler: SamplerConfig = field(default_factory=SamplerConfig)
 
 
 _MONITOR_DEFAULTS = {
@@ -58,6 +146,19 @@ _MONITOR_DEFAULTS = {
 }
 
 
+_SINK_FIELDS = ("queue_size", "batch_size", "flush_interval",
+                "max_retries", "retry_backoff", "max_backoff")
+
+
+def _load_sink(raw: dict) -> SinkConfig:
+    """Separa los campos de cola/retry de las opciones propias del sink."""
+    raw = dict(raw)
+    sink_type = raw.pop("type")
+    raw.pop("enabled", None)
+    kwargs = {k: raw.pop(k) for k in _SINK_FIELDS if k in raw}
+    return SinkConfig(type=sink_type, options=raw, **kwargs)
+
+
 def load_config(path: Path) -> VigilConfig:
     """Carga config.yaml y retorna VigilConfig con defaults sensatos."""
     raw: dict = {}
@@ -77,20 +178,58 @@ def load_config(path: Path) -> VigilConfig:
     # Ollama
     raw_ollama = raw.get("ollama", {})
     ollama = OllamaConfig(
+        backend=raw_ollama.get("backend", OllamaConfig.backend),
         url=raw_ollama.get("url", OllamaConfig.url),
         model=raw_ollama.get("model", OllamaConfig.model),
+        api_key=raw_ollama.get("api_key", OllamaConfig.api_key),
+        slots=raw_ollama.get("slots", OllamaConfig.slots),
         timeout=raw_ollama.get("timeout", OllamaConfig.timeout),
         min_severity=raw_ollama.get("min_severity", OllamaConfig.min_severity),
         rate_limit=raw_ollama.get("rate_limit", OllamaConfig.rate_limit),
+        burst=raw_ollama.get("burst", OllamaConfig.burst),
+        max_concurrency=raw_ollama.get("max_concurrency", OllamaConfig.max_concurrency),
+        target_latency=raw_ollama.get("target_latency", OllamaConfig.target_latency),
+        queue_deadline=raw_ollama.get("queue_deadline", OllamaConfig.queue_deadline),
+        max_queue=raw_ollama.get("max_queue", OllamaConfig.max_queue),
+        breaker_failures=raw_ollama.get("breaker_failures", OllamaConfig.breaker_failures),
+        breaker_probe_min=raw_ollama.get("breaker_probe_min", OllamaConfig.breaker_probe_min),
+        breaker_probe_max=raw_ollama.get("breaker_probe_max", OllamaConfig.breaker_probe_max),
+        connect_timeout=raw_ollama.get("connect_timeout", OllamaConfig.connect_timeout),
+        max_connections=raw_ollama.get("max_connections", OllamaConfig.max_connections),
+        max_keepalive=raw_ollama.get("max_keepalive", OllamaConfig.max_keepalive),
+        keepalive_expiry=raw_ollama.get("keepalive_expiry", OllamaConfig.keepalive_expiry),
+        keep_alive=raw_ollama.get("keep_alive", OllamaConfig.keep_alive),
+        warmup=raw_ollama.get("warmup", OllamaConfig.warmup),
+        max_field_chars=raw_ollama.get("max_field_chars", OllamaConfig.max_field_chars),
+        stream=raw_ollama.get("stream", OllamaConfig.stream),
+        max_sentences=raw_ollama.get("max_sentences", OllamaConfig.max_sentences),
+        cache_ttl=raw_ollama.get("cache_ttl", OllamaConfig.cache_ttl),
+        cache_size=raw_ollama.get("cache_size", OllamaConfig.cache_size),
+        cache_path=raw_ollama.get("cache_path", OllamaConfig.cache_path),
+        cache_disk_ttl=raw_ollama.get("cache_disk_ttl", OllamaConfig.cache_disk_ttl),
+        cache_disk_max_entries=raw_ollama.get("cache_disk_max_entries", OllamaConfig.cache_disk_max_entries),
+        semantic_cache=raw_ollama.get("semantic_cache", OllamaConfig.semantic_cache),
+        semantic_embedder=raw_ollama.get("semantic_embedder", OllamaConfig.semantic_embedder),
+        embed_model=raw_ollama.get("embed_model", OllamaConfig.embed_model),
+        semantic_threshold=raw_ollama.get("semantic_threshold", OllamaConfig.semantic_threshold),
+        semantic_max_entries=raw_ollama.get("semantic_max_entries", OllamaConfig.semantic_max_entries),
+        explanations=raw_ollama.get("explanations", OllamaConfig.explanations),
+        live_min_severity=raw_ollama.get("live_min_severity", OllamaConfig.live_min_severity),
+        batch_size=raw_ollama.get("batch_size", OllamaConfig.batch_size),
+        batch_window=raw_ollama.get("batch_window", OllamaConfig.batch_window),
     )
 
     # Alerts
     raw_alerts = raw.get("alerts", {})
     alerts = AlertConfig(
         log_file=raw_alerts.get("log_file", AlertConfig.log_file),
+        store_path=raw_alerts.get("store_path", AlertConfig.store_path),
         toast_enabled=raw_alerts.get("toast_enabled", AlertConfig.toast_enabled),
         dedup_window=raw_alerts.get("dedup_window", AlertConfig.dedup_window),
         throttle_per_rule=raw_alerts.get("throttle_per_rule", AlertConfig.throttle_per_rule),
+        incident_window=raw_alerts.get("incident_window", AlertConfig.incident_window),
+        max_incidents=raw_alerts.get("max_incidents", AlertConfig.max_incidents),
+        sinks=[_load_sink(s) for s in raw_alerts.get("sinks", []) if s.get("enabled", True)],
     )
 
     # Rules path
@@ -117,6 +256,39 @@ def load_config(path: Path) -> VigilConfig:
         port=raw_dashboard.get("port", DashboardConfig.port),
     )
 
+    # Rollups (series temporales)
+    raw_rollups = raw.get("rollups", {})
+    rollups = RollupConfig(
+        enabled=raw_rollups.get("enabled", RollupConfig.enabled),
+        path=raw_rollups.get("path", RollupConfig.path),
+        persist_interval=raw_rollups.get("persist_interval", RollupConfig.persist_interval),
+    )
+
+    raw_slow = raw.get("slow_scan", {})
+    slow_scan = SlowScanConfig(
+        enabled=raw_slow.get("enabled", SlowScanConfig.enabled),
+        max_sources=raw_slow.get("max_sources", SlowScanConfig.max_sources),
+        promote_after=raw_slow.get("promote_after", SlowScanConfig.promote_after),
+        thresholds=raw_slow.get("thresholds") or {},
+    )
+
+    raw_states = raw.get("conn_states", {})
+    conn_states = ConnStateConfig(
+        enabled=raw_states.get("enabled", ConnStateConfig.enabled),
+        alpha=raw_states.get("alpha", ConnStateConfig.alpha),
+        sigma=raw_states.get("sigma", ConnStateConfig.sigma),
+        warmup=raw_states.get("warmup", ConnStateConfig.warmup),
+        min_counts=raw_states.get("min_counts") or {},
+        max_keys=raw_states.get("max_keys", ConnStateConfig.max_keys),
+    )
+
+    raw_sampler = raw.get("sampler", {})
+    sampler = SamplerConfig(
+        enabled=raw_sampler.get("enabled", SamplerConfig.enabled),
+        interval=raw_sampler.get("interval", SamplerConfig.interval),
+        capacity=raw_sampler.get("capacity", SamplerConfig.capacity),
+    )
+
     return VigilConfig(
         monitors=monitors,
         ollama=ollama,
@@ -124,5 +296,11 @@ def load_config(path: Path) -> VigilConfig:
         rules_path=rules_path,
         watched_paths=watched_paths,
         trusted_processes=trusted_processes,
+        snapshot_ttl=raw.get("snapshot_ttl", VigilConfig.snapshot_ttl),
+        collector=raw.get("collector", VigilConfig.collector),
         dashboard=dashboard,
+        rollups=rollups,
+        slow_scan=slow_scan,
+        conn_states=conn_states,
+        sampler=sampler,
     )
@@ -0,0 +1,55 @@
+"""Serialización JSON compartida: cada alerta/evento se codifica a bytes una vez.
+
+Usa orjson si está instalado (detectado al importar), sino json de stdlib.
+Ambos backends producen UTF-8 sin escapar (equivalente a ensure_ascii=False).
+"""
+
+from __future__ import annotations
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+if orjson is not None:
+    _ORJSON_OPTS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj) -> bytes:
+        """Serializa obj a JSON UTF-8."""
+        return orjson.dumps(obj, default=str, option=_ORJSON_OPTS)
+
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, default=str)
+
+    def dumps(obj) -> bytes:
+        """Serializa obj a JSON UTF-8."""
+        return _encoder.encode(obj).encode("utf-8")
+
+
+def envelope(msg_type: str, data: bytes) -> bytes:
+    """Arma {"type": msg_type, "data": <data>} sin re-serializar data."""
+    return b'{"type":' + dumps(msg_type) + b',"data":' + data + b"}"
+
+
+def json_array(items: list[bytes]) -> bytes:
+    """Une documentos JSON ya codificados en un array JSON."""
+    return b"[" + b",".join(items) + b"]"
+
+
+def merge_object(obj: bytes, fields: dict[str, bytes]) -> bytes:
+    """Agrega campos ya codificados a un objeto JSON codificado.
+
+    Se usa para el snapshot del dashboard: el estado del engine se codifica
+    normal y las listas de alertas/eventos recientes se reutilizan tal cual.
+    """
+    extra = b",".join(dumps(k) + b":" + v for k, v in fields.items())
+    if not extra:
+        return obj
+    if obj == b"{}":
+        return b"{" + extra + b"}"
+    return obj[:-1] + b"," + extra + b"}"
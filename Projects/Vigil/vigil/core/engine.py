@@ -7,18 +7,26 @@ import os
 import signal
 from datetime import datetime
 from pathlib import Path
+from typing import Callable
 
 from .config import VigilConfig, load_config
 from .events import SecurityEvent
 from .logger import get_logger, setup_logging
 from .privilege import check_privileges
+from .rollups import RollupEngine
 from .rule_engine import RuleEngine
 from ..alerts.pipeline import AlertPipeline
 from ..intelligence.analyzer import OllamaAnalyzer
+from ..intelligence.explanations import ExplanationTemplates, explanations_path
+from ..monitors.collectors import create_collector
+from ..monitors.connections import ConnectionSnapshotProvider
+from ..monitors.connstate import ConnStateDetector
 from ..monitors.network import NetworkMonitor
 from ..monitors.portscan import PortScanDetector
 from ..monitors.eventlog import EventLogMonitor
 from ..monitors.process import ProcessMonitor
+from ..monitors.sampler import ConnectionSampler
+from ..monitors.sketches import SlowScanTracker
 from ..monitors.filesystem import FileSystemMonitor
 
 log = get_logger("engine")
@@ -41,13 +49,19 @@ class VigilEngine:
         self.config: VigilConfig | None = None
         self.rule_engine = RuleEngine()
         self.pipeline: AlertPipeline | None = None
+        self.analyzer: OllamaAnalyzer | None = None
         self.monitors: list = []
         self._tasks: list[asyncio.Task] = []
         self._running = False
         self._event_count = 0
         self._alert_count = 0
         self._dashboard = None
+        self.rollups: RollupEngine | None = None
+        self.snapshots: ConnectionSnapshotProvider | None = None
+        self.sampler: ConnectionSampler | None = None
         self._start_time: datetime | None = None
+        # Se llama con el estado del breaker tras el chequeo inicial del LLM (banner)
+        self.on_llm_status: Callable[[str], None] | None = None
 
     def setup(self) -> dict:
         """Inicializa todos los componentes. Retorna status dict para el banner."""
@@ -65,30 +79,76 @@ class VigilEngine:
         # Reglas
         rules_count = self.rule_engine.load_rules(self.config.rules_path)
 
+        # Rollups (series temporales)
+        if self.config.rollups.enabled:
+            self.rollups = RollupEngine(self.config.rollups.path or None)
+            self.rollups.load()
+
         # Pipeline + LLM enricher
-        analyzer = OllamaAnalyzer(self.config.ollama)
-        self.pipeline = AlertPipeline(self.config.alerts, enricher=analyzer)
+        explanations = None
+        if self.config.ollama.explanations:
+            explanations = ExplanationTemplates.load(explanations_path(self.config.rules_path),
+                                                     self.rule_engine.rules)
+        self.analyzer = OllamaAnalyzer(self.config.ollama,
+                                       key_templates=self.rule_engine.cache_key_templates(),
+                                       explanations=explanations)
+        self.pipeline = AlertPipeline(self.config.alerts, enricher=self.analyzer)
 
         # Monitors
         monitors_cfg = self.config.monitors
         monitors_status = {}
+        # Una sola fuente de estado del sistema y una sola tabla de conexiones
+        # para todos los monitors de red
+        collector = create_collector(self.config.collector)
+        sampler_cfg = self.config.sampler
+        if sampler_cfg.enabled:
+            if collector.can_sample:
+                self.sampler = ConnectionSampler(collector, interval=sampler_cfg.interval,
+                                                 capacity=sampler_cfg.capacity)
+            else:
+                log.warning("Sampler deshabilitado: el collector %s no tiene lectura nativa",
+                            collector.name)
+        self.snapshots = ConnectionSnapshotProvider(ttl=self.config.snapshot_ttl,
+                                                    collector=collector,
+                                                    sampler=self.sampler)
 
         if monitors_cfg.get("network") and monitors_cfg["network"].enabled:
             ignored_ports = set()
             if self.config.dashboard.enabled:
                 ignored_ports.add(self.config.dashboard.port)
+            states_cfg = self.config.conn_states
+            state_detector = None
+            if states_cfg.enabled:
+                state_detector = ConnStateDetector(alpha=states_cfg.alpha,
+                                                   sigma=states_cfg.sigma,
+                                                   warmup=states_cfg.warmup,
+                                                   min_counts=states_cfg.min_counts,
+                                                   max_keys=states_cfg.max_keys)
             self.monitors.append(NetworkMonitor(
                 interval=monitors_cfg["network"].interval,
                 trusted_processes=self.config.trusted_processes,
                 ignored_ports=ignored_ports,
+                snapshots=self.snapshots,
+                collector=collector,
+                state_detector=state_detector,
+                changes=self.sampler.reader("network") if self.sampler else None,
             ))
             monitors_status["network"] = "ON"
         else:
             monitors_status["network"] = "OFF"
 
         if monitors_cfg.get("portscan") and monitors_cfg["portscan"].enabled:
+            slow_cfg = self.config.slow_scan
+            slow_scan = None
+            if slow_cfg.enabled:
+                slow_scan = SlowScanTracker(max_sources=slow_cfg.max_sources,
+                                            promote_after=slow_cfg.promote_after,
+                                            thresholds=slow_cfg.thresholds)
             self.monitors.append(PortScanDetector(
                 interval=monitors_cfg["portscan"].interval,
+                snapshots=self.snapshots,
+                slow_scan=slow_scan,
+                changes=self.sampler.reader("portscan") if self.sampler else None,
             ))
             monitors_status["portscan"] = "ON"
         else:
@@ -110,6 +170,7 @@ class VigilEngine:
             self.monitors.append(ProcessMonitor(
                 interval=monitors_cfg["process"].interval,
                 trusted_processes=self.config.trusted_processes,
+                collector=collector,
             ))
             monitors_status["process"] = "ON"
         else:
@@ -132,6 +193,9 @@ class VigilEngine:
                 port=self.config.dashboard.port,
                 engine=self,
             )
+            # El pipeline publica la alerta antes del LLM y luego la explicación en vivo
+            self.pipeline.on_alert = self._dashboard.broadcast_alert
+            self.pipeline.on_update = self._dashboard.broadcast_alert_update
 
         return {
             "is_admin": priv.is_admin,
@@ -141,14 +205,24 @@ class VigilEngine:
             "toast": self.config.alerts.toast_enabled,
             "ollama_url": self.config.ollama.url,
             "ollama_model": self.config.ollama.model,
+            "llm_backend": self.config.ollama.backend,
             "dashboard_url": f"http://{self.config.dashboard.host}:{self.config.dashboard.port}"
                 if self.config.dashboard.enabled else None,
         }
 
+    async def _check_ollama(self) -> None:
+        """Chequeo inicial del backend LLM: si no responde, arranca con el circuito abierto."""
+        if not await self.analyzer.client.is_available(timeout=self.config.ollama.connect_timeout):
+            log.warning("Ollama no responde en %s; enriquecimiento en pausa hasta que vuelva",
+                        self.config.ollama.url)
+            self.analyzer.breaker.trip()
+
     async def _on_event(self, event: SecurityEvent) -> None:
         """Callback invocado por cada monitor cuando genera un evento."""
         self._event_count += 1
         log.debug("Evento [%s] %s: %s", event.source, event.event_type, event.event_id)
+        if self.rollups:
+            self.rollups.record_event(event)
 
         # Push al dashboard (fire-and-forget)
         if self._dashboard:
@@ -162,8 +236,8 @@ class VigilEngine:
             emitted = await self.pipeline.process(alert)
             if emitted:
                 self._alert_count += 1
-                if self._dashboard:
-                    self._dashboard.broadcast_alert(alert)
+                if self.rollups:
+                    self.rollups.record_alert(alert)
 
     def get_snapshot(self) -> dict:
         """Estado completo para nuevos clientes del dashboard."""
@@ -175,6 +249,15 @@ class VigilEngine:
                 "uptime_seconds": (datetime.now() - self._start_time).total_seconds()
                     if self._start_time else 0,
             },
+            "sinks": self.pipeline.get_stats() if self.pipeline else {},
+            "incidents": self.pipeline.incidents.get_stats() if self.pipeline else {},
+            "llm_cache": self.analyzer.cache_stats() if self.analyzer else {},
+            "llm_scheduler": self.analyzer.scheduler.get_stats() if self.analyzer else {},
+            "llm_batching": self.analyzer.batcher.get_stats()
+                if self.analyzer and self.analyzer.batcher else {},
+            "llm_breaker": self.analyzer.breaker.get_stats() if self.analyzer else {},
+            "net_snapshots": self.snapshots.get_stats() if self.snapshots else {},
+            "conn_sampler": self.sampler.get_stats() if self.sampler else {},
         }
         for monitor in self.monitors:
             snapshot["monitors"][monitor.name] = {
@@ -198,6 +281,24 @@ class VigilEngine:
                 # Windows no soporta add_signal_handler para todos los signals
                 pass
 
+        # Workers de sinks de alertas
+        await self.pipeline.start()
+
+        # Chequeo inicial del LLM; si no responde, el breaker abre y lanza el probe
+        await self._check_ollama()
+        if self.on_llm_status:
+            self.on_llm_status(self.analyzer.breaker.get_stats()["state"])
+        # Slots paralelos del backend + warm-up del modelo
+        self._tasks.append(asyncio.create_task(
+            self.analyzer.prepare(warmup=self.config.ollama.warmup), name="llm-prepare"))
+
+        # Persistencia periódica de rollups
+        if self.rollups and self.rollups.path:
+            self._tasks.append(asyncio.create_task(
+                self._persist_rollups(),
+                name="rollups-persist",
+            ))
+
         # Dashboard
         if self._dashboard:
             task = asyncio.create_task(
@@ -206,6 +307,10 @@ class VigilEngine:
             )
             self._tasks.append(task)
 
+        # Muestreo sub-segundo de conexiones (hilo propio)
+        if self.sampler:
+            self.sampler.start()
+
         log.info("Iniciando %d monitors...", len(self.monitors))
 
         # Lanzar cada monitor como task
@@ -225,6 +330,18 @@ class VigilEngine:
         finally:
             await self._shutdown()
 
+    async def _persist_rollups(self) -> None:
+        """Guarda los rollups a disco cada persist_interval segundos."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.config.rollups.persist_interval)
+            try:
+                # Copia en el loop (que sigue sumando); el executor sólo escribe
+                arrays = self.rollups.snapshot()
+                await loop.run_in_executor(None, self.rollups.write, arrays)
+            except Exception as e:
+                log.warning("Error guardando rollups: %s", e)
+
     def _request_shutdown(self) -> None:
         """Solicita shutdown graceful."""
         log.info("Shutdown solicitado...")
@@ -241,6 +358,8 @@ class VigilEngine:
         # Parar cada monitor
         for monitor in self.monitors:
             monitor.stop()
+        if self.sampler:
+            self.sampler.stop()
 
         # Cancelar tasks pendientes
         for task in self._tasks:
@@ -251,6 +370,18 @@ class VigilEngine:
         if self._tasks:
             await asyncio.gather(*self._tasks, return_exceptions=True)
 
+        # Vaciar colas de sinks (después de parar monitors: no entran más alertas)
+        await self.pipeline.stop()
+
+        # Cerrar pool HTTP del LLM
+        await self.analyzer.aclose()
+
+        if self.rollups:
+            try:
+                self.rollups.save()
+            except Exception as e:
+                log.warning("Error guardando rollups: %s", e)
+
         self._tasks.clear()
         log.info(
             "Vigil detenido. Eventos procesados: %d, Alertas emitidas: %d",
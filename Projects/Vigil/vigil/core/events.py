@@ -7,6 +7,8 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from enum import IntEnum
 
+from .encoding import dumps
+
 
 class Severity(IntEnum):
     """Nivel de severidad. IntEnum permite comparaciones directas (LOW < HIGH)."""
@@ -28,11 +30,35 @@ class SecurityEvent:
     data: dict           # payload libre del monitor
     timestamp: datetime = field(default_factory=datetime.now)
     event_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    _encoded: bytes | None = field(default=None, init=False, repr=False, compare=False)
 
     def get(self, key: str, default=None):
         """Acceso rápido a data[key] para las reglas."""
         return self.data.get(key, default)
 
+    def to_dict(self) -> dict:
+        """Serializa para JSON (dashboard, JSONL)."""
+        return {
+            "source": self.source,
+            "event_type": self.event_type,
+            "data": self.data,
+            "event_id": self.event_id,
+            "timestamp": self.timestamp.isoformat(),
+        }
+
+    def to_json(self) -> bytes:
+        """JSON UTF-8 cacheado: se codifica una sola vez por evento.
+
+        Si data se modifica después, llamar a invalidate() para recodificar.
+        """
+        if self._encoded is None:
+            self._encoded = dumps(self.to_dict())
+        return self._encoded
+
+    def invalidate(self) -> None:
+        """Descarta la codificación cacheada del evento."""
+        self._encoded = None
+
 
 @dataclass
 class Alert:
@@ -43,11 +69,14 @@ class Alert:
     description: str
     event: SecurityEvent
     llm_explanation: str | None = None
+    incident_id: str | None = None  # asignado por IncidentAggregator
+    merged_incidents: list[str] = field(default_factory=list)  # ids que esta alerta unió
     alert_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
     timestamp: datetime = field(default_factory=datetime.now)
+    _encoded: bytes | None = field(default=None, init=False, repr=False, compare=False)
 
-    def to_dict(self) -> dict:
-        """Serializa para JSONL."""
+    def _header(self) -> dict:
+        """Campos propios de la alerta (sin el evento)."""
         return {
             "alert_id": self.alert_id,
             "rule_id": self.rule_id,
@@ -55,12 +84,35 @@ class Alert:
             "title": self.title,
             "description": self.description,
             "llm_explanation": self.llm_explanation,
+            "incident_id": self.incident_id,
+            **({"merged_incidents": self.merged_incidents} if self.merged_incidents else {}),
             "timestamp": self.timestamp.isoformat(),
-            "event": {
-                "source": self.event.source,
-                "event_type": self.event.event_type,
-                "data": self.event.data,
-                "event_id": self.event.event_id,
-                "timestamp": self.event.timestamp.isoformat(),
-            },
         }
+
+    def to_dict(self) -> dict:
+        """Serializa para JSONL."""
+        d = self._header()
+        d["event"] = self.event.to_dict() if self.event else None
+        return d
+
+    def to_json(self) -> bytes:
+        """JSON UTF-8 cacheado, compartido por log, dashboard y sinks.
+
+        Se codifica la primera vez que alguien lo pide (después del
+        enriquecimiento). Si la alerta se modifica luego, llamar a
+        invalidate() para recodificar.
+        """
+        if self._encoded is None:
+            body = dumps(self._header())
+            # Reutilizar los bytes ya codificados del evento
+            event = self.event.to_json() if self.event else b"null"
+            self._encoded = body[:-1] + b',"event":' + event + b"}"
+        return self._encoded
+
+    def invalidate(self) -> None:
+        """Descarta la codificación cacheada de la alerta (ej: llegó llm_explanation).
+
+        Los bytes del evento se conservan; si se modificó event.data, llamar
+        también a event.invalidate().
+        """
+        self._encoded = None
@@ -0,0 +1,197 @@
+"""Rollups de series temporales pre-agregadas para eventos y alertas.
+
+Mantiene contadores por minuto y por hora en ring buffers de tamaño fijo
+(matrices NumPy series × slots). Cada evento/alerta suma 1 en la columna
+del bucket actual de cada serie que le corresponde:
+
+- events.total, events.source:<x>, events.event_type:<x>
+- alerts.total, alerts.rule_id:<x>, alerts.severity:<x>
+
+Leer una serie es un slice + reshape/sum (downsampling), así que el costo
+de un gráfico no depende de cuánta historia haya. Las matrices se
+persisten periódicamente a un .npz para sobrevivir reinicios.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from .events import Alert, SecurityEvent
+from .logger import get_logger
+
+log = get_logger("rollups")
+
+_OTHER = "_other"  # serie que absorbe claves nuevas cuando se llena la tabla
+
+
+@dataclass(frozen=True)
+class Resolution:
+    name: str
+    seconds: int
+    slots: int
+
+
+RESOLUTIONS = (
+    Resolution("minute", 60, 1440),   # 24 horas
+    Resolution("hour", 3600, 720),    # 30 días
+)
+
+
+class _Ring:
+    """Matriz (series × slots) indexada por bucket = ts // seconds."""
+
+    def __init__(self, res: Resolution, max_series: int):
+        self.res = res
+        self.counts = np.zeros((max_series, res.slots), dtype=np.int64)
+        self.head = -1  # último bucket escrito
+
+    def advance(self, bucket: int) -> None:
+        """Pone en cero los slots de los buckets salteados hasta `bucket`."""
+        if bucket <= self.head:
+            return
+        if self.head < 0 or bucket - self.head >= self.res.slots:
+            self.counts[:] = 0
+        else:
+            cols = np.arange(self.head + 1, bucket + 1) % self.res.slots
+            self.counts[:, cols] = 0
+        self.head = bucket
+
+    def window(self, row: int, buckets: int, now_bucket: int) -> np.ndarray:
+        """Últimos `buckets` valores de una fila, del más viejo al más nuevo."""
+        buckets = min(buckets, self.res.slots)
+        idx = np.arange(now_bucket - buckets + 1, now_bucket + 1)
+        values = self.counts[row, idx % self.res.slots]
+        # Buckets fuera de lo escrito (futuro respecto a head o muy viejos) = 0
+        stale = (idx > self.head) | (idx <= self.head - self.res.slots)
+        values[stale] = 0
+        return values
+
+
+class RollupEngine:
+    """Contadores por minuto/hora con series por dimensión."""
+
+    def __init__(self, path: str | Path | None = None, max_series: int = 256):
+        self.path = Path(path) if path else None
+        self.max_series = max_series
+        self._index: dict[str, int] = {}
+        self._rows: dict[tuple[str, ...], np.ndarray] = {}  # cache claves -> filas
+        self._rings = {res.name: _Ring(res, max_series) for res in RESOLUTIONS}
+
+    def _row(self, key: str) -> int:
+        row = self._index.get(key)
+        if row is None:
+            if len(self._index) >= self.max_series - 1:
+                key = _OTHER
+                row = self._index.get(key)
+                if row is not None:
+                    return row
+            row = len(self._index)
+            self._index[key] = row
+        return row
+
+    def _add(self, keys: tuple[str, ...], ts: float) -> None:
+        rows = self._rows.get(keys)
+        if rows is None:
+            if len(self._rows) >= 4 * self.max_series:
+                self._rows.clear()
+            rows = self._rows[keys] = np.array([self._row(k) for k in keys])
+        for ring in self._rings.values():
+            bucket = int(ts) // ring.res.seconds
+            ring.advance(bucket)
+            if bucket <= ring.head - ring.res.slots:
+                continue  # más viejo que la ventana del ring
+            ring.counts[rows, bucket % ring.res.slots] += 1
+
+    def record_event(self, event: SecurityEvent) -> None:
+        self._add((
+            "events.total",
+            f"events.source:{event.source}",
+            f"events.event_type:{event.event_type}",
+        ), event.timestamp.timestamp())
+
+    def record_alert(self, alert: Alert) -> None:
+        self._add((
+            "alerts.total",
+            f"alerts.rule_id:{alert.rule_id}",
+            f"alerts.severity:{alert.severity.name}",
+        ), alert.timestamp.timestamp())
+
+    def series(self, resolution: str = "minute", prefix: str = "events.total",
+               points: int = 60, step: int = 1, now: float | None = None) -> dict:
+        """Series compactas para el dashboard.
+
+        prefix: clave exacta ("events.total") o dimensión ("alerts.rule_id:").
+        Devuelve `points` valores por serie, cada uno sumando `step` buckets.
+        """
+        ring = self._rings[resolution]
+        now_bucket = int(now if now is not None else time.time()) // ring.res.seconds
+        step = max(1, step)
+        points = max(1, min(points, ring.res.slots // step))
+        n = points * step
+
+        series = {}
+        for key, row in self._index.items():
+            if key != prefix and not (prefix.endswith(":") and key.startswith(prefix)):
+                continue
+            values = ring.window(row, n, now_bucket).reshape(points, step).sum(axis=1)
+            name = key[len(prefix):] if prefix.endswith(":") else key
+            series[name] = values.tolist()
+
+        return {
+            "resolution": resolution,
+            "start": (now_bucket - n + 1) * ring.res.seconds,
+            "step": step * ring.res.seconds,
+            "series": series,
+        }
+
+    def snapshot(self) -> dict[str, np.ndarray] | None:
+        """Copia de las matrices a persistir. Llamar en el thread del loop (el que suma)."""
+        if self.path is None:
+            return None
+        arrays = {
+            "keys": np.array(list(self._index), dtype=str),
+            "heads": np.array([self._rings[r.name].head for r in RESOLUTIONS], dtype=np.int64),
+        }
+        for res in RESOLUTIONS:
+            arrays[res.name] = self._rings[res.name].counts[:len(self._index)].copy()
+        return arrays
+
+    def write(self, arrays: dict[str, np.ndarray]) -> None:
+        """Escribe una copia de snapshot() a .npz (atómico via rename); apto para executor."""
+        tmp = self.path.with_suffix(".tmp.npz")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(tmp, **arrays)
+        tmp.replace(self.path)
+
+    def save(self) -> None:
+        """Persiste las matrices a .npz de forma síncrona."""
+        arrays = self.snapshot()
+        if arrays is not None:
+            self.write(arrays)
+
+    def load(self) -> bool:
+        """Restaura el estado desde .npz si existe. Retorna True si cargó."""
+        if self.path is None or not self.path.exists():
+            return False
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                keys = [str(k) for k in data["keys"]][:self.max_series]
+                heads = data["heads"]
+                for i, res in enumerate(RESOLUTIONS):
+                    saved = data[res.name]
+                    if saved.shape[1] != res.slots:
+                        raise ValueError(f"slots de {res.name} cambiaron")
+                    ring = self._rings[res.name]
+                    ring.counts[:len(keys)] = saved[:len(keys)]
+                    ring.head = int(heads[i])
+            self._index = {k: i for i, k in enumerate(keys)}
+            self._rows.clear()
+            log.info("Rollups restaurados desde %s (%d series)", self.path, len(keys))
+            return True
+        except (OSError, KeyError, ValueError) as e:
+            log.warning("No se pudieron cargar rollups de %s: %s", self.path, e)
+            return False
@@ -31,6 +31,7 @@ class Rule:
     conditions: list[Condition]
     alert_title: str
     alert_description: str
+    cache_key: list[str] | None = None  # template de key del cache LLM (ver intelligence.cache_keys)
 
     def matches(self, event: SecurityEvent) -> bool:
         """Retorna True si el evento matchea source, event_type Y todas las condiciones."""
@@ -150,6 +151,7 @@ class RuleEngine:
                     conditions=conditions,
                     alert_title=r.get("alert_title", r["name"]),
                     alert_description=r.get("alert_description", r.get("description", "")),
+                    cache_key=r.get("cache_key"),
                 )
                 self.rules.append(rule)
                 count += 1
@@ -159,6 +161,10 @@ class RuleEngine:
         log.info("Cargadas %d reglas desde %s", count, path.name)
         return count
 
+    def cache_key_templates(self) -> dict[str, list[str]]:
+        """Templates de key de cache LLM declarados por las reglas."""
+        return {rule.id: rule.cache_key for rule in self.rules if rule.cache_key}
+
     def evaluate(self, event: SecurityEvent) -> list[Alert]:
         """Evalúa un evento contra todas las reglas. Retorna lista de alertas generadas."""
         alerts = []
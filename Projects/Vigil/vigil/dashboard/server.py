@@ -9,7 +9,8 @@ from pathlib import Path
 
 from aiohttp import web
 
-from ..core.events import Alert, SecurityEvent
+from ..core.encoding import dumps, envelope, json_array, merge_object
+from ..core.events import Alert, SecurityEvent, Severity
 from ..core.logger import get_logger
 
 log = get_logger("dashboard")
@@ -18,6 +19,7 @@ _STATIC_DIR = Path(__file__).parent / "static"
 _MAX_RECENT_EVENTS = 100
 _MAX_RECENT_ALERTS = 50
 _STATS_INTERVAL = 5
+_MAX_PAGE_SIZE = 500
 
 
 class DashboardServer:
@@ -30,10 +32,15 @@ class DashboardServer:
         self._runner: web.AppRunner | None = None
         self._ws_clients: set[web.WebSocketResponse] = set()
 
-        self._recent_events: deque[dict] = deque(maxlen=_MAX_RECENT_EVENTS)
-        self._recent_alerts: deque[dict] = deque(maxlen=_MAX_RECENT_ALERTS)
+        # JSON ya codificado (bytes) — se reutiliza en snapshots sin re-serializar
+        self._recent_events: deque[bytes] = deque(maxlen=_MAX_RECENT_EVENTS)
+        # Alertas como objetos: la explicación LLM llega después de publicarlas
+        # y to_json() se recodifica una sola vez tras invalidate()
+        self._recent_alerts: deque[Alert] = deque(maxlen=_MAX_RECENT_ALERTS)
 
         self._app.router.add_get("/ws", self._ws_handler)
+        self._app.router.add_get("/api/alerts", self._alerts_api_handler)
+        self._app.router.add_get("/api/rollups", self._rollups_api_handler)
         self._app.router.add_get("/", self._index_handler)
 
     async def start(self) -> None:
@@ -60,6 +67,65 @@ class DashboardServer:
     async def _index_handler(self, request: web.Request) -> web.FileResponse:
         return web.FileResponse(_STATIC_DIR / "index.html")
 
+    async def _alerts_api_handler(self, request: web.Request) -> web.Response:
+        """GET /api/alerts — consulta paginada del store de alertas.
+
+        Parámetros: since, until (30m, 2h, 7d o ISO 8601), rule, severity
+        (mínima), entity (tipo=valor), incident, limit, cursor.
+        """
+        from ..commands import parse_entity, parse_time
+
+        store = self.engine.pipeline.store if self.engine.pipeline else None
+        if store is None:
+            return web.json_response({"error": "store deshabilitado"}, status=503)
+
+        q = request.query
+        try:
+            filters = {
+                "since": parse_time(q["since"]) if q.get("since") else None,
+                "until": parse_time(q["until"]) if q.get("until") else None,
+                "rule_id": q.get("rule") or None,
+                "min_severity": Severity[q["severity"].upper()] if q.get("severity") else None,
+                "entity": parse_entity(q["entity"]) if q.get("entity") else None,
+                "incident_id": q.get("incident") or None,
+                "limit": max(1, min(int(q.get("limit", 100)), _MAX_PAGE_SIZE)),
+                "cursor": q.get("cursor") or None,
+            }
+        except (ValueError, KeyError) as e:
+            return web.json_response({"error": f"filtro inválido: {e}"}, status=400)
+
+        loop = asyncio.get_running_loop()
+        try:
+            docs, next_cursor = await loop.run_in_executor(None, lambda: store.query(**filters))
+        except ValueError as e:
+            return web.json_response({"error": f"cursor inválido: {e}"}, status=400)
+
+        body = merge_object(dumps({"next_cursor": next_cursor}), {"alerts": json_array(docs)})
+        return web.Response(body=body, content_type="application/json")
+
+    async def _rollups_api_handler(self, request: web.Request) -> web.Response:
+        """GET /api/rollups — series pre-agregadas.
+
+        Parámetros: resolution (minute|hour), series (ej: events.total,
+        alerts.rule_id:), points, step (buckets sumados por punto).
+        """
+        rollups = getattr(self.engine, "rollups", None)
+        if rollups is None:
+            return web.json_response({"error": "rollups deshabilitados"}, status=503)
+
+        q = request.query
+        resolution = q.get("resolution", "minute")
+        if resolution not in ("minute", "hour"):
+            return web.json_response({"error": "resolution debe ser minute u hour"}, status=400)
+        try:
+            points = int(q.get("points", 60))
+            step = int(q.get("step", 1))
+        except ValueError:
+            return web.json_response({"error": "points/step deben ser enteros"}, status=400)
+
+        data = rollups.series(resolution, q.get("series", "events.total"), points, step)
+        return web.Response(body=dumps(data), content_type="application/json")
+
     async def _ws_handler(self, request: web.Request) -> web.WebSocketResponse:
         ws = web.WebSocketResponse(heartbeat=30)
         await ws.prepare(request)
@@ -67,10 +133,11 @@ class DashboardServer:
         log.info("WS cliente conectado (%d total)", len(self._ws_clients))
 
         # Snapshot inicial
-        snapshot = self.engine.get_snapshot()
-        snapshot["recent_alerts"] = list(self._recent_alerts)
-        snapshot["recent_events"] = list(self._recent_events)
-        await ws.send_json({"type": "snapshot", "data": snapshot})
+        snapshot = merge_object(dumps(self.engine.get_snapshot()), {
+            "recent_alerts": json_array([a.to_json() for a in self._recent_alerts]),
+            "recent_events": json_array(list(self._recent_events)),
+        })
+        await ws.send_str(envelope("snapshot", snapshot).decode("utf-8"))
 
         try:
             async for msg in ws:
@@ -88,16 +155,9 @@ class DashboardServer:
 
     def broadcast_event(self, event: SecurityEvent) -> None:
         """Pushea evento a todos los clientes WS (fire-and-forget)."""
-        event_dict = {
-            "source": event.source,
-            "event_type": event.event_type,
-            "data": event.data,
-            "timestamp": event.timestamp.isoformat(),
-            "event_id": event.event_id,
-        }
-        self._recent_events.append(event_dict)
-        msg = json.dumps({"type": "event", "data": event_dict})
-        self._broadcast_raw(msg)
+        encoded = event.to_json()
+        self._recent_events.append(encoded)
+        self._broadcast_raw(envelope("event", encoded))
 
         # Si es evento de red, mandar update completo de listeners
         if event.source == "network":
@@ -105,28 +165,41 @@ class DashboardServer:
 
     def broadcast_alert(self, alert: Alert) -> None:
         """Pushea alerta a todos los clientes WS (fire-and-forget)."""
-        alert_dict = alert.to_dict()
-        self._recent_alerts.append(alert_dict)
-        msg = json.dumps({"type": "alert", "data": alert_dict})
-        self._broadcast_raw(msg)
+        self._recent_alerts.append(alert)
+        self._broadcast_raw(envelope("alert", alert.to_json()))
+
+    def broadcast_alert_update(self, alert: Alert, explanation: str, done: bool) -> None:
+        """Pushea la explicación LLM (parcial o final) de una alerta ya publicada."""
+        self._broadcast_raw(envelope("alert_update", dumps({
+            "alert_id": alert.alert_id,
+            "incident_id": alert.incident_id,
+            "llm_explanation": explanation,
+            "done": done,
+        })))
 
     def _broadcast_listeners_update(self) -> None:
         """Manda estado actual de listeners desde el network monitor."""
         for monitor in self.engine.monitors:
             if monitor.name == "network":
                 state = monitor.get_state()
-                msg = json.dumps({"type": "listeners_update", "data": state})
-                self._broadcast_raw(msg)
+                self._broadcast_raw(envelope("listeners_update", dumps(state)))
                 break
 
-    def _broadcast_raw(self, msg: str) -> None:
-        """Envía JSON string a todos los clientes WS conectados."""
+    def _broadcast_raw(self, msg: bytes) -> None:
+        """Envía JSON ya codificado a todos los clientes WS conectados.
+
+        Se decodifica una vez por broadcast (no por cliente): el dashboard
+        espera frames de texto.
+        """
+        if not self._ws_clients:
+            return
+        text = msg.decode("utf-8")
         dead = []
         for ws in self._ws_clients:
             if ws.closed:
                 dead.append(ws)
             else:
-                asyncio.ensure_future(ws.send_str(msg))
+                asyncio.ensure_future(ws.send_str(text))
         for ws in dead:
             self._ws_clients.discard(ws)
 
@@ -143,11 +216,23 @@ class DashboardServer:
             from datetime import datetime
             stats["uptime_seconds"] = (datetime.now() - self.engine._start_time).total_seconds()
 
+        # Tendencia de la última hora (por minuto) para los sparklines
+        rollups = getattr(self.engine, "rollups", None)
+        if rollups is not None:
+            stats["trend"] = {
+                "events": rollups.series("minute", "events.total", 60)["series"].get("events.total", []),
+                "alerts": rollups.series("minute", "alerts.total", 60)["series"].get("alerts.total", []),
+            }
+
+        analyzer = getattr(self.engine, "analyzer", None)
+        if analyzer is not None:
+            stats["llm_cache"] = analyzer.cache_stats()
+            stats["llm_breaker"] = analyzer.breaker.get_stats()
+
         # También mandar listeners actualizados
         for monitor in self.engine.monitors:
             if monitor.name == "network":
                 stats["listeners"] = monitor.get_state()
                 break
 
-        msg = json.dumps({"type": "stats", "data": stats})
-        self._broadcast_raw(msg)
+        self._broadcast_raw(envelope("stats", dumps(stats)))
@@ -2,95 +2,390 @@
 
 from __future__ import annotations
 
+import asyncio
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from contextlib import aclosing
+from typing import Awaitable, Callable
+
 from ..core.config import OllamaConfig
 from ..core.events import Alert, Severity
 from ..core.logger import get_logger
-from .cache import TTLCache
-from .ollama import OllamaClient
+from .backend import StreamError, create_backend
+from .batching import AlertBatcher
+from .breaker import CircuitBreaker
+from .cache import DiskCache, TieredCache, TTLCache
+from .cache_keys import CacheKeyBuilder
+from .explanations import ExplanationTemplates
+from .scheduler import JobRejected, RequestScheduler
+from .semantic import HashingEmbedder, OllamaEmbedder, SemanticCache
 
 log = get_logger("analyzer")
 
+# Fin de oración: . ! ? seguido de espacio. No cuenta marcadores de lista
+# ("1. ", "12. " al inicio de línea o tras espacio), sí "puerto 4444. "
+_SENTENCE_END = re.compile(r"(?<![\s(]\d)(?<![\s(]\d\d)(?<!^\d)(?<!^\d\d)[.!?](?=\s)", re.MULTILINE)
+
+# Instrucciones fijas, enviadas como system prompt: al ser el mismo prefijo
+# en cada llamada, el backend reutiliza su evaluación entre alertas
+SYSTEM_PROMPT = """Eres un analista de seguridad explicando alertas de un IDS personal en Windows 11.
+Explica en español en 2-3 oraciones: qué significa la alerta para un usuario
+normal, si es probablemente benigna o preocupante, y qué acción recomiendas
+(si alguna). Sé conciso y directo."""
+
+# Intervalo mínimo entre parciales publicados (segundos)
+_PARTIAL_INTERVAL = 0.25
+
+# Cache keys recordadas para decidir si una situación es novedosa
+_SEEN_KEYS = 20000
+
 
 class OllamaAnalyzer:
     """Decide si una alerta merece análisis LLM y construye el prompt."""
 
-    def __init__(self, config: OllamaConfig):
+    def __init__(self, config: OllamaConfig, key_templates: dict[str, list[str]] | None = None,
+                 explanations: ExplanationTemplates | None = None):
         self.config = config
-        self.client = OllamaClient(config)
-        self.cache = TTLCache(ttl=600, max_size=200)
+        self.client = create_backend(config)
+        self.keys = CacheKeyBuilder(key_templates)
+        disk = None
+        if config.cache_path:
+            try:
+                disk = DiskCache(config.cache_path, ttl=config.cache_disk_ttl,
+                                 max_entries=config.cache_disk_max_entries)
+            except sqlite3.Error as e:
+                log.warning("Cache en disco deshabilitado (%s): %s", config.cache_path, e)
+        self.cache = TieredCache(TTLCache(ttl=config.cache_ttl, max_size=config.cache_size), disk)
+        self.breaker = CircuitBreaker(
+            self.client.is_available,
+            failure_threshold=config.breaker_failures,
+            probe_min=config.breaker_probe_min,
+            probe_max=config.breaker_probe_max,
+        )
+        self.semantic = self._create_semantic(config)
+        self.scheduler = RequestScheduler(
+            rate_limit=config.rate_limit,
+            burst=config.burst,
+            max_concurrency=config.max_concurrency,
+            target_latency=config.target_latency,
+            deadline=config.queue_deadline,
+            max_queue=config.max_queue,
+        )
+        # Single-flight: cache_key -> future de la generación en curso
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.coalesced = 0     # requests que esperaron una generación ya en curso
+        self.generations = 0   # generaciones efectivamente pedidas al LLM
+        self.batcher: AlertBatcher | None = None
+        if config.slots > 0:
+            self.scheduler.set_capacity(config.slots)
+        if config.batch_size > 1:
+            self.batcher = AlertBatcher(
+                self._scheduled_generate, self.build_prompt, self.build_batch_prompt,
+                window=config.batch_window, max_size=config.batch_size,
+            )
         self._min_severity = Severity[config.min_severity]
+        # Explicaciones precomputadas: el LLM en vivo queda para lo grave o novedoso
+        self.explanations = explanations if config.explanations else None
+        self._live_severity = Severity[config.live_min_severity]
+        self._seen_keys: OrderedDict[str, None] = OrderedDict()
+        self.templated = 0
+        self.novel = 0         # situaciones nuevas que fueron al LLM pese a tener template
+
+    def _create_semantic(self, config: OllamaConfig) -> SemanticCache | None:
+        """Cache semántico opcional; el índice se persiste junto a cache_path."""
+        if not config.semantic_cache:
+            return None
+        if config.semantic_embedder == "ollama":
+            embedder = OllamaEmbedder(self._embed, config.embed_model)
+        else:
+            embedder = HashingEmbedder()
+        path = Path(config.cache_path).with_suffix(".semantic.npz") if config.cache_path else None
+        return SemanticCache(embedder, path, threshold=config.semantic_threshold,
+                             max_entries=config.semantic_max_entries)
+
+    async def aclose(self) -> None:
+        """Despacha batches pendientes, libera el pool HTTP y cierra los caches."""
+        if self.batcher is not None:
+            await self.batcher.aclose()
+        await self.scheduler.aclose()
+        await self.breaker.aclose()
+        await self.client.aclose()
+        self.cache.close()
+        if self.semantic is not None:
+            self.semantic.close()
+
+    async def _guarded(self, job: Callable[[], Awaitable[str | None]]) -> str | None:
+        """Ejecuta un request al LLM a través del circuit breaker.
+
+        Con el circuito abierto lanza JobRejected: el scheduler resuelve None
+        sin contarlo como fallo del backend en la ventana AIMD.
+        """
+        token = self.breaker.allow()
+        if token is None:
+            raise JobRejected("circuito abierto")
+        result = None
+        try:
+            result = await job()
+        finally:
+            self.breaker.record(token, result is not None)
+        return result
+
+    async def _embed(self, text: str, model: str) -> list[float] | None:
+        if self.breaker.is_open:
+            return None
+        return await self.client.embed(text, model)
+
+    async def _scheduled_generate(self, prompt: str, num_predict: int,
+                                  severity: Severity) -> str | None:
+        return await self.scheduler.submit(
+            severity, lambda: self._guarded(lambda: self.client.generate(prompt, num_predict, SYSTEM_PROMPT)))
+
+    async def prepare(self, warmup: bool = True) -> None:
+        """Al arrancar: descubre slots paralelos del backend y carga el modelo.
+
+        Con slots conocidos el scheduler mantiene esa cantidad de requests
+        en vuelo (el servidor las procesa en batch) en lugar de serializar.
+        """
+        if self.breaker.is_open:
+            return
+        if self.config.slots <= 0:
+            slots = await self.client.discover_slots()
+            if slots:
+                self.scheduler.set_capacity(slots)
+                log.info("Backend %s: %d slots paralelos", self.client.name, slots)
+        if warmup:
+            await self.warmup()
+
+    async def warmup(self) -> None:
+        """Carga el modelo al arrancar para que la primera alerta no pague la carga."""
+        if self.breaker.is_open:
+            return
+        elapsed = await self.client.warmup(SYSTEM_PROMPT)
+        if elapsed is None:
+            log.warning("Warm-up de %s falló", self.config.model)
+        else:
+            log.info("Modelo %s cargado en %.1fs (keep_alive %s)",
+                     self.config.model, elapsed, self.config.keep_alive)
+
+    def cache_stats(self) -> dict:
+        """Stats de los caches.
+
+        hit_rate cuenta como evitada toda request que no generó: hits
+        exactos, semánticos, las coalescidas sobre una generación en curso
+        y las resueltas con una explicación precomputada.
+        """
+        stats = self.cache.get_stats()
+        avoided = self.coalesced + self.templated
+        lookups = stats["memory"]["hits"] + stats["memory"]["misses"] + avoided
+        hits = stats["memory"]["hits"] + stats.get("disk", {}).get("hits", 0) + avoided
+        if self.semantic is not None:
+            stats["semantic"] = self.semantic.get_stats()
+            hits += stats["semantic"]["hits"]
+        stats["coalesced"] = self.coalesced
+        stats["templated"] = self.templated
+        stats["novel"] = self.novel
+        stats["generations"] = self.generations
+        stats["hit_rate"] = round(hits / lookups, 3) if lookups else 0.0
+        return stats
 
     def should_analyze(self, alert: Alert) -> bool:
         """Decide si una alerta merece ser enriquecida por el LLM.
 
-        Criterios:
-        - Severidad >= min_severity configurada
-        - Ollama está disponible (último check)
-        - No está cacheada ya
+        Criterio: severidad >= min_severity configurada. La disponibilidad
+        del backend la decide el circuit breaker en analyze(): con el
+        circuito abierto se siguen sirviendo explicaciones cacheadas.
         """
-        if alert.severity < self._min_severity:
+        return alert.severity >= self._min_severity
+
+    def _use_template(self, alert: Alert, cache_key: str) -> bool:
+        """Template precomputado salvo alertas >= live_min_severity o situaciones novedosas.
+
+        Novedosa: la cache key normalizada no se vio antes (la primera
+        alerta de cada situación va al LLM y queda en cache), o el monitor
+        marcó data["novel"].
+        """
+        if not self.explanations or alert.rule_id not in self.explanations:
             return False
-        if self.client._available is False:
+        if alert.severity >= self._live_severity:
             return False
-        cache_key = self._cache_key(alert)
-        if self.cache.get(cache_key) is not None:
+        first = self._first_seen(cache_key)
+        if first or (alert.event and alert.event.data.get("novel")):
+            self.novel += 1
+            return False
+        return True
+
+    def _first_seen(self, cache_key: str) -> bool:
+        """Registra la key (LRU acotado). True si no estaba."""
+        seen = self._seen_keys
+        if cache_key in seen:
+            seen.move_to_end(cache_key)
             return False
+        seen[cache_key] = None
+        if len(seen) > _SEEN_KEYS:
+            seen.popitem(last=False)
         return True
 
     def _cache_key(self, alert: Alert) -> str:
-        """Genera key de cache basada en rule_id + datos relevantes."""
-        parts = [alert.rule_id]
-        if alert.event and alert.event.data:
-            for k in sorted(alert.event.data.keys()):
-                parts.append(f"{k}:{alert.event.data[k]}")
-        return "|".join(parts)
+        """Key a nivel situación: rule_id + campos normalizados del template."""
+        return self.keys.alert_key(alert)
+
+    def _compact_data(self, alert: Alert) -> str:
+        """Datos del evento en una línea: sin campos vacíos, valores truncados."""
+        if not (alert.event and alert.event.data):
+            return ""
+        limit = self.config.max_field_chars
+        parts = []
+        for k, v in alert.event.data.items():
+            if v is None or v == "" or v == [] or v == {}:
+                continue
+            text = " ".join(str(v).split())
+            if limit and len(text) > limit:
+                text = text[:limit] + "…"
+            parts.append(f"{k}={text}")
+        return "; ".join(parts)
+
+    def _alert_block(self, alert: Alert, index: int | None = None) -> str:
+        head = f"[{index}] " if index is not None else ""
+        lines = [f"{head}Regla {alert.rule_id} ({alert.severity.name}): {alert.title}"]
+        if alert.description:
+            lines.append(alert.description)
+        data = self._compact_data(alert)
+        if data:
+            lines.append(f"Datos: {data}")
+        return "\n    ".join(lines) if index is not None else "\n".join(lines)
 
     def build_prompt(self, alert: Alert) -> str:
-        """Construye el prompt para Ollama pidiendo explicación en español.
+        """Construye el prompt de una alerta.
 
-        El prompt incluye:
-        - Contexto de que es un IDS personal
-        - La alerta con todos sus datos
-        - Instrucción de explicar en español, conciso, con recomendación
+        Las instrucciones van en SYSTEM_PROMPT (prefijo idéntico en todas las
+        llamadas); acá solo la alerta con sus datos compactados.
         """
-        event_data = ""
-        if alert.event and alert.event.data:
-            event_data = "\n".join(f"  - {k}: {v}" for k, v in alert.event.data.items())
+        return self._alert_block(alert)
 
-        return f"""Eres un analista de seguridad explicando alertas de un IDS personal en Windows 11.
+    def build_batch_prompt(self, alerts: list[Alert]) -> str:
+        """Prompt combinado para varias alertas con respuesta numerada [n]."""
+        blocks = "\n\n".join(self._alert_block(a, i) for i, a in enumerate(alerts, 1))
+        return f"""Se detectaron {len(alerts)} alertas:
 
-Alerta detectada:
-- Regla: {alert.rule_id}
-- Severidad: {alert.severity.name}
-- Título: {alert.title}
-- Descripción: {alert.description}
-- Datos del evento:
-{event_data}
+{blocks}
 
-Explica en español en 2-3 oraciones:
-1. Qué significa esta alerta para un usuario normal
-2. Si es probablemente benigno o preocupante
-3. Qué acción recomiendas (si alguna)
+Explica CADA alerta, en el mismo orden. Formato obligatorio, una entrada por
+alerta empezando con su número entre corchetes:
+[1] explicación de la alerta 1
+[2] explicación de la alerta 2"""
 
-Sé conciso y directo."""
+    async def _generate_streaming(self, prompt: str,
+                                  on_partial: Callable[[str], None]) -> str | None:
+        """Genera en streaming publicando el texto parcial via on_partial.
 
-    async def analyze(self, alert: Alert) -> str | None:
-        """Analiza una alerta con Ollama si corresponde. Retorna explicación o None."""
+        Corta la generación al completar max_sentences oraciones: el resto
+        de los tokens no se espera ni se paga. Si el stream se corta antes
+        retorna None: el texto parcial no se cachea y el breaker lo cuenta
+        como falla.
+        """
+        text = ""
+        last_push = 0.0
+        max_sentences = self.config.max_sentences
+
+        try:
+            async with aclosing(self.client.generate_stream(prompt, SYSTEM_PROMPT)) as chunks:
+                async for chunk in chunks:
+                    text += chunk
+                    if max_sentences:
+                        ends = [m.end() for m in _SENTENCE_END.finditer(text + " ")]
+                        if len(ends) >= max_sentences:
+                            text = text[:ends[max_sentences - 1]]
+                            break
+                    now = time.monotonic()
+                    if now - last_push >= _PARTIAL_INTERVAL:
+                        last_push = now
+                        on_partial(text.strip())
+        except StreamError as e:
+            if text:
+                log.warning("Stream del LLM cortado tras %d chars: %s", len(text), e)
+            return None
+
+        return text.strip() or None
+
+    async def analyze(self, alert: Alert,
+                      on_partial: Callable[[str], None] | None = None) -> str | None:
+        """Analiza una alerta con Ollama si corresponde. Retorna explicación o None.
+
+        Si config.stream está activo y se pasa on_partial, se llama con el
+        texto acumulado a medida que llegan tokens (máx. cada 250 ms).
+        Con batch_size > 1 la alerta se agrupa con otras pendientes en un
+        solo prompt (sin parciales).
+        """
         if not self.should_analyze(alert):
             return None
 
         cache_key = self._cache_key(alert)
+        if self._use_template(alert, cache_key):
+            text = self.explanations.render(alert)
+            if text:
+                self.templated += 1
+                return text
+
+        # Single-flight: si ya hay una request en curso para la misma key,
+        # esperar su resultado en lugar de generar de nuevo
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
 
-        # Check cache
-        cached = self.cache.get(cache_key)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        response = None
+        try:
+            response = await self._resolve(alert, cache_key, on_partial)
+        finally:
+            del self._inflight[cache_key]
+            future.set_result(response)
+        return response
+
+    async def _resolve(self, alert: Alert, cache_key: str,
+                       on_partial: Callable[[str], None] | None) -> str | None:
+        """Cache exacto → cache semántico → generación."""
+        # Read-through: memoria → disco
+        cached = await self.cache.get(cache_key)
         if cached:
             return cached
 
-        prompt = self.build_prompt(alert)
-        response = await self.client.generate(prompt)
+        # Cache semántico: alerta casi igual de la misma regla
+        vec = None
+        if self.semantic is not None:
+            vec = await self.semantic.embed(self.keys.situation_text(alert))
+            if vec is not None:
+                match = self.semantic.lookup(alert.rule_id, vec)
+                if match is not None:
+                    text, score = match
+                    log.debug("Hit semántico para %s (similitud %.3f)", alert.rule_id, score)
+                    await self.cache.set(cache_key, text)
+                    return text
+
+        # Circuito abierto: fast-fail sin encolar ni esperar timeouts
+        if self.breaker.is_open:
+            self.breaker.fast_fails += 1
+            return None
+
+        self.generations += 1
+        if self.batcher is not None:
+            response = await self.batcher.submit(alert)
+        elif self.config.stream and on_partial is not None:
+            prompt = self.build_prompt(alert)
+            response = await self.scheduler.submit(
+                alert.severity,
+                lambda: self._guarded(lambda: self._generate_streaming(prompt, on_partial)))
+        else:
+            response = await self._scheduled_generate(self.build_prompt(alert), 300, alert.severity)
 
         if response:
-            self.cache.set(cache_key, response)
+            await self.cache.set(cache_key, response)
+            if vec is not None:
+                self.semantic.add(alert.rule_id, vec, response)
             log.debug("LLM explicación para %s obtenida (%d chars)", alert.rule_id, len(response))
 
         return response
@@ -0,0 +1,173 @@
+"""Backends de inferencia LLM enchufables.
+
+El analizador solo habla con un LLMBackend; cada dialecto HTTP es una
+subclase:
+- ollama: API nativa de Ollama (/api/generate, /api/embeddings)
+- openai: servidores OpenAI-compatibles (llama.cpp server, vLLM, LM Studio)
+  con /v1/chat/completions y slots paralelos
+
+Todos comparten un único httpx.AsyncClient de larga vida (pool con
+keep-alive) y no lanzan excepciones de red: generate() y embed() retornan
+None. generate_stream() es la excepción: si el stream falla o se corta
+antes del fin lanza StreamError, para que el texto parcial no pase por
+una respuesta completa. El ritmo de llamadas lo controla RequestScheduler.
+
+Cada request toma el cliente con _session(), que cuenta los requests en
+vuelo por cliente: _resize_pool() instala un cliente nuevo para los
+requests siguientes y cierra el anterior recién cuando termina el último
+que lo estaba usando (warm-up, probe del breaker o una generación).
+"""
+
+from __future__ import annotations
+
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import httpx
+
+from ..core.config import OllamaConfig
+
+
+class StreamError(Exception):
+    """El stream de generación falló o terminó sin la marca de fin."""
+
+
+class LLMBackend(ABC):
+    """Backend de inferencia.
+
+    Subclases implementan:
+    - health_path: endpoint de is_available() (chequeo al arrancar y probe del breaker)
+    - generate() / generate_stream(): texto completo o fragmentos
+    - embed(): embedding de un texto (cache semántico)
+    - discover_slots(): requests paralelas que el servidor atiende (opcional)
+    """
+
+    name = "base"
+    health_path = "/"  # GET barato que responde 200 si el servidor está arriba
+
+    def __init__(self, config: OllamaConfig):
+        self.config = config
+        self.max_connections = config.max_connections
+        self.max_keepalive = config.max_keepalive
+        self._client: httpx.AsyncClient | None = None
+        self._in_flight: dict[httpx.AsyncClient, int] = {}
+        self._retired: set[httpx.AsyncClient] = set()  # reemplazados, con requests en vuelo
+
+    def _headers(self) -> dict:
+        """Headers fijos de cada request. Override para autenticación."""
+        return {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Crea el cliente persistente en el primer uso (dentro del event loop)."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.config.url,
+                headers=self._headers(),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                    keepalive_expiry=self.config.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(
+                    self.config.timeout,
+                    connect=self.config.connect_timeout,
+                ),
+            )
+        return self._client
+
+    @asynccontextmanager
+    async def _session(self) -> AsyncIterator[httpx.AsyncClient]:
+        """Cliente actual para un request (o un stream completo)."""
+        client = self._get_client()
+        self._in_flight[client] = self._in_flight.get(client, 0) + 1
+        try:
+            yield client
+        finally:
+            left = self._in_flight[client] - 1
+            if left:
+                self._in_flight[client] = left
+            else:
+                del self._in_flight[client]
+                if client in self._retired:
+                    self._retired.discard(client)
+                    await client.aclose()
+
+    async def _resize_pool(self, max_connections: int, max_keepalive: int) -> None:
+        """Cambia los límites del pool sin cortar requests en vuelo.
+
+        Los requests siguientes usan un cliente nuevo; el anterior se cierra
+        ahora si está ocioso o al terminar su último request.
+        """
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        old, self._client = self._client, None
+        if old is None or old.is_closed:
+            return
+        if old in self._in_flight:
+            self._retired.add(old)
+        else:
+            await old.aclose()
+
+    async def aclose(self) -> None:
+        """Cierra el pool de conexiones (y los clientes reemplazados)."""
+        clients = [*self._retired, self._client]
+        self._retired.clear()
+        self._client = None
+        for client in clients:
+            if client is not None:
+                await client.aclose()
+
+    async def is_available(self, timeout: float = 5) -> bool:
+        """Chequeo de salud: GET health_path con timeout corto (arranque y probe del breaker)."""
+        try:
+            async with self._session() as client:
+                resp = await client.get(self.health_path, timeout=timeout)
+            return resp.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    @abstractmethod
+    async def generate(self, prompt: str, num_predict: int = 300,
+                       system: str | None = None) -> str | None:
+        """Genera una respuesta. Retorna None si falla."""
+        ...
+
+    @abstractmethod
+    def generate_stream(self, prompt: str, system: str | None = None) -> AsyncIterator[str]:
+        """Itera fragmentos de texto a medida que llegan.
+
+        Lanza StreamError si el request falla o el stream se corta antes de
+        la marca de fin (los fragmentos ya entregados quedan incompletos).
+        """
+        ...
+
+    @abstractmethod
+    async def embed(self, text: str, model: str) -> list[float] | None:
+        ...
+
+    async def discover_slots(self) -> int | None:
+        """Requests que el servidor procesa en paralelo (None = desconocido)."""
+        return None
+
+    async def warmup(self, system: str | None = None) -> float | None:
+        """Carga el modelo (y evalúa el system prompt) con una generación mínima.
+
+        Retorna la duración en segundos, o None si el backend no respondió.
+        """
+        start = time.perf_counter()
+        if await self.generate("ok", num_predict=1, system=system) is None:
+            return None
+        return time.perf_counter() - start
+
+
+def create_backend(config: OllamaConfig) -> LLMBackend:
+    """Instancia el backend según config.backend."""
+    if config.backend == "ollama":
+        from .ollama import OllamaClient
+        return OllamaClient(config)
+    if config.backend == "openai":
+        from .openai_compat import OpenAICompatClient
+        return OpenAICompatClient(config)
+    raise ValueError(f"backend LLM desconocido: {config.backend}")
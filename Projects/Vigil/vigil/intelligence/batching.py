@@ -0,0 +1,140 @@
+"""Batching de prompts: varias alertas pendientes en una sola llamada al LLM.
+
+Con rate_limit entre llamadas, una ráfaga de 30 alertas MEDIUM tarda
+minutos en enriquecerse de a una. AlertBatcher junta las alertas que
+llegan dentro de una ventana corta (o hasta batch_size) y las manda en un
+prompt estructurado que pide explicaciones numeradas "[1] ... [2] ...".
+La respuesta se reparte por número; si no se puede parsear completa, las
+alertas sin explicación caen a prompts individuales.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+from typing import Awaitable, Callable
+
+from ..core.events import Alert, Severity
+from ..core.logger import get_logger
+
+log = get_logger("batching")
+
+# "[3] texto", "**[3]** texto" o "Alerta 3: texto" al inicio de línea
+_ITEM = re.compile(r"^\s*(?:\*\*)?(?:\[(\d{1,3})\]|alerta\s+(\d{1,3})\s*[:.)-])(?:\*\*)?\s*",
+                   re.IGNORECASE | re.MULTILINE)
+
+
+def split_numbered(text: str, n: int) -> list[str | None]:
+    """Reparte una respuesta numerada en n explicaciones (None si falta alguna)."""
+    parts: list[str | None] = [None] * n
+    matches = list(_ITEM.finditer(text))
+    for i, m in enumerate(matches):
+        idx = int(m.group(1) or m.group(2)) - 1
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        body = text[m.end():end].strip()
+        if 0 <= idx < n and body and parts[idx] is None:
+            parts[idx] = body
+    return parts
+
+
+class AlertBatcher:
+    """Junta alertas por ventana/tamaño y las resuelve con un prompt combinado.
+
+    generate(prompt, num_predict, severidad) → texto o None. La severidad de
+    un batch es la máxima de sus alertas (prioridad en el scheduler).
+    """
+
+    def __init__(self, generate: Callable[[str, int, Severity], Awaitable[str | None]],
+                 build_prompt: Callable[[Alert], str],
+                 build_batch_prompt: Callable[[list[Alert]], str],
+                 window: float = 2.0, max_size: int = 8, tokens_per_alert: int = 200):
+        self._generate = generate
+        self._build_prompt = build_prompt
+        self._build_batch_prompt = build_batch_prompt
+        self.window = window
+        self.max_size = max_size
+        self.tokens_per_alert = tokens_per_alert
+
+        self._pending: list[tuple[Alert, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.batched_alerts = 0
+        self.fallbacks = 0   # alertas re-enviadas de a una por parseo incompleto
+
+    async def submit(self, alert: Alert) -> str | None:
+        """Encola una alerta y espera su explicación."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((alert, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[Alert, asyncio.Future]]) -> None:
+        try:
+            alerts = [alert for alert, _ in batch]
+            if len(alerts) == 1:
+                results = [await self._generate(self._build_prompt(alerts[0]),
+                                                self.tokens_per_alert, alerts[0].severity)]
+            else:
+                results = await self._run_batch(alerts)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            log.warning("Batch de %d alertas falló: %s", len(batch), e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    async def _run_batch(self, alerts: list[Alert]) -> list[str | None]:
+        self.batches += 1
+        self.batched_alerts += len(alerts)
+        text = await self._generate(self._build_batch_prompt(alerts),
+                                    self.tokens_per_alert * len(alerts),
+                                    max(a.severity for a in alerts))
+        if text is None:
+            return [None] * len(alerts)
+
+        results = split_numbered(text, len(alerts))
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            log.debug("Respuesta de batch incompleta (%d/%d), reintentando de a una",
+                      len(missing), len(alerts))
+            self.fallbacks += len(missing)
+            retried = await asyncio.gather(*(
+                self._generate(self._build_prompt(alerts[i]), self.tokens_per_alert, alerts[i].severity)
+                for i in missing
+            ))
+            for i, result in zip(missing, retried):
+                results[i] = result
+        return results
+
+    async def aclose(self) -> None:
+        """Despacha lo pendiente y espera los batches en curso."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "batched_alerts": self.batched_alerts,
+            "fallbacks": self.fallbacks,
+        }
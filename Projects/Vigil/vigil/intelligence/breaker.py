@@ -0,0 +1,149 @@
+"""Circuit breaker para el backend LLM con probe de salud en background.
+
+Antes, un connect error dejaba _available = False para siempre (nunca se
+volvía a chequear) y cada timeout costaba hasta 30 s antes de marcarlo.
+
+Estados:
+- CLOSED: requests pasan. `failure_threshold` fallos seguidos → OPEN.
+- OPEN: fast-fail (no se encola ni se espera timeout). Una task en
+  background prueba el health check del backend (/api/tags en Ollama)
+  con backoff exponencial (probe_min →
+  probe_max); si responde → HALF_OPEN.
+- HALF_OPEN: pasa una sola request de prueba. Éxito → CLOSED, fallo →
+  OPEN con el siguiente escalón de backoff.
+
+allow() entrega un token por request admitida y record() sólo cuenta el
+resultado si el token es del estado actual: una request lenta admitida
+antes de abrirse el circuito no consume ni decide la prueba de HALF_OPEN.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from ..core.logger import get_logger
+
+log = get_logger("breaker")
+
+CLOSED = "CLOSED"
+OPEN = "OPEN"
+HALF_OPEN = "HALF_OPEN"
+
+
+class CircuitBreaker:
+    """Breaker de tres estados; probe() retorna True si el backend responde."""
+
+    def __init__(self, probe: Callable[[], Awaitable[bool]], failure_threshold: int = 3,
+                 probe_min: float = 5.0, probe_max: float = 300.0):
+        self._probe = probe
+        self.failure_threshold = max(1, failure_threshold)
+        self.probe_min = probe_min
+        self.probe_max = probe_max
+
+        self.state = CLOSED
+        self.changed_at = time.time()
+        self._failures = 0
+        self._delay = probe_min
+        self._next_probe: float | None = None
+        self._issued = 0                # último token entregado por allow()
+        self._epoch_start = 1           # tokens menores son de un estado anterior
+        self._trial: int | None = None  # token de la request de prueba en HALF_OPEN
+        self._task: asyncio.Task | None = None
+
+        self.opened = 0
+        self.fast_fails = 0
+        self.probes = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    def allow(self) -> int | None:
+        """Token si la request puede ir al backend, None si no. En HALF_OPEN pasa una sola."""
+        if self.state == CLOSED or (self.state == HALF_OPEN and self._trial is None):
+            self._issued += 1
+            if self.state == HALF_OPEN:
+                self._trial = self._issued
+            return self._issued
+        self.fast_fails += 1
+        return None
+
+    def record(self, token: int, ok: bool) -> None:
+        """Registra el resultado de la request a la que allow() dio `token`."""
+        if token < self._epoch_start:
+            return  # admitida en un estado anterior: su resultado ya no decide nada
+        was_trial = token == self._trial
+        if self.state == HALF_OPEN and not was_trial:
+            return
+        if ok:
+            self._failures = 0
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+                self._delay = self.probe_min
+            return
+        self._failures += 1
+        if was_trial or (self.state == CLOSED and self._failures >= self.failure_threshold):
+            self.trip()
+
+    def trip(self) -> None:
+        """Abre el circuito y agenda el probe."""
+        if self.state == OPEN:
+            return
+        if self.state == HALF_OPEN:
+            self._delay = min(self._delay * 2, self.probe_max)
+        self.opened += 1
+        self._transition(OPEN)
+        self.start()
+
+    def start(self) -> None:
+        """Lanza el probe si el circuito está abierto (requiere event loop)."""
+        if self.state != OPEN or (self._task is not None and not self._task.done()):
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._probe_loop(), name="llm-probe")
+        except RuntimeError:
+            pass  # sin loop todavía (setup): engine.run() llama start()
+
+    async def _probe_loop(self) -> None:
+        while self.state == OPEN:
+            self._next_probe = time.time() + self._delay
+            await asyncio.sleep(self._delay)
+            self.probes += 1
+            try:
+                ok = await self._probe()
+            except Exception as e:
+                log.debug("Probe del LLM falló: %s", e)
+                ok = False
+            if ok:
+                self._failures = 0
+                self._transition(HALF_OPEN)
+            else:
+                self._delay = min(self._delay * 2, self.probe_max)
+        self._next_probe = None
+
+    def _transition(self, state: str) -> None:
+        log.info("Circuit breaker LLM: %s → %s", self.state, state)
+        self.state = state
+        self.changed_at = time.time()
+        self._epoch_start = self._issued + 1
+        self._trial = None
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_stats(self) -> dict:
+        return {
+            "state": self.state,
+            "since": self.changed_at,
+            "consecutive_failures": self._failures,
+            "next_probe_in": round(max(0.0, self._next_probe - time.time()), 1)
+                if self._next_probe else None,
+            "opened": self.opened,
+            "fast_fails": self.fast_fails,
+            "probes": self.probes,
+        }
@@ -1,46 +1,232 @@
-"""TTL cache simple para respuestas del LLM."""
+"""Cache de dos niveles para respuestas del LLM.
+
+- TTLCache: memoria, LRU + TTL con OrderedDict (get/set O(1)).
+- DiskCache: SQLite con TTL largo, tope de entradas y compactación.
+  Sobrevive reinicios: un reboot no vuelve a pagar cada llamada al LLM.
+  Los hits no escriben: la hora de acceso se acumula en memoria y se
+  vuelca junto con el próximo set() o antes de compactar.
+- TieredCache: read-through memoria → disco, promoviendo hits de disco.
+"""
 
 from __future__ import annotations
 
+import asyncio
+import sqlite3
+import threading
 import time
+from collections import OrderedDict
+from pathlib import Path
+
+from ..core.logger import get_logger
+
+log = get_logger("cache")
+
+# Cada cuántos set() se compacta el tier de disco
+_COMPACT_EVERY = 100
 
 
 class TTLCache:
-    """Cache en memoria con TTL (Time-To-Live) por entrada.
+    """Cache en memoria con TTL por entrada y desalojo LRU.
 
     Evita llamar al LLM repetidamente para alertas similares.
     La key es típicamente rule_id + datos relevantes del evento.
+    El OrderedDict está en orden de uso: el menos usado está al frente.
     """
 
     def __init__(self, ttl: int = 600, max_size: int = 200):
         self.ttl = ttl
         self.max_size = max_size
-        self._store: dict[str, tuple[float, str]] = {}  # {key: (timestamp, value)}
+        self._store: OrderedDict[str, tuple[float, str]] = OrderedDict()  # {key: (timestamp, value)}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
 
     def get(self, key: str) -> str | None:
         """Retorna el valor cacheado o None si no existe / expiró."""
         entry = self._store.get(key)
         if entry is None:
+            self.misses += 1
             return None
         ts, value = entry
         if time.time() - ts > self.ttl:
             del self._store[key]
+            self.expirations += 1
+            self.misses += 1
             return None
+        self._store.move_to_end(key)
+        self.hits += 1
         return value
 
     def set(self, key: str, value: str) -> None:
-        """Guarda un valor con timestamp actual. Limpia entradas viejas si excede max_size."""
-        if len(self._store) >= self.max_size:
-            self._evict_expired()
-        if len(self._store) >= self.max_size:
-            # Eliminar la entrada más vieja
-            oldest_key = min(self._store, key=lambda k: self._store[k][0])
-            del self._store[oldest_key]
+        """Guarda un valor. Si está lleno, desaloja el menos usado."""
+        if key in self._store:
+            self._store.move_to_end(key)
+        elif len(self._store) >= self.max_size:
+            self._store.popitem(last=False)
+            self.evictions += 1
         self._store[key] = (time.time(), value)
 
-    def _evict_expired(self) -> None:
-        """Elimina todas las entradas expiradas."""
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def get_stats(self) -> dict:
+        return {
+            "entries": len(self._store),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class DiskCache:
+    """Tier persistente en SQLite con TTL, tope de entradas y compactación.
+
+    Métodos síncronos y thread-safe: llamarlos via run_in_executor.
+    evictions cuenta sólo las desalojadas por el tope; las vencidas por
+    TTL van a expirations.
+    """
+
+    def __init__(self, path: str | Path, ttl: int = 7 * 86400, max_entries: int = 5000):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._writes = 0
+        self._touched: dict[str, float] = {}  # key -> último acceso aún no escrito
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key      TEXT PRIMARY KEY,
+                value    TEXT NOT NULL,
+                created  REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed)")
+        self._conn.commit()
+        self.compact()
+
+    def get(self, key: str) -> tuple[float, str] | None:
+        """Retorna (created, value) o None si no existe / expiró."""
         now = time.time()
-        expired = [k for k, (ts, _) in self._store.items() if now - ts > self.ttl]
-        for k in expired:
-            del self._store[k]
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created, value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[0] > self.ttl:
+                self.misses += 1
+                return None
+            self._touched[key] = now
+            self.hits += 1
+            return row[0], row[1]
+
+    def _flush_touched(self) -> None:
+        """Escribe las horas de acceso pendientes (con el lock tomado, sin commit)."""
+        if self._touched:
+            self._conn.executemany("UPDATE llm_cache SET accessed = ? WHERE key = ?",
+                                   [(ts, key) for key, ts in self._touched.items()])
+            self._touched.clear()
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._flush_touched()
+            self._touched.pop(key, None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)", (key, value, now, now))
+            self._conn.commit()
+            self._writes += 1
+            compact = self._writes % _COMPACT_EVERY == 0
+        if compact:
+            self.compact()
+
+    def compact(self) -> int:
+        """Borra expiradas y las menos usadas por encima del tope. Retorna borradas."""
+        with self._lock, self._conn:
+            self._flush_touched()
+            expired = self._conn.execute("DELETE FROM llm_cache WHERE created < ?",
+                                         (time.time() - self.ttl,)).rowcount
+            count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            excess = count - self.max_entries
+            evicted = 0
+            if excess > 0:
+                evicted = self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY accessed LIMIT ?)", (excess,)).rowcount
+        removed = expired + evicted
+        if removed:
+            self.expirations += expired
+            self.evictions += evicted
+            with self._lock:
+                self._conn.execute("PRAGMA incremental_vacuum")
+        return removed
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
+
+    def get_stats(self) -> dict:
+        return {
+            "entries": self.count(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class TieredCache:
+    """Read-through memoria → disco. Los hits de disco se promueven a memoria."""
+
+    def __init__(self, memory: TTLCache, disk: DiskCache | None = None):
+        self.memory = memory
+        self.disk = disk
+
+    async def get(self, key: str) -> str | None:
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+        loop = asyncio.get_running_loop()
+        entry = await loop.run_in_executor(None, self.disk.get, key)
+        if entry is None:
+            return None
+        _, value = entry
+        self.memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.disk.set, key, value)
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+
+    def get_stats(self) -> dict:
+        mem = self.memory.get_stats()
+        stats = {"memory": mem}
+        hits = mem["hits"]
+        if self.disk is not None:
+            stats["disk"] = self.disk.get_stats()
+            hits += stats["disk"]["hits"]
+        lookups = mem["hits"] + mem["misses"]
+        stats["hit_rate"] = round(hits / lookups, 3) if lookups else 0.0
+        return stats
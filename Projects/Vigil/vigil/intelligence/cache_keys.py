@@ -0,0 +1,228 @@
+"""Keys de cache normalizadas por regla para el enriquecimiento LLM.
+
+La explicación del LLM describe una *situación* ("node.exe no confiable
+abrió un puerto"), no un evento puntual. Si la key incluye PID,
+time_generated o uso de memoria, la misma situación casi nunca pega en
+cache. Acá cada campo de event.data pasa por un normalizador que descarta
+o agrupa lo volátil.
+
+Cada regla puede declarar un template en su YAML:
+
+    cache_key: [process, local_port, remote_ip:ip]
+
+Solo los campos listados entran en la key. "campo:normalizador" fuerza un
+normalizador; sin sufijo se usa el default del campo (_FIELD_DEFAULTS).
+Reglas sin template usan todos los campos con sus defaults.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import ipaddress
+import re
+from typing import Callable
+
+from ..core.events import Alert
+from ..core.logger import get_logger
+
+log = get_logger("cache_keys")
+
+_DROP = object()  # marcador: el campo no entra en la key
+
+# Puertos cuyo número importa para la explicación (malware, servicios conocidos)
+_NOTABLE_PORTS = {
+    1337, 1433, 1723, 3306, 3389, 4443, 4444, 4445, 5432, 5555, 5900,
+    5985, 5986, 6379, 6666, 6667, 6697, 8080, 8443, 8888, 9999, 27017, 31337,
+}
+
+_USER_PROFILE = re.compile(r"^[a-z]:\\users\\[^\\]+\\")
+_GUID = re.compile(r"\{?[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\}?")
+_DIGITS = re.compile(r"[0-9a-f]*\d[0-9a-f]*")
+_WHITESPACE = re.compile(r"\s+")
+
+# Largo máximo de un campo de texto en situation_text()
+_MAX_TEXT = 2000
+
+
+def _exact(value) -> str:
+    return str(value)
+
+
+def _lower(value) -> str:
+    return str(value).strip().lower()
+
+
+def _port(value) -> str:
+    """Puertos bajos y conocidos tal cual; el resto por rango."""
+    try:
+        port = int(value)
+    except (TypeError, ValueError):
+        return _lower(value)
+    if port < 1024 or port in _NOTABLE_PORTS:
+        return str(port)
+    return "registered" if port < 49152 else "ephemeral"
+
+
+def _path(value) -> str:
+    """Generaliza perfil de usuario, GUIDs y dígitos/hex del nombre de archivo.
+
+    C:\\Users\\ana\\AppData\\Local\\Temp\\tmp4f2a.exe → %userprofile%\\appdata\\local\\temp\\tmp#.exe
+    """
+    path = str(value).strip().lower().replace("/", "\\")
+    path = _USER_PROFILE.sub(r"%userprofile%\\", path)
+    path = _GUID.sub("{guid}", path)
+    head, sep, name = path.rpartition("\\")
+    stem, dot, ext = name.rpartition(".") if "." in name else (name, "", "")
+    return f"{head}{sep}{_DIGITS.sub('#', stem)}{dot}{ext}"
+
+
+def _hash(value) -> str:
+    """Hash del texto con espacios colapsados (script blocks, comandos)."""
+    text = _WHITESPACE.sub(" ", str(value)).strip().lower()
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _collapse(value) -> str:
+    """Texto con espacios colapsados, acotado (para embeddings)."""
+    return _WHITESPACE.sub(" ", str(value)).strip().lower()[:_MAX_TEXT]
+
+
+def _ip(value) -> str:
+    """Clase de la IP: lo que cambia la explicación es LAN vs internet."""
+    try:
+        ip = ipaddress.ip_address(str(value).strip().strip("[]"))
+    except ValueError:
+        return _lower(value)
+    if ip.is_unspecified:
+        return "any"
+    if ip.is_loopback:
+        return "loopback"
+    if ip.is_link_local:
+        return "link_local"
+    if ip.is_private:
+        return "private"
+    return "public"
+
+
+def _count(value) -> str:
+    """Potencia de 2 inferior: 21 y 30 puertos son la misma situación."""
+    try:
+        n = int(value)
+    except (TypeError, ValueError):
+        return _lower(value)
+    return f">={1 << (n.bit_length() - 1)}" if n > 0 else "0"
+
+
+def _drop(value):
+    return _DROP
+
+
+NORMALIZERS: dict[str, Callable[[object], object]] = {
+    "exact": _exact,
+    "lower": _lower,
+    "port": _port,
+    "path": _path,
+    "hash": _hash,
+    "ip": _ip,
+    "count": _count,
+    "drop": _drop,
+}
+
+# Normalizador por defecto de cada campo conocido de event.data (resto: exact)
+_FIELD_DEFAULTS = {
+    # Volátiles: no describen la situación
+    "pid": "drop",
+    "time_generated": "drop",
+    "mem_usage": "drop",
+    "session": "drop",
+    "sample_ports": "drop",
+    "window_seconds": "drop",
+    "event_id": "drop",
+    "channel": "drop",
+    "source_name": "drop",
+    # Agrupados
+    "process": "lower",
+    "name": "lower",
+    "target_user": "lower",
+    "workstation": "lower",
+    "service_name": "lower",
+    "local_port": "port",
+    "remote_port": "port",
+    "local_addr": "ip",
+    "remote_ip": "ip",
+    "ip_address": "ip",
+    "source_ip": "ip",
+    "unique_ports": "count",
+    "path": "path",
+    "file_path": "path",
+    "file_name": "path",
+    "directory": "path",
+    "service_path": "path",
+    "script_path": "path",
+    "script_block": "hash",
+}
+
+
+def _parse_template(rule_id: str, template: list[str]) -> list[tuple[str, Callable]]:
+    fields = []
+    for entry in template:
+        name, _, norm = str(entry).partition(":")
+        norm = norm or _FIELD_DEFAULTS.get(name, "exact")
+        fn = NORMALIZERS.get(norm)
+        if fn is None:
+            log.warning("Regla %s: normalizador desconocido '%s' en cache_key, usando exact",
+                        rule_id, norm)
+            fn = _exact
+        fields.append((name, fn))
+    return fields
+
+
+class CacheKeyBuilder:
+    """Arma keys de cache a nivel situación a partir de templates por regla."""
+
+    def __init__(self, templates: dict[str, list[str]] | None = None):
+        self._templates = {
+            rule_id: _parse_template(rule_id, template)
+            for rule_id, template in (templates or {}).items()
+        }
+
+    def _fields(self, rule_id: str, data: dict) -> list[tuple[str, Callable]]:
+        template = self._templates.get(rule_id)
+        if template is None:
+            template = [
+                (name, NORMALIZERS[_FIELD_DEFAULTS.get(name, "exact")])
+                for name in sorted(data)
+            ]
+        return template
+
+    def key(self, rule_id: str, data: dict | None) -> str:
+        data = data or {}
+        parts = [rule_id]
+        for name, fn in self._fields(rule_id, data):
+            value = data.get(name)
+            if value is None:
+                continue
+            norm = fn(value)
+            if norm is not _DROP:
+                parts.append(f"{name}={norm}")
+        return "|".join(parts)
+
+    def alert_key(self, alert: Alert) -> str:
+        return self.key(alert.rule_id, alert.event.data if alert.event else None)
+
+    def situation_text(self, alert: Alert) -> str:
+        """Texto normalizado para embeddings (cache semántico).
+
+        Mismos campos que la key, pero los campos hasheados van como texto:
+        dos script blocks casi iguales deben quedar cerca, no en hashes distintos.
+        """
+        data = (alert.event.data if alert.event else None) or {}
+        lines = [alert.rule_id]
+        for name, fn in self._fields(alert.rule_id, data):
+            value = data.get(name)
+            if value is None:
+                continue
+            norm = _collapse(value) if fn is _hash else fn(value)
+            if norm is not _DROP:
+                lines.append(f"{name}: {norm}")
+        return "\n".join(lines)
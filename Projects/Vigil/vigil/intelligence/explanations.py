@@ -0,0 +1,218 @@
+"""Explicaciones precomputadas por regla, con placeholders de event.data.
+
+La mayoría de las alertas de una regla (NET003, FS002...) merecen la misma
+explicación con otros datos. `python -m vigil explain-rules` le pide al LLM
+una vez por regla un template como
+
+    "{process} abrió el puerto {local_port}. Si no lo reconoces, ..."
+
+y lo guarda junto al archivo de reglas (<reglas>.explanations.yaml). En
+runtime el analizador lo completa al instante y reserva el LLM para
+alertas CRITICAL, situaciones novedosas (la primera vez que aparece su
+cache key, o data["novel"]) o reglas sin template utilizable.
+
+Cada template guarda el fingerprint de su regla: si la regla cambia, el
+template se ignora hasta regenerarlo.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import string
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+import yaml
+
+from ..core.events import Alert
+from ..core.logger import get_logger
+from ..core.rule_engine import Rule
+from .backend import LLMBackend
+
+log = get_logger("explanations")
+
+_FORMATTER = string.Formatter()
+
+# Largo máximo de un valor insertado en el template
+_MAX_VALUE = 120
+
+
+def explanations_path(rules_path: str | Path) -> Path:
+    """Archivo de templates asociado a un archivo de reglas."""
+    path = Path(rules_path)
+    return path.with_name(path.stem + ".explanations.yaml")
+
+
+def rule_fingerprint(rule: Rule) -> str:
+    """Hash de lo que el template describe: si cambia, el template queda viejo."""
+    parts = [rule.id, rule.name, rule.description, rule.severity.name,
+             rule.alert_title, rule.alert_description]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
+def placeholders(text: str) -> set[str]:
+    """Campos {x} de un template. ValueError si las llaves están mal formadas."""
+    return {name for _, name, _, _ in _FORMATTER.parse(text) if name}
+
+
+def rule_fields(rule: Rule) -> list[str]:
+    """Campos de event.data que una regla garantiza o usa: títulos, condiciones y cache_key."""
+    fields: list[str] = []
+    for text in (rule.alert_title, rule.alert_description):
+        try:
+            fields.extend(sorted(placeholders(text)))
+        except ValueError:
+            pass
+    fields.extend(c.field for c in rule.conditions)
+    fields.extend(spec.partition(":")[0] for spec in rule.cache_key or [])
+    return list(dict.fromkeys(fields))
+
+
+def validate_template(text: str, allowed: list[str]) -> str | None:
+    """Motivo por el que un template no sirve, o None si es válido."""
+    if not text.strip():
+        return "vacío"
+    try:
+        names = placeholders(text)
+    except ValueError as e:
+        return f"llaves mal formadas: {e}"
+    bad = {n for n in names if not n.isidentifier() or n not in allowed}
+    if bad:
+        return f"campos desconocidos: {', '.join(sorted(bad))}"
+    # Los valores se insertan como texto: {x:d} o {x!r} fallarían o lo deformarían
+    specs = {name for _, name, spec, conv in _FORMATTER.parse(text) if name and (spec or conv)}
+    if specs:
+        return f"formato o conversión en campos: {', '.join(sorted(specs))}"
+    return None
+
+
+class ExplanationTemplates:
+    """Templates por rule_id cargados del archivo generado por explain-rules."""
+
+    def __init__(self, templates: dict[str, str] | None = None):
+        self.templates = templates or {}
+        self.stale = 0  # templates ignorados por regla modificada
+
+    @classmethod
+    def load(cls, path: str | Path, rules: list[Rule]) -> ExplanationTemplates:
+        """Carga los templates vigentes para las reglas dadas (archivo opcional)."""
+        path = Path(path)
+        instance = cls()
+        if not path.exists():
+            return instance
+        try:
+            raw = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+        except (OSError, yaml.YAMLError) as e:
+            log.warning("No se pudieron cargar explicaciones de %s: %s", path, e)
+            return instance
+
+        entries = raw.get("explanations") or {}
+        for rule in rules:
+            entry = entries.get(rule.id)
+            if not isinstance(entry, dict) or not entry.get("template"):
+                continue
+            if entry.get("fingerprint") != rule_fingerprint(rule):
+                instance.stale += 1
+                continue
+            if validate_template(entry["template"], rule_fields(rule)) is None:
+                instance.templates[rule.id] = entry["template"]
+        if instance.stale:
+            log.warning("%d explicaciones desactualizadas en %s (regenerar con explain-rules)",
+                        instance.stale, path.name)
+        log.info("Cargadas %d explicaciones precomputadas desde %s",
+                 len(instance.templates), path.name)
+        return instance
+
+    def __contains__(self, rule_id: str) -> bool:
+        return rule_id in self.templates
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def render(self, alert: Alert) -> str | None:
+        """Completa el template de la regla. None si no hay, falta algún campo o no formatea."""
+        template = self.templates.get(alert.rule_id)
+        if template is None:
+            return None
+        data = alert.event.data if alert.event else {}
+        values = {}
+        for name in placeholders(template):
+            value = data.get(name)
+            if value is None or value == "":
+                return None
+            text = " ".join(str(value).split())
+            values[name] = text if len(text) <= _MAX_VALUE else text[:_MAX_VALUE] + "…"
+        try:
+            return template.format_map(values)
+        except (ValueError, TypeError, KeyError, IndexError) as e:
+            # Template editado a mano que validate_template no vio: queda el LLM
+            log.debug("Template de %s no formatea: %s", alert.rule_id, e)
+            return None
+
+
+TEMPLATE_SYSTEM = """Eres un analista de seguridad que escribe explicaciones reutilizables para
+las alertas de un IDS personal en Windows 11. Escribes en español, claro y directo."""
+
+
+def build_template_prompt(rule: Rule, fields: list[str]) -> str:
+    """Prompt que pide una explicación parametrizada para una regla."""
+    names = ", ".join("{" + f + "}" for f in fields) or "(ninguno)"
+    return f"""Regla {rule.id} ({rule.severity.name}): {rule.name}
+{rule.description}
+Título de la alerta: {rule.alert_title}
+Descripción de la alerta: {rule.alert_description}
+Campos disponibles: {names}
+
+Escribe en 2-3 oraciones qué significa esta alerta para un usuario normal,
+si suele ser benigna o preocupante y qué acción recomiendas. Usa los campos
+entre llaves donde corresponda al dato concreto de cada alerta; no uses
+ningún otro texto entre llaves. Responde solo con la explicación."""
+
+
+async def generate_templates(backend: LLMBackend, rules: list[Rule], attempts: int = 2,
+                             on_result: Callable[[Rule, str | None, str | None], None] | None = None,
+                             ) -> dict[str, str]:
+    """Genera un template por regla; reintenta si el LLM usa campos inválidos.
+
+    on_result(regla, template, motivo) se llama por cada regla (template
+    None si se descartó, con el motivo del último intento).
+    """
+    templates = {}
+    for rule in rules:
+        fields = rule_fields(rule)
+        prompt = build_template_prompt(rule, fields)
+        template, reason = None, None
+        for _ in range(attempts):
+            text = await backend.generate(prompt, num_predict=300, system=TEMPLATE_SYSTEM)
+            if text is None:
+                reason = "el LLM no respondió"
+                continue
+            text = " ".join(text.strip().strip('"').split())
+            reason = validate_template(text, fields)
+            if reason is None:
+                template = text
+                break
+        if template is not None:
+            templates[rule.id] = template
+        if on_result:
+            on_result(rule, template, reason)
+    return templates
+
+
+def save_templates(path: str | Path, rules: list[Rule], templates: dict[str, str],
+                   model: str) -> None:
+    """Escribe el archivo de explicaciones (YAML) junto a las reglas."""
+    doc = {
+        "model": model,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "explanations": {
+            rule.id: {"fingerprint": rule_fingerprint(rule), "template": templates[rule.id]}
+            for rule in rules if rule.id in templates
+        },
+    }
+    header = ("# Generado por: python -m vigil explain-rules\n"
+              "# Explicaciones por regla con {campos} de event.data. Se pueden editar a mano;\n"
+              "# un template se ignora si su regla cambió (fingerprint distinto).\n")
+    Path(path).write_text(header + yaml.safe_dump(doc, allow_unicode=True, sort_keys=False,
+                                                  width=100), encoding="utf-8")
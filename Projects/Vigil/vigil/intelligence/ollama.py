@@ -1,74 +1,120 @@
-"""Cliente Ollama con rate limiting para enriquecimiento de alertas."""
+"""Cliente HTTP de Ollama para enriquecimiento de alertas.
+
+El ritmo de llamadas (prioridad, rate, concurrencia) lo controla
+RequestScheduler en el analizador; este cliente solo transporta.
+Ollama no expone cuántas requests atiende en paralelo
+(OLLAMA_NUM_PARALLEL), así que discover_slots() queda en None.
+"""
 
 from __future__ import annotations
 
-import asyncio
-import time
+import json
+from typing import AsyncIterator
 
 import httpx
 
-from ..core.config import OllamaConfig
 from ..core.logger import get_logger
+from .backend import LLMBackend, StreamError
 
 log = get_logger("ollama")
 
 
-class OllamaClient:
-    """Cliente HTTP para la API de Ollama con rate limiting."""
+class OllamaClient(LLMBackend):
+    """Cliente HTTP para la API nativa de Ollama.
 
-    def __init__(self, config: OllamaConfig):
-        self.config = config
-        self._last_call: float = 0
-        self._available: bool | None = None  # None = no chequeado
+    Usa un único httpx.AsyncClient de larga vida (pool con keep-alive),
+    así cada enriquecimiento reutiliza la conexión en lugar de pagar el
+    setup TCP en cada llamada. Cerrar con aclose() al apagar.
+    """
 
-    async def is_available(self) -> bool:
-        """Verifica si Ollama está corriendo."""
-        try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(
-                    f"{self.config.url}/api/tags",
-                    timeout=5,
-                )
-                self._available = resp.status_code == 200
-                return self._available
-        except (httpx.ConnectError, httpx.TimeoutException):
-            self._available = False
-            return False
+    name = "ollama"
+    health_path = "/api/tags"
 
-    async def generate(self, prompt: str) -> str | None:
-        """Genera una respuesta con rate limiting. Retorna None si falla."""
-        # Rate limiting
-        now = time.time()
-        wait = self.config.rate_limit - (now - self._last_call)
-        if wait > 0:
-            await asyncio.sleep(wait)
-
-        self._last_call = time.time()
+    def _payload(self, prompt: str, stream: bool, num_predict: int = 300,
+                 system: str | None = None) -> dict:
+        payload = {
+            "model": self.config.model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.config.keep_alive,
+            "options": {
+                "temperature": 0.3,
+                "num_predict": num_predict,
+            },
+        }
+        # System prompt fijo: Ollama reutiliza la evaluación del prefijo común
+        if system:
+            payload["system"] = system
+        return payload
 
+    async def generate(self, prompt: str, num_predict: int = 300,
+                       system: str | None = None) -> str | None:
+        """Genera una respuesta. Retorna None si falla."""
         try:
-            async with httpx.AsyncClient() as client:
+            async with self._session() as client:
                 resp = await client.post(
-                    f"{self.config.url}/api/generate",
-                    json={
-                        "model": self.config.model,
-                        "prompt": prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.3,
-                            "num_predict": 300,
-                        },
-                    },
-                    timeout=self.config.timeout,
+                    "/api/generate",
+                    json=self._payload(prompt, stream=False, num_predict=num_predict,
+                                       system=system),
                 )
-                if resp.status_code == 200:
-                    return resp.json().get("response", "").strip()
-                else:
-                    log.warning("Ollama respondió %d", resp.status_code)
-                    return None
+            if resp.status_code == 200:
+                return resp.json().get("response", "").strip()
+            else:
+                log.warning("Ollama respondió %d", resp.status_code)
+                return None
         except (httpx.ConnectError, httpx.TimeoutException) as e:
             log.debug("Ollama no disponible: %s", e)
-            self._available = False
             return None
         except Exception as e:
             log.warning("Error en Ollama: %s", e)
             return None
+
+    async def embed(self, text: str, model: str) -> list[float] | None:
+        """Embedding de un texto via /api/embeddings. Retorna None si falla."""
+        try:
+            async with self._session() as client:
+                resp = await client.post(
+                    "/api/embeddings",
+                    json={"model": model, "prompt": text, "keep_alive": self.config.keep_alive},
+                )
+            if resp.status_code == 200:
+                return resp.json().get("embedding") or None
+            log.warning("Ollama embeddings respondió %d", resp.status_code)
+            return None
+        except (httpx.ConnectError, httpx.TimeoutException) as e:
+            log.debug("Ollama no disponible: %s", e)
+            return None
+        except (httpx.HTTPError, ValueError) as e:
+            log.warning("Error en embeddings de Ollama: %s", e)
+            return None
+
+    async def generate_stream(self, prompt: str, system: str | None = None) -> AsyncIterator[str]:
+        """Genera en streaming: itera fragmentos de texto a medida que llegan.
+
+        Ollama responde NDJSON ({"response": "...", "done": false} por línea).
+        Si el consumidor corta la iteración (aclose), la conexión se cierra y
+        Ollama deja de generar. Si el request falla o el stream termina sin
+        "done" (conexión caída, timeout, línea inválida) lanza StreamError.
+        """
+        try:
+            async with self._session() as client, client.stream(
+                "POST", "/api/generate", json=self._payload(prompt, stream=True, system=system),
+            ) as resp:
+                if resp.status_code != 200:
+                    log.warning("Ollama respondió %d", resp.status_code)
+                    raise StreamError(f"HTTP {resp.status_code}")
+                async for line in resp.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        return
+        except (httpx.ConnectError, httpx.TimeoutException) as e:
+            log.debug("Ollama no disponible: %s", e)
+            raise StreamError(str(e)) from e
+        except (httpx.HTTPError, ValueError) as e:
+            log.warning("Error en stream de Ollama: %s", e)
+            raise StreamError(str(e)) from e
+        raise StreamError("stream cortado antes de done")
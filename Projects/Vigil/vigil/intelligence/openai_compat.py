@@ -0,0 +1,153 @@
+"""Backend OpenAI-compatible (llama.cpp server, vLLM, LM Studio).
+
+Habla /v1/chat/completions (normal y streaming SSE) y /v1/embeddings.
+Servidores como llama.cpp atienden varias requests a la vez en slots
+paralelos con batching continuo: discover_slots() lee cuántos hay
+(/props → total_slots, o el largo de /slots) para que el scheduler
+mantenga esa cantidad en vuelo en lugar de serializar.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import AsyncIterator
+
+import httpx
+
+from ..core.logger import get_logger
+from .backend import LLMBackend, StreamError
+
+log = get_logger("openai_compat")
+
+
+class OpenAICompatClient(LLMBackend):
+    """Cliente para servidores con API OpenAI-compatible."""
+
+    name = "openai"
+    health_path = "/v1/models"
+
+    def _headers(self) -> dict:
+        if self.config.api_key:
+            return {"Authorization": f"Bearer {self.config.api_key}"}
+        return {}
+
+    async def discover_slots(self) -> int | None:
+        """Slots paralelos del servidor: /props (llama.cpp) o /slots."""
+        slots = None
+        try:
+            async with self._session() as client:
+                resp = await client.get("/props", timeout=5)
+                if resp.status_code == 200:
+                    body = resp.json()
+                    if isinstance(body, dict):
+                        slots = body.get("total_slots")
+                if not slots:
+                    resp = await client.get("/slots", timeout=5)
+                    if resp.status_code == 200:
+                        body = resp.json()
+                        if isinstance(body, list):
+                            slots = len(body)
+        except (httpx.HTTPError, ValueError) as e:
+            log.debug("No se pudieron descubrir slots: %s", e)
+            return None
+        if not isinstance(slots, int) or isinstance(slots, bool) or slots < 1:
+            return None
+        # El pool HTTP tiene que poder sostener todos los slots en vuelo; el
+        # probe del breaker u otro request pueden estar usando el cliente actual
+        if slots > self.max_keepalive:
+            await self._resize_pool(max(self.max_connections, slots), slots)
+        return int(slots)
+
+    def _payload(self, prompt: str, stream: bool, num_predict: int = 300,
+                 system: str | None = None) -> dict:
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": prompt})
+        return {
+            "model": self.config.model,
+            "messages": messages,
+            "stream": stream,
+            "temperature": 0.3,
+            "max_tokens": num_predict,
+        }
+
+    async def generate(self, prompt: str, num_predict: int = 300,
+                       system: str | None = None) -> str | None:
+        """Genera una respuesta. Retorna None si falla."""
+        try:
+            async with self._session() as client:
+                resp = await client.post(
+                    "/v1/chat/completions",
+                    json=self._payload(prompt, stream=False, num_predict=num_predict,
+                                       system=system),
+                )
+            if resp.status_code != 200:
+                log.warning("Servidor LLM respondió %d", resp.status_code)
+                return None
+            choices = resp.json().get("choices") or []
+            if not choices:
+                return None
+            return (choices[0].get("message", {}).get("content") or "").strip()
+        except (httpx.ConnectError, httpx.TimeoutException) as e:
+            log.debug("Servidor LLM no disponible: %s", e)
+            return None
+        except (httpx.HTTPError, ValueError) as e:
+            log.warning("Error en servidor LLM: %s", e)
+            return None
+
+    async def embed(self, text: str, model: str) -> list[float] | None:
+        """Embedding de un texto via /v1/embeddings. Retorna None si falla."""
+        try:
+            async with self._session() as client:
+                resp = await client.post(
+                    "/v1/embeddings", json={"model": model, "input": text},
+                )
+            if resp.status_code != 200:
+                log.warning("Servidor LLM embeddings respondió %d", resp.status_code)
+                return None
+            data = resp.json().get("data") or []
+            return data[0].get("embedding") if data else None
+        except (httpx.ConnectError, httpx.TimeoutException) as e:
+            log.debug("Servidor LLM no disponible: %s", e)
+            return None
+        except (httpx.HTTPError, ValueError) as e:
+            log.warning("Error en embeddings del servidor LLM: %s", e)
+            return None
+
+    async def generate_stream(self, prompt: str, system: str | None = None) -> AsyncIterator[str]:
+        """Genera en streaming: Server-Sent Events "data: {...}" hasta "data: [DONE]".
+
+        Si el consumidor corta la iteración (aclose), la conexión se cierra
+        y el servidor libera el slot. Si el request falla o el stream termina
+        sin [DONE] ni finish_reason lanza StreamError.
+        """
+        try:
+            async with self._session() as client, client.stream(
+                "POST", "/v1/chat/completions",
+                json=self._payload(prompt, stream=True, system=system),
+            ) as resp:
+                if resp.status_code != 200:
+                    log.warning("Servidor LLM respondió %d", resp.status_code)
+                    raise StreamError(f"HTTP {resp.status_code}")
+                async for line in resp.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        return
+                    choices = json.loads(data).get("choices") or []
+                    if not choices:
+                        continue
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        yield content
+                    if choices[0].get("finish_reason"):
+                        return
+        except (httpx.ConnectError, httpx.TimeoutException) as e:
+            log.debug("Servidor LLM no disponible: %s", e)
+            raise StreamError(str(e)) from e
+        except (httpx.HTTPError, ValueError) as e:
+            log.warning("Error en stream del servidor LLM: %s", e)
+            raise StreamError(str(e)) from e
+        raise StreamError("stream cortado antes de [DONE]")
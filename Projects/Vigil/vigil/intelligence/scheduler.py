@@ -0,0 +1,251 @@
+"""Scheduler de requests a Ollama: prioridad, token bucket y concurrencia AIMD.
+
+Reemplaza el rate limit por sleep contra un _last_call compartido (que
+llamadas concurrentes pisaban y que ignoraba la severidad):
+
+- Cola de prioridad por severidad: CRITICAL sale antes que LOW, FIFO
+  dentro de la misma severidad.
+- Token bucket: rate = 1 / rate_limit requests por segundo, con ráfaga
+  de hasta `burst` requests.
+- Concurrencia adaptativa AIMD: +1/limit por request exitosa y rápida,
+  ×0.5 ante error o latencia por encima de target_latency.
+- Deadline: trabajo LOW/MEDIUM que espera más de `deadline` segundos en
+  cola se descarta (resultado None). HIGH/CRITICAL nunca se descartan.
+  El despachador vence la cola al encolar y con un timer al próximo
+  deadline, aunque no se libere ningún slot.
+- Un trabajo que lanza JobRejected no llegó al backend (circuito
+  abierto): resuelve None sin tocar la ventana AIMD.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from ..core.events import Severity
+from ..core.logger import get_logger
+
+log = get_logger("scheduler")
+
+T = TypeVar("T")
+
+# Muestras de espera en cola para percentiles
+_WAIT_SAMPLES = 256
+
+
+class JobRejected(Exception):
+    """El trabajo no llegó al backend (p. ej. circuit breaker abierto)."""
+
+
+class RequestScheduler:
+    """Despacha trabajos async por prioridad respetando rate y concurrencia.
+
+    Un trabajo es una función sin argumentos que retorna una corrutina.
+    Un resultado None cuenta como fallo para el control AIMD; JobRejected no.
+    """
+
+    def __init__(self, rate_limit: float = 2.0, burst: int = 1, max_concurrency: int = 2,
+                 target_latency: float = 20.0, deadline: float = 120.0, max_queue: int = 200):
+        self.rate = 1.0 / rate_limit if rate_limit > 0 else None  # None = sin límite
+        self.burst = max(1, burst)
+        self.max_concurrency = max(1, max_concurrency)
+        self.target_latency = target_latency
+        self.deadline = deadline
+        self.max_queue = max_queue
+
+        self.limit = 1.0  # ventana de concurrencia AIMD
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._in_flight = 0
+        self._heap: list = []  # (-severidad, seq, encolado, severidad, job, future)
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.dropped_deadline = 0
+        self.dropped_full = 0
+        self._waits: deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self._latencies: deque[float] = deque(maxlen=_WAIT_SAMPLES)
+
+    def set_capacity(self, slots: int) -> None:
+        """Backend con slots paralelos conocidos: tope y ventana arrancan en slots."""
+        self.max_concurrency = max(1, slots)
+        self.limit = float(self.max_concurrency)
+        self._wakeup.set()
+
+    async def submit(self, severity: Severity, job: Callable[[], Awaitable[T]]) -> T | None:
+        """Encola un trabajo y espera su resultado (None si se descartó)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._dispatch(), name="llm-scheduler")
+
+        future = asyncio.get_running_loop().create_future()
+        item = (-int(severity), next(self._seq), time.monotonic(), severity, job, future)
+        if len(self._heap) >= self.max_queue and not self._evict_for(item):
+            self.dropped_full += 1
+            return None
+        heapq.heappush(self._heap, item)
+        self.submitted += 1
+        self._wakeup.set()
+        return await future
+
+    def _evict_for(self, item) -> bool:
+        """Cola llena: descarta el trabajo de menor prioridad si el nuevo es mejor."""
+        worst = max(self._heap)
+        if worst[:2] <= item[:2]:
+            return False
+        self._heap.remove(worst)
+        heapq.heapify(self._heap)
+        worst[5].set_result(None)
+        self.dropped_full += 1
+        return True
+
+    def _expire(self, now: float) -> None:
+        """Descarta LOW/MEDIUM que superaron el deadline en cola."""
+        keep = []
+        for item in self._heap:
+            severity, future = item[3], item[5]
+            if future.done():
+                continue
+            if severity < Severity.HIGH and now - item[2] > self.deadline:
+                future.set_result(None)
+                self.dropped_deadline += 1
+                continue
+            keep.append(item)
+        if len(keep) != len(self._heap):
+            heapq.heapify(keep)
+            self._heap = keep
+
+    def _next_expiry(self, now: float) -> float | None:
+        """Segundos hasta que venza el LOW/MEDIUM más viejo en cola (None = ninguno)."""
+        oldest = min((item[2] for item in self._heap if item[3] < Severity.HIGH), default=None)
+        if oldest is None:
+            return None
+        return max(0.0, oldest + self.deadline - now)
+
+    def _token_delay(self, now: float) -> float:
+        """Segundos hasta que haya un token (0 = hay uno disponible)."""
+        if self.rate is None:
+            return 0.0
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def _dispatch(self) -> None:
+        while True:
+            # Despertar por encolado, slot libre o el próximo deadline en cola
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._next_expiry(time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self._expire(time.monotonic())
+            while self._heap and self._in_flight < int(self.limit):
+                now = time.monotonic()
+                self._expire(now)
+                if not self._heap:
+                    break
+                delay = self._token_delay(now)
+                if delay > 0:
+                    # Esperar el token y re-evaluar: pudo entrar algo más prioritario
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                        self._wakeup.clear()
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                item = heapq.heappop(self._heap)
+                if item[5].done():
+                    continue
+                if self.rate is not None:
+                    self._tokens -= 1
+                self._waits.append(now - item[2])
+                self._in_flight += 1
+                task = asyncio.create_task(self._execute(item[4], item[5]))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+    async def _execute(self, job, future: asyncio.Future) -> None:
+        start = time.monotonic()
+        result = None
+        rejected = False
+        try:
+            result = await job()
+        except JobRejected:
+            rejected = True
+        except Exception as e:
+            log.debug("Request a Ollama falló: %s", e)
+        finally:
+            latency = time.monotonic() - start
+            self._in_flight -= 1
+            if rejected:
+                self.rejected += 1
+            else:
+                self._adjust(result is not None, latency)
+            if not future.done():
+                future.set_result(result)
+            self._wakeup.set()
+
+    def _adjust(self, ok: bool, latency: float) -> None:
+        """AIMD sobre la ventana de concurrencia."""
+        self._latencies.append(latency)
+        if ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+        if ok and latency <= self.target_latency:
+            self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+        else:
+            self.limit = max(1.0, self.limit / 2)
+
+    async def aclose(self) -> None:
+        """Detiene el despacho; lo encolado se resuelve con None."""
+        for item in self._heap:
+            if not item[5].done():
+                item[5].set_result(None)
+        self._heap.clear()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    @staticmethod
+    def _percentile(samples, q: float) -> float:
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def get_stats(self) -> dict:
+        by_severity = {}
+        for item in self._heap:
+            name = item[3].name
+            by_severity[name] = by_severity.get(name, 0) + 1
+        return {
+            "queued": len(self._heap),
+            "queued_by_severity": by_severity,
+            "in_flight": self._in_flight,
+            "concurrency_limit": round(self.limit, 2),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "dropped_deadline": self.dropped_deadline,
+            "dropped_full": self.dropped_full,
+            "wait_p50_ms": round(self._percentile(self._waits, 0.5) * 1000, 1),
+            "wait_p95_ms": round(self._percentile(self._waits, 0.95) * 1000, 1),
+            "wait_max_ms": round(max(self._waits, default=0.0) * 1000, 1),
+            "latency_p50_ms": round(self._percentile(self._latencies, 0.5) * 1000, 1),
+        }
@@ -0,0 +1,264 @@
+"""Cache semántico de explicaciones LLM por similitud de embeddings.
+
+Capa opcional detrás del cache exacto: si dos alertas de la misma regla
+son casi iguales (dos script blocks que difieren en una variable), la
+explicación de la primera sirve para la segunda sin pagar otra generación.
+
+- Embeddings: endpoint /api/embeddings de Ollama, o un hashing vectorizer
+  local (sin modelo, determinístico entre reinicios).
+- Índice: matriz NumPy (max_entries × dim) de vectores normalizados; la
+  búsqueda es un producto matriz-vector (coseno) filtrado por regla.
+- Acotado: al llenarse reemplaza la entrada usada hace más tiempo.
+- Persistencia: .npz junto al cache de explicaciones (escritura atómica).
+  Cada _SAVE_EVERY inserciones se copian los arrays en el loop y el .npz
+  se escribe en un thread del executor, como el tier de disco del cache.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import numpy as np
+
+from ..core.logger import get_logger
+
+log = get_logger("semantic")
+
+_TOKEN = re.compile(r"[a-z0-9_$%\-\.\\/:]+")
+
+# Cada cuántas inserciones se persiste el índice
+_SAVE_EVERY = 50
+
+
+class HashingEmbedder:
+    """Vectorizer por hashing: unigramas, bigramas y trigramas de caracteres.
+
+    Usa crc32 (estable entre procesos, a diferencia de hash()) para que el
+    índice persistido siga siendo válido tras reiniciar.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def _features(self, text: str) -> list[str]:
+        words = _TOKEN.findall(text.lower())
+        feats = list(words)
+        feats += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"^{word}$"
+            feats += [padded[i:i + 3] for i in range(len(padded) - 2)]
+        return feats
+
+    async def __call__(self, text: str) -> np.ndarray | None:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feat in self._features(text):
+            h = zlib.crc32(feat.encode("utf-8"))
+            vec[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vec
+
+
+class OllamaEmbedder:
+    """Embeddings via Ollama (p. ej. nomic-embed-text)."""
+
+    def __init__(self, embed: Callable[[str, str], Awaitable[list[float] | None]], model: str):
+        self._embed = embed
+        self.model = model
+        self.name = f"ollama:{model}"
+
+    async def __call__(self, text: str) -> np.ndarray | None:
+        values = await self._embed(text, self.model)
+        if not values:
+            return None
+        return np.asarray(values, dtype=np.float32)
+
+
+class SemanticCache:
+    """Índice de vectores normalizados → explicación, acotado y persistente."""
+
+    def __init__(self, embedder, path: str | Path | None = None,
+                 threshold: float = 0.92, max_entries: int = 2000):
+        self.embedder = embedder
+        self.path = Path(path) if path else None
+        self.threshold = threshold
+        self.max_entries = max_entries
+
+        self._vectors: np.ndarray | None = None   # (max_entries, dim), se crea con el primer vector
+        self._used = np.zeros(max_entries, dtype=np.int64)  # tick de último uso (0 = libre)
+        self._rules = np.full(max_entries, "", dtype=object)
+        self._values: list[str] = [""] * max_entries
+        self._size = 0
+        self._tick = 0
+        self._dirty = 0
+        self._saving: asyncio.Future | None = None  # escritura en curso en el executor
+        self._write_lock = threading.Lock()
+        self._written = -1  # tick de la última copia escrita (no pisar con una más vieja)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.embed_errors = 0
+
+        self.load()
+
+    async def embed(self, text: str) -> np.ndarray | None:
+        """Vector normalizado del texto, o None si el embedder falló."""
+        try:
+            vec = await self.embedder(text)
+        except Exception as e:
+            log.debug("Embedder %s falló: %s", self.embedder.name, e)
+            vec = None
+        if vec is None:
+            self.embed_errors += 1
+            return None
+        if self._vectors is not None and vec.shape[0] != self._vectors.shape[1]:
+            log.warning("Dimensión de embedding cambió (%d → %d), reiniciando índice",
+                        self._vectors.shape[1], vec.shape[0])
+            self.clear()
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else None
+
+    def lookup(self, rule_id: str, vec: np.ndarray) -> tuple[str, float] | None:
+        """Explicación más similar de la misma regla si supera el umbral."""
+        if self._vectors is None or self._size == 0:
+            self.misses += 1
+            return None
+        candidates = np.flatnonzero(self._rules[:self._size] == rule_id)
+        if candidates.size == 0:
+            self.misses += 1
+            return None
+        sims = self._vectors[candidates] @ vec
+        best = int(np.argmax(sims))
+        score = float(sims[best])
+        if score < self.threshold:
+            self.misses += 1
+            return None
+        idx = int(candidates[best])
+        self._tick += 1
+        self._used[idx] = self._tick
+        self.hits += 1
+        return self._values[idx], score
+
+    def add(self, rule_id: str, vec: np.ndarray, value: str) -> None:
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vec.shape[0]), dtype=np.float32)
+        if self._size < self.max_entries:
+            idx = self._size
+            self._size += 1
+        else:
+            idx = int(np.argmin(self._used))
+            self.evictions += 1
+        self._tick += 1
+        self._vectors[idx] = vec
+        self._used[idx] = self._tick
+        self._rules[idx] = rule_id
+        self._values[idx] = value
+        self._dirty += 1
+        if self._dirty >= _SAVE_EVERY and self._saving is None:
+            self._save_in_background()
+
+    def clear(self) -> None:
+        self._vectors = None
+        self._used[:] = 0
+        self._size = 0
+
+    def _snapshot(self) -> dict | None:
+        """Copia de los arrays a persistir (en el thread del loop)."""
+        if self.path is None or self._vectors is None:
+            return None
+        n = self._size
+        return {
+            "tick": np.array(self._tick),
+            "embedder": np.array(self.embedder.name),
+            "vectors": self._vectors[:n].copy(),
+            "used": self._used[:n].copy(),
+            "rules": np.array(self._rules[:n].tolist(), dtype=str),
+            "values": np.array(self._values[:n], dtype=str),
+        }
+
+    def _write(self, snapshot: dict) -> bool:
+        """Escribe una copia a .npz (atómico via rename). Seguro desde cualquier thread."""
+        tmp = self.path.with_suffix(".tmp.npz")
+        try:
+            with self._write_lock:
+                tick = int(snapshot["tick"])
+                if tick <= self._written:
+                    return True  # ya se escribió una copia igual o más nueva
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                np.savez_compressed(tmp, **snapshot)
+                tmp.replace(self.path)
+                self._written = tick
+            return True
+        except OSError as e:
+            log.warning("No se pudo guardar el índice semántico en %s: %s", self.path, e)
+            return False
+
+    def _save_in_background(self) -> None:
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        self._dirty = 0
+        self._saving = loop.run_in_executor(None, self._write, snapshot)
+        self._saving.add_done_callback(self._saved)
+
+    def _saved(self, future: asyncio.Future) -> None:
+        self._saving = None
+        if future.cancelled() or future.exception() is not None or not future.result():
+            self._dirty = max(self._dirty, 1)  # close() lo reintenta
+
+    def save(self) -> None:
+        """Persiste el índice a .npz de forma síncrona (al cerrar)."""
+        snapshot = self._snapshot()
+        if snapshot is not None and self._write(snapshot):
+            self._dirty = 0
+
+    def load(self) -> bool:
+        """Restaura el índice si existe y fue creado con el mismo embedder."""
+        if self.path is None or not self.path.exists():
+            return False
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data["embedder"]) != self.embedder.name:
+                    log.info("Índice semántico de otro embedder (%s), se descarta",
+                             data["embedder"])
+                    return False
+                vectors = data["vectors"][:self.max_entries]
+                n = vectors.shape[0]
+                self._vectors = np.zeros((self.max_entries, vectors.shape[1]), dtype=np.float32)
+                self._vectors[:n] = vectors
+                used = data["used"][:n]
+                self._used[:n] = used
+                self._tick = int(used.max()) if n else 0
+                self._rules[:n] = [str(r) for r in data["rules"][:n]]
+                self._values[:n] = [str(v) for v in data["values"][:n]]
+                self._size = n
+            log.info("Índice semántico restaurado desde %s (%d entradas)", self.path, n)
+            return True
+        except (OSError, KeyError, ValueError) as e:
+            log.warning("No se pudo cargar el índice semántico de %s: %s", self.path, e)
+            return False
+
+    def close(self) -> None:
+        if self._dirty:
+            self.save()
+
+    def get_stats(self) -> dict:
+        return {
+            "entries": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "embed_errors": self.embed_errors,
+            "embedder": self.embedder.name,
+        }
@@ -0,0 +1,115 @@
+"""Backends de recolección del estado del sistema (conexiones y procesos).
+
+Los monitors de red y de procesos no lanzan comandos por su cuenta: le
+piden las filas a un SystemCollector.
+- windows: netstat -ano, tasklist y wmic vía subproceso (parsers.py)
+- procfs: lectura directa de /proc en Linux, sin crear procesos (procfs.py)
+
+Los métodos lanzan excepción si la fuente falla; cada consumidor decide
+cómo degradar (tabla vacía, poll sin eventos, cache previo).
+
+Los backends que leen la tabla sin crear procesos (`can_sample`) además
+ofrecen sample_connections(), sincrónico, para el ConnectionSampler
+(sampler.py) que corre en su propio hilo varias veces por segundo.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+from abc import ABC, abstractmethod
+
+from .parsers import Connection, ProcessRow, iter_tasklist, iter_wmic_paths, parse_netstat
+
+
+class SystemCollector(ABC):
+    """Fuente de la tabla de conexiones y la lista de procesos.
+
+    Subclases implementan:
+    - connections(): todas las filas TCP/UDP con estado y PID
+    - processes(): procesos activos
+    - process_paths(): PID -> path del ejecutable (best-effort)
+    """
+
+    name = "base"
+    can_sample = False  # sample_connections() disponible y barato
+
+    @abstractmethod
+    async def connections(self) -> list[Connection]:
+        ...
+
+    @abstractmethod
+    async def processes(self) -> list[ProcessRow]:
+        ...
+
+    @abstractmethod
+    async def process_paths(self) -> dict[int, str]:
+        ...
+
+    async def process_names(self) -> dict[int, str]:
+        """PID -> nombre de proceso."""
+        return {p.pid: p.name for p in await self.processes()}
+
+    def sample_connections(self) -> list[Connection]:
+        """Tabla de conexiones leída en el hilo que llama (muestreo de alta frecuencia)."""
+        raise NotImplementedError(f"el collector {self.name} no soporta muestreo")
+
+    def get_stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class WindowsCollector(SystemCollector):
+    """netstat / tasklist / wmic: un subproceso por consulta.
+
+    El muestreo usa la tabla TCP nativa (iphlpapi, winnet.py) en lugar de netstat.
+    """
+
+    name = "windows"
+    can_sample = sys.platform == "win32"
+
+    def __init__(self, timeout: float = 15.0):
+        self.timeout = timeout
+        self.spawns = 0
+        self._tcp_table = None
+
+    async def _run(self, *argv: str) -> bytes:
+        self.spawns += 1
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=self.timeout)
+        return stdout
+
+    async def connections(self) -> list[Connection]:
+        return parse_netstat(await self._run("netstat", "-ano"))
+
+    async def processes(self) -> list[ProcessRow]:
+        return list(iter_tasklist(await self._run("tasklist", "/FO", "CSV", "/NH")))
+
+    async def process_paths(self) -> dict[int, str]:
+        stdout = await self._run("wmic", "process", "get", "ProcessId,ExecutablePath",
+                                 "/format:csv")
+        return dict(iter_wmic_paths(stdout))
+
+    def sample_connections(self) -> list[Connection]:
+        if self._tcp_table is None:
+            from .winnet import TcpTableReader
+            self._tcp_table = TcpTableReader()
+        return self._tcp_table.read()
+
+    def get_stats(self) -> dict:
+        return {"backend": self.name, "spawns": self.spawns}
+
+
+def create_collector(name: str = "auto") -> SystemCollector:
+    """Instancia el backend de recolección. "auto" elige según la plataforma."""
+    if name == "auto":
+        name = "procfs" if sys.platform.startswith("linux") else "windows"
+    if name == "windows":
+        return WindowsCollector()
+    if name == "procfs":
+        from .procfs import ProcFSCollector
+        return ProcFSCollector()
+    raise ValueError(f"collector desconocido: {name}")
@@ -0,0 +1,163 @@
+"""Tabla de conexiones compartida entre monitors de red.
+
+NetworkMonitor y PortScanDetector lanzaban cada uno su propio
+`netstat -ano` y parseaban la salida completa. ConnectionSnapshotProvider
+le pide la tabla una sola vez al SystemCollector (netstat en Windows,
+/proc en Linux; ver collectors.py), la guarda tipada con todos los
+estados, y la sirve a todos los consumidores:
+
+- TTL de frescura: un snapshot más nuevo que `ttl` se reutiliza.
+- Coalescing: si un refresh está en curso, los demás esperan ese mismo
+  resultado en lugar de lanzar otro subproceso.
+
+Así sumar detectores de red no multiplica los spawns de netstat. Con un
+ConnectionSampler activo (sampler.py) la última tabla muestreada sirve
+de snapshot y el collector no se vuelve a consultar.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import Counter
+from typing import NamedTuple
+
+from ..core.logger import get_logger
+from .collectors import SystemCollector, create_collector
+from .parsers import Connection
+
+log = get_logger("connections")
+
+# Estados que se desglosan por puerto local / IP remota en state_histograms().
+# ESTABLISHED y LISTENING quedan sólo en el total: los cubren portscan y network.
+PORT_STATES = frozenset({"SYN_RECEIVED", "CLOSE_WAIT", "TIME_WAIT"})
+REMOTE_STATES = frozenset({"SYN_RECEIVED", "SYN_SENT"})
+_EPHEMERAL_PORT_START = 49152
+
+
+class StateHistograms(NamedTuple):
+    """Conexiones TCP por estado: total, por (puerto local, estado) y por (IP remota, estado)."""
+    totals: dict[str, int]
+    by_port: dict[tuple[int, str], int]
+    by_remote: dict[tuple[str, str], int]
+
+
+class ConnectionTable:
+    """Snapshot inmutable de la tabla de conexiones."""
+
+    def __init__(self, rows: list[Connection], taken_at: float, failed: bool = False):
+        self.rows = rows
+        self.taken_at = taken_at  # time.monotonic() del snapshot
+        self.failed = failed      # la fuente falló: vacía, no significa "sin conexiones"
+        self._histograms: StateHistograms | None = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def listeners(self) -> list[Connection]:
+        """TCP en LISTENING y todos los UDP (sin estado formal)."""
+        return [c for c in self.rows
+                if c.proto == "UDP" or c.state == "LISTENING"]
+
+    def with_state(self, state: str, proto: str = "TCP") -> list[Connection]:
+        return [c for c in self.rows if c.proto == proto and c.state == state]
+
+    def state_counts(self) -> dict[str, int]:
+        """Conexiones TCP por estado."""
+        return dict(Counter(c.state for c in self.rows if c.proto == "TCP"))
+
+    def state_histograms(self) -> StateHistograms:
+        """Histogramas de estados en una sola pasada, calculados una vez por snapshot.
+
+        Los puertos locales efímeros no se desglosan (son el lado cliente).
+        """
+        if self._histograms is not None:
+            return self._histograms
+        totals: dict[str, int] = {}
+        by_port: dict[tuple[int, str], int] = {}
+        by_remote: dict[tuple[str, str], int] = {}
+        port_states, remote_states = PORT_STATES, REMOTE_STATES
+        for c in self.rows:
+            if c.proto != "TCP":
+                continue
+            state = c.state
+            totals[state] = totals.get(state, 0) + 1
+            if state in port_states and c.local_port < _EPHEMERAL_PORT_START:
+                key = (c.local_port, state)
+                by_port[key] = by_port.get(key, 0) + 1
+            if state in remote_states:
+                key = (c.remote_addr, state)
+                by_remote[key] = by_remote.get(key, 0) + 1
+        self._histograms = StateHistograms(totals, by_port, by_remote)
+        return self._histograms
+
+
+class ConnectionSnapshotProvider:
+    """Sirve snapshots de conexiones compartidos con TTL y coalescing."""
+
+    def __init__(self, ttl: float = 5.0, collector: SystemCollector | None = None,
+                 sampler=None):
+        self.ttl = ttl
+        self.collector = collector or create_collector()
+        self.sampler = sampler  # ConnectionSampler opcional: su última muestra es el snapshot
+        self._table: ConnectionTable | None = None
+        self._refresh: asyncio.Future | None = None
+
+        self.snapshots = 0   # consultas al collector
+        self.served = 0      # pedidos de consumidores
+        self.coalesced = 0   # pedidos que esperaron un refresh en curso
+        self.from_sampler = 0  # pedidos servidos con la última muestra del sampler
+        self.errors = 0
+
+    async def get(self, max_age: float | None = None) -> ConnectionTable:
+        """Snapshot con antigüedad <= max_age (default: ttl). Vacío y failed si la fuente falla."""
+        self.served += 1
+        max_age = self.ttl if max_age is None else max_age
+        table = self._table
+        if table is not None and time.monotonic() - table.taken_at <= max_age:
+            return table
+        if self.sampler is not None:
+            sampled = self.sampler.latest()
+            if sampled is not None and time.monotonic() - sampled.taken_at <= max_age:
+                self.from_sampler += 1
+                self._table = sampled
+                return sampled
+
+        if self._refresh is not None:
+            self.coalesced += 1
+            return await asyncio.shield(self._refresh)
+
+        self._refresh = asyncio.get_running_loop().create_future()
+        table = ConnectionTable([], time.monotonic(), failed=True)
+        try:
+            table = await self._take()
+        finally:
+            self._refresh.set_result(table)
+            self._refresh = None
+        return table
+
+    async def _take(self) -> ConnectionTable:
+        self.snapshots += 1
+        try:
+            rows = await self.collector.connections()
+        except Exception as e:
+            self.errors += 1
+            log.error("Error leyendo conexiones (%s): %s", self.collector.name, e)
+            # No cachear el fallo: el próximo pedido reintenta
+            return ConnectionTable([], time.monotonic(), failed=True)
+        table = ConnectionTable(rows, time.monotonic())
+        self._table = table
+        return table
+
+    def get_stats(self) -> dict:
+        table = self._table
+        return {
+            "snapshots": self.snapshots,
+            "served": self.served,
+            "coalesced": self.coalesced,
+            "from_sampler": self.from_sampler,
+            "errors": self.errors,
+            "rows": len(table) if table else 0,
+            "age_seconds": round(time.monotonic() - table.taken_at, 1) if table else None,
+            "collector": self.collector.get_stats(),
+        }
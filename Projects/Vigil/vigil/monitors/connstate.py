@@ -0,0 +1,156 @@
+"""Anomalías de estado TCP sobre el snapshot compartido de conexiones.
+
+NetworkMonitor sólo mira LISTENING y PortScanDetector sólo ESTABLISHED;
+los SYN scans y floods aparecen en cambio como SYN_RECEIVED, y las
+fugas o ataques lentos como CLOSE_WAIT / TIME_WAIT acumulados.
+ConnStateDetector toma los histogramas de ConnectionTable.state_histograms()
+(una pasada por snapshot, sin subprocesos extra) y mantiene un baseline
+EWMA (media y varianza) por clave:
+
+- total por estado                  -> evento state_spike
+- (puerto local, estado)            -> evento port_state_spike
+- (IP remota, estado)               -> evento remote_state_spike
+
+Un valor es pico si supera `min_counts[estado]` y media + sigma·desvío
+(el desvío nunca es menor que sqrt(media): ruido de conteo). Cada clave
+alerta una vez por excursión y se re-arma al volver a media + sigma/2·desvío.
+El baseline aprende cada conteo recortado a ese mismo nivel: un ataque o
+una fuga que crece de a poco no arrastran la media y la varianza consigo,
+y un cambio de nivel legítimo se absorbe en unas decenas de polls. Las
+claves por puerto/IP que vuelven a ~0 se descartan y hay un tope de
+`max_keys` por scope.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+
+from .connections import StateHistograms
+
+# Mínimo absoluto por estado para considerar un pico (en cualquier scope)
+DEFAULT_MIN_COUNTS = {
+    "SYN_RECEIVED": 10,
+    "SYN_SENT": 20,
+    "CLOSE_WAIT": 20,
+    "TIME_WAIT": 200,
+}
+
+_EVENT_TYPES = {"total": "state_spike", "local_port": "port_state_spike",
+                "remote_ip": "remote_state_spike"}
+
+
+class ConnStateDetector:
+    """Baselines EWMA de conteos por estado TCP; devuelve los picos de cada snapshot."""
+
+    def __init__(self, alpha: float = 0.1, sigma: float = 4.0, warmup: int = 8,
+                 min_counts: dict[str, int] | None = None, max_keys: int = 5000):
+        self.alpha = alpha
+        self.sigma = sigma
+        self.warmup = warmup
+        self.min_counts = {**DEFAULT_MIN_COUNTS, **(min_counts or {})}
+        self.max_keys = max_keys
+        # scope -> clave -> [media, varianza]
+        self._baselines: dict[str, dict] = {scope: {} for scope in _EVENT_TYPES}
+        self._alerted: set[tuple[str, object]] = set()
+        self._polls = 0
+        self.spikes = 0
+
+    def prime(self, hist: StateHistograms) -> None:
+        """Toma el snapshot inicial como baseline (como los listeners conocidos)."""
+        for scope, counts in self._scopes(hist):
+            baselines = self._baselines[scope]
+            for key, count in counts.items():
+                baselines[key] = [float(count), 0.0]
+
+    def update(self, hist: StateHistograms) -> list[tuple[str, dict]]:
+        """Actualiza los baselines con un snapshot. Retorna (event_type, data) por pico."""
+        self._polls += 1
+        ready = self._polls > self.warmup
+        spikes: list[tuple[str, dict]] = []
+        for scope, counts in self._scopes(hist):
+            self._step(scope, counts, ready, spikes)
+        self.spikes += len(spikes)
+        return spikes
+
+    def _scopes(self, hist: StateHistograms):
+        tracked = self.min_counts
+        yield "total", {s: n for s, n in hist.totals.items() if s in tracked}
+        yield "local_port", {k: n for k, n in hist.by_port.items() if k[1] in tracked}
+        yield "remote_ip", {k: n for k, n in hist.by_remote.items() if k[1] in tracked}
+
+    def _step(self, scope: str, counts: dict, ready: bool,
+              spikes: list[tuple[str, dict]]) -> None:
+        baselines = self._baselines[scope]
+        alerted = self._alerted
+        per_key = scope != "total"
+
+        for key, count in counts.items():
+            entry = baselines.get(key)
+            if entry is None:
+                if per_key and count < 2:
+                    continue  # una conexión suelta no merece baseline propio
+                # Clave nueva: hasta ahora valía 0 en todos los snapshots
+                entry = baselines[key] = [0.0, 0.0]
+            mean, var = entry
+            state = key[1] if per_key else key
+            spread = max(math.sqrt(var), math.sqrt(mean), 1.0)
+            threshold = max(self.min_counts[state], mean + self.sigma * spread)
+            rearm = mean + self.sigma / 2 * spread
+            marker = (scope, key)
+
+            if count >= threshold:
+                if ready and marker not in alerted:
+                    alerted.add(marker)
+                    spikes.append((_EVENT_TYPES[scope],
+                                   self._data(scope, key, state, count, mean, threshold)))
+            elif marker in alerted and count <= rearm:
+                alerted.discard(marker)
+            self._learn(entry, min(count, rearm))
+
+        # Claves ausentes en este snapshot: su conteo es 0
+        for key in baselines.keys() - counts.keys():
+            entry = baselines[key]
+            marker = (scope, key)
+            alerted.discard(marker)
+            self._learn(entry, 0)
+            if per_key and entry[0] < 0.5:
+                del baselines[key]
+
+        if len(baselines) > self.max_keys:
+            for key in heapq.nsmallest(len(baselines) - self.max_keys, baselines,
+                                       key=lambda k: baselines[k][0]):
+                del baselines[key]
+                alerted.discard((scope, key))
+
+    def _learn(self, entry: list[float], count: float) -> None:
+        """EWMA de media y varianza (Welford exponencial)."""
+        alpha = self.alpha
+        diff = count - entry[0]
+        incr = alpha * diff
+        entry[0] += incr
+        entry[1] = (1 - alpha) * (entry[1] + diff * incr)
+
+    @staticmethod
+    def _data(scope: str, key, state: str, count: int, mean: float, threshold: float) -> dict:
+        data = {
+            "scope": scope,
+            "state": state,
+            "count": count,
+            "baseline": round(mean, 1),
+            "threshold": math.ceil(threshold),
+        }
+        if scope == "local_port":
+            data["local_port"] = key[0]
+        elif scope == "remote_ip":
+            data["remote_ip"] = key[0]
+        return data
+
+    def get_stats(self) -> dict:
+        return {
+            "polls": self._polls,
+            "warming_up": self._polls <= self.warmup,
+            "baselines": {scope: len(b) for scope, b in self._baselines.items()},
+            "alerting": len(self._alerted),
+            "spikes": self.spikes,
+        }
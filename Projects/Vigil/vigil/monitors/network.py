@@ -1,18 +1,25 @@
-"""Monitor de red: detecta nuevos listeners via netstat -ano."""
+"""Monitor de red: nuevos listeners y picos de estados TCP en la tabla de conexiones."""
 
 from __future__ import annotations
 
-import asyncio
-
 from ..core.events import SecurityEvent
 from .base import BaseMonitor
+from .collectors import SystemCollector
+from .connections import ConnectionSnapshotProvider, ConnectionTable
+from .connstate import ConnStateDetector
+from .sampler import RingReader
 
 
 class NetworkMonitor(BaseMonitor):
     """Monitorea conexiones de red buscando nuevos listeners.
 
-    Usa `netstat -ano` para obtener conexiones TCP/UDP.
-    Mantiene un set de listeners conocidos y alerta cuando aparecen nuevos.
+    Lee la tabla de conexiones TCP/UDP del ConnectionSnapshotProvider
+    (compartido con otros monitors de red). Mantiene un set de listeners
+    conocidos y alerta cuando aparecen nuevos. Con un ConnStateDetector,
+    además reporta picos de SYN_RECEIVED / CLOSE_WAIT / TIME_WAIT del mismo
+    snapshot (ver connstate.py). Con el buffer de un ConnectionSampler
+    también reporta listeners que abrieron y cerraron entre dos polls
+    (transient=True).
     """
 
     # Puertos efímeros (49152-65535) son asignados dinámicamente por el OS.
@@ -20,32 +27,52 @@ class NetworkMonitor(BaseMonitor):
     EPHEMERAL_PORT_START = 49152
 
     def __init__(self, interval: int = 15, trusted_processes: list[str] | None = None,
-                 ignored_ports: set[int] | None = None, ignore_ephemeral: bool = True):
+                 ignored_ports: set[int] | None = None, ignore_ephemeral: bool = True,
+                 snapshots: ConnectionSnapshotProvider | None = None,
+                 collector: SystemCollector | None = None,
+                 state_detector: ConnStateDetector | None = None,
+                 changes: RingReader | None = None):
         super().__init__("network", interval)
+        self._snapshots = snapshots or ConnectionSnapshotProvider(collector=collector)
+        self._collector = collector or self._snapshots.collector
         self._known_listeners: set[tuple[str, int, int]] = set()  # (proto, port, pid)
         self._trusted = set(p.lower() for p in (trusted_processes or []))
         self._ignored_ports = ignored_ports or set()
         self._ignore_ephemeral = ignore_ephemeral
         self._pid_cache: dict[int, str] = {}
+        self._states = state_detector
+        self._changes = changes
+        self._state_totals: dict[str, int] = {}
 
     async def setup(self) -> None:
         """Captura el estado inicial de listeners para no alertar al inicio."""
-        listeners = await self._get_listeners()
+        table = await self._snapshots.get()
+        listeners = self._get_listeners(table)
         self._known_listeners = {(l["proto"], l["local_port"], l["pid"]) for l in listeners}
+        if self._states is not None:
+            self._states.prime(table.state_histograms())
         await self._refresh_pid_cache()
         self.log.info("Baseline: %d listeners conocidos", len(self._known_listeners))
 
     async def poll(self) -> list[SecurityEvent]:
-        """Detecta nuevos listeners comparando con el baseline."""
+        """Detecta nuevos listeners comparando con el baseline y picos de estados."""
         events = []
-        listeners = await self._get_listeners()
+        table = await self._snapshots.get()
+        listeners = self._get_listeners(table)
         await self._refresh_pid_cache()
+        current = {(l["proto"], l["local_port"], l["pid"]) for l in listeners}
+        # Listeners que el sampler vio abrir y ya no están en el snapshot. No
+        # pasan a conocidos: si vuelven a abrir se reportan de nuevo.
+        transient = set()
+        for l in self._sampled_listeners():
+            key = (l["proto"], l["local_port"], l["pid"])
+            if key not in current and key not in transient:
+                transient.add(key)
+                l["transient"] = True
+                listeners.append(l)
 
-        current = set()
         for l in listeners:
             key = (l["proto"], l["local_port"], l["pid"])
-            current.add(key)
-
             if key not in self._known_listeners:
                 if l["local_port"] in self._ignored_ports:
                     self._known_listeners.add(key)
@@ -68,10 +95,27 @@ class NetworkMonitor(BaseMonitor):
                         "process": process,
                         "state": "LISTENING",
                         "trusted": is_trusted,
+                        "transient": l.get("transient", False),
                     },
                 ))
 
         self._known_listeners = current
+        if self._states is not None:
+            events.extend(self._state_events(table))
+        return events
+
+    def _state_events(self, table: ConnectionTable) -> list[SecurityEvent]:
+        """Picos de estados TCP (histogramas del snapshot ya tomado, sin costo extra)."""
+        hist = table.state_histograms()
+        self._state_totals = hist.totals
+        events = []
+        for event_type, data in self._states.update(hist):
+            if data["scope"] == "local_port":
+                # Dueño del puerto: el listener del mismo puerto
+                pid = next((p for _, port, p in self._known_listeners
+                            if port == data["local_port"]), 0)
+                data["process"] = self._pid_cache.get(pid, "unknown")
+            events.append(SecurityEvent(source="network", event_type=event_type, data=data))
         return events
 
     def get_state(self) -> dict:
@@ -89,101 +133,32 @@ class NetworkMonitor(BaseMonitor):
         return {
             "listeners": sorted(listeners, key=lambda x: x["local_port"]),
             "total": len(listeners),
+            "tcp_states": self._state_totals,
         }
 
-    async def _get_listeners(self) -> list[dict]:
-        """Ejecuta netstat -ano y parsea los listeners."""
-        try:
-            proc = await asyncio.create_subprocess_exec(
-                "netstat", "-ano",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.DEVNULL,
-            )
-            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=15)
-            output = stdout.decode("utf-8", errors="replace")
-            return self._parse_netstat(output)
-        except Exception as e:
-            self.log.error("Error ejecutando netstat: %s", e)
+    def _sampled_listeners(self) -> list[dict]:
+        """Listeners abiertos según el buffer del sampler desde el último poll."""
+        if self._changes is None:
             return []
-
-    def _parse_netstat(self, output: str) -> list[dict]:
-        """Parsea la salida de netstat -ano extrayendo listeners (LISTENING).
-
-        Formato típico de netstat -ano:
-          Proto  Local Address          Foreign Address        State           PID
-          TCP    0.0.0.0:135            0.0.0.0:0              LISTENING       1234
-          TCP    [::]:445               [::]:0                 LISTENING       4
-          UDP    0.0.0.0:5353           *:*                                    5678
-
-        Para TCP, filtra solo LISTENING.
-        Para UDP, incluye todas (UDP no tiene estado LISTENING formal).
-        Retorna lista de dicts con proto, local_addr, local_port, pid.
-        """
-        listeners = []
-        for line in output.splitlines():
-            parts = line.split()
-            if len(parts) < 4:
-                continue
-
-            proto = parts[0].upper()
-            if proto not in ("TCP", "UDP"):
-                continue
-
-            # TCP necesita estado LISTENING
-            if proto == "TCP":
-                if len(parts) < 5 or parts[3] != "LISTENING":
-                    continue
-                pid_str = parts[4]
-            else:
-                # UDP: el PID es el último campo
-                pid_str = parts[-1]
-
-            # Parsear local address
-            local = parts[1]
-            if "]:" in local:
-                # IPv6: [::]:port
-                addr, port_str = local.rsplit(":", 1)
-            else:
-                addr, port_str = local.rsplit(":", 1)
-
-            try:
-                port = int(port_str)
-                pid = int(pid_str)
-            except ValueError:
-                continue
-
-            listeners.append({
-                "proto": proto,
-                "local_addr": addr,
-                "local_port": port,
-                "pid": pid,
-            })
-
-        return listeners
+        changes, lost = self._changes.drain()
+        if lost:
+            self.log.debug("Buffer del sampler perdió %d cambios", lost)
+        return [
+            {"proto": c.proto, "local_addr": c.local_addr, "local_port": c.local_port, "pid": c.pid}
+            for _, kind, c in changes
+            if kind != "close" and (c.proto == "UDP" or c.state == "LISTENING")
+        ]
+
+    def _get_listeners(self, table: ConnectionTable) -> list[dict]:
+        """Listeners (TCP LISTENING y UDP) del snapshot compartido."""
+        return [
+            {"proto": c.proto, "local_addr": c.local_addr, "local_port": c.local_port, "pid": c.pid}
+            for c in table.listeners()
+        ]
 
     async def _refresh_pid_cache(self) -> None:
-        """Actualiza el cache PID -> nombre de proceso via tasklist."""
+        """Actualiza el cache PID -> nombre de proceso."""
         try:
-            proc = await asyncio.create_subprocess_exec(
-                "tasklist", "/FO", "CSV", "/NH",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.DEVNULL,
-            )
-            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=15)
-            output = stdout.decode("utf-8", errors="replace")
-
-            self._pid_cache.clear()
-            for line in output.splitlines():
-                line = line.strip().strip('"')
-                if not line:
-                    continue
-                parts = line.split('","')
-                if len(parts) >= 2:
-                    name = parts[0].strip('"')
-                    try:
-                        pid = int(parts[1].strip('"'))
-                        self._pid_cache[pid] = name
-                    except ValueError:
-                        continue
+            self._pid_cache = await self._collector.process_names()
         except Exception as e:
             self.log.debug("Error actualizando PID cache: %s", e)
@@ -0,0 +1,163 @@
+"""Parsers de la salida cruda de netstat, tasklist y wmic.
+
+Trabajan directo sobre los `bytes` del subproceso: no decodifican la
+salida completa a `str` y sólo decodifican los campos que se usan. Los
+textos muy repetidos (estados, direcciones, nombres de proceso, sesiones)
+se decodifican una vez por salida y se comparten entre filas. Cada fila se
+entrega como una tupla compacta (NamedTuple construido con tuple.__new__,
+sin el __new__ en Python que genera namedtuple).
+
+La ganancia es sobre todo de memoria retenida: ~1.7x por fila en netstat
+(~2x con direcciones repetidas) y ~2.2x en tasklist, porque los textos
+compartidos no se duplican por fila. En tiempo, decodificar la salida
+entera a `str` cuesta casi nada en CPython, así que sólo netstat gana
+(~1.1-1.2x con IPs remotas todas distintas, ~1.4x con --remotes 400 en el
+benchmark) gracias al cache de direcciones; tasklist empata y wmic no es
+más rápido (unos cientos de filas: microsegundos por poll). Una regex
+precompilada con finditer resultó más lenta: sólo el match de una fila
+de netstat cuesta más que el parseo completo con split.
+`python -m vigil.bench.parsers` mide tiempo y memoria retenida por fila.
+"""
+
+from __future__ import annotations
+
+from typing import Iterator, NamedTuple
+
+
+class Connection(NamedTuple):
+    """Fila de netstat -ano. Las direcciones quedan como las imprime netstat
+    (IPv6 entre corchetes); UDP no tiene estado ni puerto remoto."""
+    proto: str
+    local_addr: str
+    local_port: int
+    remote_addr: str
+    remote_port: int
+    state: str
+    pid: int
+
+
+class ProcessRow(NamedTuple):
+    """Fila de tasklist /FO CSV /NH."""
+    name: str
+    pid: int
+    session: str
+    mem_usage: str
+
+
+_new = tuple.__new__
+
+
+def _interned(cache: dict[bytes, str], raw: bytes) -> str:
+    value = cache.get(raw)
+    if value is None:
+        value = cache[raw] = raw.decode("utf-8", errors="replace")
+    return value
+
+
+def parse_netstat(data: bytes) -> list[Connection]:
+    """Filas TCP/UDP de la salida de netstat -ano (todos los estados).
+
+    Formato típico:
+      Proto  Local Address          Foreign Address        State           PID
+      TCP    0.0.0.0:135            0.0.0.0:0              LISTENING       1234
+      TCP    [::]:445               [::]:0                 LISTENING       4
+      UDP    0.0.0.0:5353           *:*                                    5678
+
+    Las direcciones se decodifican una vez por salida (como procfs.py):
+    en una tabla real se repiten las locales y buena parte de las remotas.
+    """
+    rows: list[Connection] = []
+    append = rows.append
+    states: dict[bytes, str] = {}
+    addrs: dict[bytes, str] = {}
+    for parts in map(bytes.split, data.splitlines()):
+        n = len(parts)
+        if n == 5:
+            proto, local, remote, state, pid = parts
+            if proto != b"TCP" and proto.upper() != b"TCP":
+                continue
+            proto = "TCP"
+            value = states.get(state)
+            if value is None:
+                value = states[state] = state.decode("utf-8", errors="replace")
+            state = value
+        elif n == 4:
+            proto, local, remote, pid = parts
+            if proto != b"UDP" and proto.upper() != b"UDP":
+                continue
+            proto, state = "UDP", ""
+        else:
+            continue
+        local_addr, _, local_port = local.rpartition(b":")
+        remote_addr, _, remote_port = remote.rpartition(b":")
+        laddr = addrs.get(local_addr)
+        if laddr is None:
+            laddr = addrs[local_addr] = local_addr.decode("utf-8", errors="replace")
+        raddr = addrs.get(remote_addr)
+        if raddr is None:
+            raddr = addrs[remote_addr] = remote_addr.decode("utf-8", errors="replace")
+        try:
+            append(_new(Connection, (
+                proto,
+                laddr,
+                int(local_port) if local_port != b"*" else 0,
+                raddr,
+                int(remote_port) if remote_port != b"*" else 0,
+                state,
+                int(pid),
+            )))
+        except ValueError:
+            continue
+    return rows
+
+
+def iter_netstat(data: bytes) -> Iterator[Connection]:
+    """Igual que parse_netstat, como iterador."""
+    return iter(parse_netstat(data))
+
+
+def iter_tasklist(data: bytes) -> Iterator[ProcessRow]:
+    """Procesos de la salida de tasklist /FO CSV /NH.
+
+    Formato: "svchost.exe","1234","Services","0","12.345 K"
+    """
+    text: dict[bytes, str] = {}
+    for line in data.splitlines():
+        parts = line.strip().split(b'","')
+        if len(parts) < 5 or parts[0][:1] != b'"':
+            continue
+        try:
+            pid = int(parts[1])
+        except ValueError:
+            continue
+        name, session = text.get(parts[0]), text.get(parts[2])
+        if name is None:
+            name = text[parts[0]] = parts[0][1:].decode("utf-8", errors="replace")
+        if session is None:
+            session = text[parts[2]] = parts[2].decode("utf-8", errors="replace")
+        yield _new(ProcessRow, (name, pid, session,
+                                parts[4].rstrip(b'" ').decode("utf-8", errors="replace")))
+
+
+def _wmic_bytes(data: bytes) -> bytes:
+    """wmic escribe UTF-16 cuando su salida está redirigida: normalizar a UTF-8."""
+    if data.startswith((b"\xff\xfe", b"\xfe\xff")) or b"\x00" in data[:8]:
+        return data.decode("utf-16", errors="replace").encode("utf-8")
+    return data
+
+
+def iter_wmic_paths(data: bytes) -> Iterator[tuple[int, str]]:
+    """(pid, path) de `wmic process get ProcessId,ExecutablePath /format:csv`.
+
+    Formato: Node,ExecutablePath,ProcessId. El path puede contener comas,
+    así que el PID se toma tras la última. Omite procesos sin path (los
+    del sistema no lo exponen).
+    """
+    for line in _wmic_bytes(data).splitlines():
+        head, sep, pid = line.rpartition(b",")
+        if not sep:
+            continue
+        _, sep, path = head.partition(b",")
+        path, pid = path.strip(), pid.strip()
+        if sep and path and pid.isdigit():
+            yield int(pid), path.decode("utf-8", errors="replace")
@@ -1,13 +1,42 @@
-"""Detector de port scan con sliding window."""
+"""Detector de port scan con sliding window.
+
+El seguimiento es incremental: cada poll compara el snapshot de
+conexiones con el anterior por 4-tupla (local, puerto local, remoto,
+puerto remoto) y sólo registra las conexiones nuevas. Una conexión de
+larga duración cuenta una vez, no en cada poll. Por IP remota se guarda
+un mapa puerto local -> último visto, y un heap global de vencimientos
+expira los puertos fuera de la ventana. El costo de cada poll crece con
+los cambios, no con la historia acumulada.
+
+Con un ConnectionSampler (sampler.py) las conexiones nuevas salen de
+su buffer de cambios en lugar del diff entre snapshots: así también
+cuentan las que abrieron y cerraron entre dos polls. Si el buffer perdió
+cambios, ese poll vuelve a diffear el snapshot para no quedar a ciegas.
+
+Las conexiones nuevas también alimentan SlowScanTracker (sketches.py),
+que detecta scans lentos en horizontes de minutos, horas y un día.
+"""
 
 from __future__ import annotations
 
-import asyncio
+import heapq
 import time
-from collections import defaultdict
 
 from ..core.events import SecurityEvent
 from .base import BaseMonitor
+from .connections import ConnectionSnapshotProvider
+from .parsers import Connection
+from .sampler import RingReader
+from .sketches import SlowScanTracker
+
+# (local_addr, local_port, remote_addr, remote_port)
+FourTuple = tuple[str, int, str, int]
+
+_LOCAL_ADDRS = ("127.0.0.1", "::1", "0.0.0.0")
+
+# Estados que cuentan como puerto tocado en el buffer del sampler: un SYN
+# scan nunca llega a ESTABLISHED, pero el half-open sí queda muestreado
+_SAMPLED_STATES = ("ESTABLISHED", "SYN_RECEIVED")
 
 
 class PortScanDetector(BaseMonitor):
@@ -18,49 +47,59 @@ class PortScanDetector(BaseMonitor):
     `window` segundos, genera una alerta SCAN001.
     """
 
-    def __init__(self, interval: int = 10, threshold: int = 20, window: int = 120):
+    def __init__(self, interval: int = 10, threshold: int = 20, window: int = 120,
+                 snapshots: ConnectionSnapshotProvider | None = None,
+                 slow_scan: SlowScanTracker | None = None,
+                 changes: RingReader | None = None):
         super().__init__("portscan", interval)
+        self._snapshots = snapshots or ConnectionSnapshotProvider()
         self.threshold = threshold
         self.window = window
-        # {remote_ip: [(timestamp, local_port), ...]}
-        self._connections: dict[str, list[tuple[float, int]]] = defaultdict(list)
+        self._previous: set[FourTuple] = set()  # conexiones del último snapshot
+        # {remote_ip: {local_port: último visto}}
+        self._ports: dict[str, dict[int, float]] = {}
+        # (vence, remote_ip, local_port); entradas viejas se descartan al salir
+        self._expiry: list[tuple[float, str, int]] = []
         self._alerted_ips: set[str] = set()  # IPs ya alertadas en esta ventana
+        self._slow = slow_scan
+        self._changes = changes
+        self.sampled = 0  # conexiones nuevas tomadas del buffer del sampler
+        self._synced = False  # _previous alineado con el snapshot al menos una vez
 
     async def poll(self) -> list[SecurityEvent]:
         """Analiza conexiones ESTABLISHED buscando patrones de port scan.
 
-        1. Obtiene conexiones establecidas via netstat
-        2. Registra cada (IP remota -> puerto local) con timestamp
-        3. Limpia entradas fuera de la ventana temporal
-        4. Si una IP contactó > threshold puertos únicos, genera evento
+        1. Obtiene las conexiones establecidas nuevas: del buffer del
+           sampler o, sin él, diffeando el snapshot compartido
+        2. Las registra con el momento en que se vieron
+        3. Expira puertos fuera de la ventana temporal (heap)
+        4. Evalúa las IPs que sumaron puertos: > threshold únicos genera evento
+        5. Evalúa las mismas IPs en los horizontes largos (scan lento)
         """
         events = []
         now = time.time()
 
-        connections = await self._get_established()
-
-        # Registrar nuevas conexiones (solo puertos de servicio, no efímeros)
-        for conn in connections:
-            ip = conn["remote_addr"]
-            port = conn["local_port"]
-            # Ignorar puertos efímeros — conexiones outbound normales
-            if port >= 49152:
+        # Registrar conexiones nuevas
+        touched = set()
+        for seen, (_, port, ip, _) in await self._new_connections(now):
+            ports = self._ports.get(ip)
+            if ports is None:
+                ports = self._ports[ip] = {}
+            ports[port] = seen
+            heapq.heappush(self._expiry, (seen + self.window, ip, port))
+            touched.add(ip)
+            if self._slow is not None:
+                self._slow.observe(ip, port, seen)
+
+        self._expire(now)
+
+        # Evaluar sólo las IPs con actividad nueva
+        for ip in touched:
+            ports = self._ports.get(ip)
+            if not ports or ip in self._alerted_ips:
                 continue
-            self._connections[ip].append((now, port))
-
-        # Evaluar cada IP
-        for ip, entries in list(self._connections.items()):
-            # Limpiar entradas fuera de ventana
-            entries[:] = [(ts, p) for ts, p in entries if now - ts <= self.window]
-            if not entries:
-                del self._connections[ip]
-                self._alerted_ips.discard(ip)
-                continue
-
-            # Contar puertos únicos en la ventana
-            unique_ports = len(set(p for _, p in entries))
-
-            if unique_ports > self.threshold and ip not in self._alerted_ips:
+            unique_ports = len(ports)
+            if unique_ports > self.threshold:
                 self._alerted_ips.add(ip)
                 events.append(SecurityEvent(
                     source="portscan",
@@ -69,60 +108,107 @@ class PortScanDetector(BaseMonitor):
                         "remote_ip": ip,
                         "unique_ports": unique_ports,
                         "window_seconds": self.window,
-                        "sample_ports": sorted(set(p for _, p in entries))[:20],
+                        "sample_ports": sorted(ports)[:20],
                     },
                 ))
 
+        if self._slow is not None:
+            # Las IPs ya reportadas por el barrido rápido no se reportan de nuevo
+            for data in self._slow.evaluate(touched - self._alerted_ips, now):
+                events.append(SecurityEvent(
+                    source="portscan",
+                    event_type="slow_scan_detected",
+                    data=data,
+                ))
+
         return events
 
-    async def _get_established(self) -> list[dict]:
-        """Obtiene conexiones TCP ESTABLISHED via netstat."""
-        try:
-            proc = await asyncio.create_subprocess_exec(
-                "netstat", "-ano",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.DEVNULL,
-            )
-            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=15)
-            output = stdout.decode("utf-8", errors="replace")
-
-            connections = []
-            for line in output.splitlines():
-                parts = line.split()
-                if len(parts) < 5:
-                    continue
-                if parts[0].upper() != "TCP" or parts[3] != "ESTABLISHED":
-                    continue
+    async def _new_connections(self, now: float) -> list[tuple[float, FourTuple]]:
+        """(momento en que se vio, 4-tupla) de cada conexión nueva desde el poll anterior.
 
-                local = parts[1]
-                remote = parts[2]
-
-                try:
-                    # Parsear local
-                    if "]:" in local:
-                        local_port = int(local.rsplit(":", 1)[1])
-                    else:
-                        local_port = int(local.rsplit(":", 1)[1])
-
-                    # Parsear remote
-                    if "]:" in remote:
-                        remote_addr = remote.rsplit(":", 1)[0]
-                        remote_addr = remote_addr.strip("[]")
-                    else:
-                        remote_addr = remote.rsplit(":", 1)[0]
-
-                    # Ignorar localhost
-                    if remote_addr in ("127.0.0.1", "::1", "0.0.0.0"):
-                        continue
-
-                    connections.append({
-                        "local_port": local_port,
-                        "remote_addr": remote_addr,
-                    })
-                except (ValueError, IndexError):
+        Con sampler, `_previous` se mantiene aplicando los open/close del
+        buffer; sólo la primera vez o si el buffer perdió cambios se
+        resincroniza con el snapshot, contando como nuevas las que faltan
+        en esa base ya actualizada (las de larga duración no se recuentan).
+        Si el snapshot falla, `_previous` queda como estaba: una tabla vacía
+        por error no puede hacer que todo cuente como nuevo en el próximo poll.
+        """
+        previous = self._previous
+        new = []
+        if self._changes is not None:
+            changes, lost = self._changes.drain()
+            for change in changes:
+                key = self._inbound(change.conn)
+                if key is None:
                     continue
+                if change.kind != "close" and change.conn.state in _SAMPLED_STATES:
+                    if key not in previous:
+                        previous.add(key)
+                        new.append((change.ts, key))
+                else:
+                    previous.discard(key)
+            self.sampled += len(new)
+            if lost:
+                self.log.debug("Buffer del sampler perdió %d cambios: resync con snapshot", lost)
+                self._synced = False
+            if self._synced:
+                return new
+
+        current = await self._get_established()
+        if current is None:
+            return new  # con sampler, el resync se reintenta en el próximo poll
+        new += [(now, key) for key in current - previous]
+        self._previous = current
+        self._synced = True
+        return new
+
+    def _expire(self, now: float) -> None:
+        """Saca del heap los vencimientos pasados; ignora los ya renovados."""
+        heap = self._expiry
+        while heap and heap[0][0] < now:
+            _, ip, port = heapq.heappop(heap)
+            ports = self._ports.get(ip)
+            if ports is None or ports.get(port, now) + self.window >= now:
+                continue  # el puerto se volvió a ver: hay otra entrada más nueva
+            del ports[port]
+            if not ports:
+                del self._ports[ip]
+                self._alerted_ips.discard(ip)
 
-            return connections
-        except Exception as e:
-            self.log.error("Error en netstat: %s", e)
-            return []
+    def get_state(self) -> dict:
+        state = {
+            "tracked_ips": len(self._ports),
+            "tracked_connections": len(self._previous),
+            "alerted_ips": len(self._alerted_ips),
+        }
+        if self._changes is not None:
+            state["sampled_connections"] = self.sampled
+            state["sampler_dropped"] = self._changes.dropped
+        if self._slow is not None:
+            state["slow_scan"] = self._slow.get_stats()
+        return state
+
+    async def _get_established(self) -> set[FourTuple] | None:
+        """Conexiones TCP ESTABLISHED entrantes a puertos de servicio, sin localhost.
+
+        None si el snapshot falló.
+        """
+        table = await self._snapshots.get()
+        if table.failed:
+            return None
+        connections = set()
+        for c in table.with_state("ESTABLISHED"):
+            key = self._inbound(c)
+            if key is not None:
+                connections.add(key)
+        return connections
+
+    @staticmethod
+    def _inbound(c: Connection) -> FourTuple | None:
+        # Ignorar puertos efímeros — conexiones outbound normales
+        if c.proto != "TCP" or c.local_port >= 49152:
+            return None
+        remote_addr = c.remote_addr.strip("[]")
+        if remote_addr in _LOCAL_ADDRS:
+            return None
+        return (c.local_addr, c.local_port, remote_addr, c.remote_port)
@@ -1,6 +1,7 @@
 """Monitor de procesos: detecta procesos sospechosos y ejecuciones desde paths temporales.
 
-Usa `tasklist /FO CSV /V /NH` para enumerar procesos activos.
+Enumera procesos con el SystemCollector (tasklist + wmic en Windows,
+/proc en Linux).
 Compara contra:
 1. Lista de nombres sospechosos (herramientas de hacking comunes)
 2. Paths temporales (indicador de malware)
@@ -9,11 +10,10 @@ Compara contra:
 
 from __future__ import annotations
 
-import asyncio
-import os
-
 from ..core.events import SecurityEvent
 from .base import BaseMonitor
+from .collectors import SystemCollector, create_collector
+from .parsers import ProcessRow
 
 # Procesos asociados a herramientas de hacking / post-explotación
 _SUSPICIOUS_NAMES = {
@@ -39,6 +39,10 @@ _TEMP_INDICATORS = [
     "\\appdata\\local\\temp\\",
     "\\windows\\temp\\",
     "$recycle.bin",
+    # Linux (backend procfs)
+    "/tmp/",
+    "/var/tmp/",
+    "/dev/shm/",
 ]
 
 
@@ -49,8 +53,10 @@ class ProcessMonitor(BaseMonitor):
     alertas por procesos legítimos que ya estaban corriendo.
     """
 
-    def __init__(self, interval: int = 20, trusted_processes: list[str] | None = None):
+    def __init__(self, interval: int = 20, trusted_processes: list[str] | None = None,
+                 collector: SystemCollector | None = None):
         super().__init__("process", interval)
+        self._collector = collector or create_collector()
         self._trusted = set(p.lower() for p in (trusted_processes or []))
         self._baseline: set[str] = set()  # nombres de procesos al inicio
         self._alerted_pids: set[int] = set()  # PIDs ya alertados (evitar duplicados)
@@ -58,18 +64,20 @@ class ProcessMonitor(BaseMonitor):
     async def setup(self) -> None:
         """Captura baseline de procesos actuales."""
         processes = await self._get_processes()
-        self._baseline = {p["name"].lower() for p in processes}
+        self._baseline = {p.name.lower() for p in processes}
         self.log.info("Baseline: %d procesos conocidos", len(self._baseline))
 
     async def poll(self) -> list[SecurityEvent]:
         """Compara procesos actuales contra baseline y listas de sospechosos."""
         events = []
         processes = await self._get_processes()
+        # Paths via wmic (más info pero más lento), sólo si tasklist respondió
+        paths = await self._get_paths() if processes else {}
         current_pids = set()
 
         for proc in processes:
-            pid = proc["pid"]
-            name = proc["name"]
+            pid = proc.pid
+            name = proc.name
             name_lower = name.lower()
             current_pids.add(pid)
 
@@ -80,7 +88,8 @@ class ProcessMonitor(BaseMonitor):
                 continue
 
             # Check 1: Nombre sospechoso
-            if name_lower in _SUSPICIOUS_NAMES:
+            # En Linux los binarios no llevan .exe: comparar también sin extensión
+            if name_lower in _SUSPICIOUS_NAMES or name_lower + ".exe" in _SUSPICIOUS_NAMES:
                 self._alerted_pids.add(pid)
                 events.append(SecurityEvent(
                     source="process",
@@ -89,14 +98,14 @@ class ProcessMonitor(BaseMonitor):
                         "process": name,
                         "pid": pid,
                         "reason": "suspicious_name",
-                        "session": proc.get("session", ""),
-                        "mem_usage": proc.get("mem_usage", ""),
+                        "session": proc.session,
+                        "mem_usage": proc.mem_usage,
                     },
                 ))
                 continue
 
             # Check 2: Ejecución desde path temporal (via WMIC si disponible)
-            path = proc.get("path", "")
+            path = paths.get(pid, "")
             if path and self._is_temp_path(path):
                 self._alerted_pids.add(pid)
                 events.append(SecurityEvent(
@@ -120,85 +129,18 @@ class ProcessMonitor(BaseMonitor):
         path_lower = path.lower()
         return any(indicator in path_lower for indicator in _TEMP_INDICATORS)
 
-    async def _get_processes(self) -> list[dict]:
-        """Obtiene lista de procesos via tasklist /FO CSV /NH."""
-        processes = []
-
+    async def _get_processes(self) -> list[ProcessRow]:
+        """Obtiene la lista de procesos del collector (tasklist o /proc)."""
         try:
-            proc = await asyncio.create_subprocess_exec(
-                "tasklist", "/FO", "CSV", "/NH",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.DEVNULL,
-            )
-            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=15)
-            output = stdout.decode("utf-8", errors="replace")
-
-            for line in output.splitlines():
-                line = line.strip()
-                if not line or not line.startswith('"'):
-                    continue
-
-                parts = line.split('","')
-                if len(parts) < 5:
-                    continue
-
-                name = parts[0].strip('"')
-                try:
-                    pid = int(parts[1].strip('"'))
-                except ValueError:
-                    continue
-
-                session = parts[2].strip('"')
-                mem_usage = parts[4].strip('"') if len(parts) > 4 else ""
-
-                processes.append({
-                    "name": name,
-                    "pid": pid,
-                    "session": session,
-                    "mem_usage": mem_usage,
-                    "path": "",  # tasklist no da path, se intenta con wmic abajo
-                })
-
+            return await self._collector.processes()
         except Exception as e:
-            self.log.error("Error ejecutando tasklist: %s", e)
+            self.log.error("Error listando procesos (%s): %s", self._collector.name, e)
             return []
 
-        # Intentar obtener paths via wmic (más info pero más lento)
-        await self._enrich_with_paths(processes)
-
-        return processes
-
-    async def _enrich_with_paths(self, processes: list[dict]) -> None:
-        """Intenta obtener paths de procesos via wmic (best-effort)."""
+    async def _get_paths(self) -> dict[int, str]:
+        """Mapa PID -> path del ejecutable (best-effort)."""
         try:
-            proc = await asyncio.create_subprocess_exec(
-                "wmic", "process", "get", "ProcessId,ExecutablePath",
-                "/format:csv",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.DEVNULL,
-            )
-            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=15)
-            output = stdout.decode("utf-8", errors="replace")
-
-            # Construir mapa PID -> path
-            pid_path: dict[int, str] = {}
-            for line in output.splitlines():
-                parts = line.strip().split(",")
-                # Formato CSV: Node,ExecutablePath,ProcessId
-                if len(parts) >= 3:
-                    try:
-                        path = parts[1].strip()
-                        pid = int(parts[2].strip())
-                        if path:
-                            pid_path[pid] = path
-                    except (ValueError, IndexError):
-                        continue
-
-            # Enriquecer procesos
-            for p in processes:
-                if p["pid"] in pid_path:
-                    p["path"] = pid_path[p["pid"]]
-
+            return await self._collector.process_paths()
         except Exception:
             # wmic puede no estar disponible, no es crítico
-            pass
+            return {}
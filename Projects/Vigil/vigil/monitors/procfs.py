@@ -0,0 +1,376 @@
+"""Backend de recolección nativo para Linux: lee /proc sin crear procesos.
+
+- Conexiones: /proc/net/{tcp,tcp6,udp,udp6}. Cada fila trae el inode del
+  socket; el PID dueño sale de los links socket:[inode] en /proc/<pid>/fd.
+- Procesos: /proc/<pid>/stat (nombre, sesión, RSS), exe y cmdline (path).
+
+El índice inode -> PID es incremental: cada consulta sólo recorre los fd
+de los PIDs nuevos y descarta los que terminaron. Si aparece un socket
+sin dueño conocido (un proceso viejo abrió uno nuevo) se re-escanean
+todos: de inmediato si es un listener, y a lo sumo cada
+`rescan_interval` segundos para el resto.
+
+Si el kernel lo permite, las filas de conexiones se piden por netlink
+(sock_diag) en lugar de /proc/net: el kernel no formatea texto y cada
+fila llega como struct binario. Las filas que no cambiaron desde la
+consulta anterior (misma dirección, puertos, estado e inode) reusan la
+tupla ya decodificada, así que el costo crece con los cambios.
+
+sample_connections() expone la misma lectura, sincrónica, para el
+ConnectionSampler; un lock serializa el índice entre ese hilo y el executor.
+
+Las filas se normalizan al formato de netstat -ano (estados como en
+Windows, IPv6 entre corchetes, UDP con remoto *:*) para que monitors y
+reglas no distingan el backend.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import struct
+import threading
+import time
+
+from ..core.logger import get_logger
+from .collectors import SystemCollector
+from .parsers import Connection, ProcessRow
+
+log = get_logger("procfs")
+
+# Estados TCP del kernel (include/net/tcp_states.h) con los nombres de netstat en Windows
+_TCP_STATES = {
+    b"01": "ESTABLISHED", b"02": "SYN_SENT", b"03": "SYN_RECEIVED",
+    b"04": "FIN_WAIT_1", b"05": "FIN_WAIT_2", b"06": "TIME_WAIT",
+    b"07": "CLOSED", b"08": "CLOSE_WAIT", b"09": "LAST_ACK",
+    b"0A": "LISTENING", b"0B": "CLOSING",
+}
+
+_NET_TABLES = (("tcp", "TCP"), ("tcp6", "TCP"), ("udp", "UDP"), ("udp6", "UDP"))
+
+# sock_diag (linux/sock_diag.h, linux/inet_diag.h)
+_NETLINK_SOCK_DIAG = 4
+_SOCK_DIAG_BY_FAMILY = 20
+_NLM_F_REQUEST_DUMP = 0x1 | 0x300
+_NLMSG_ERROR, _NLMSG_DONE = 2, 3
+_NLMSG_HDR = struct.Struct("=IHHII")
+_DIAG_PORTS = struct.Struct(">HH")
+_DIAG_INODE = struct.Struct("=I")
+# Estados de inet_diag; 12 = TCP_NEW_SYN_RECV (request socks, /proc/net los muestra como SYN_RECV)
+_DIAG_STATES = {
+    1: "ESTABLISHED", 2: "SYN_SENT", 3: "SYN_RECEIVED", 4: "FIN_WAIT_1",
+    5: "FIN_WAIT_2", 6: "TIME_WAIT", 7: "CLOSED", 8: "CLOSE_WAIT",
+    9: "LAST_ACK", 10: "LISTENING", 11: "CLOSING", 12: "SYN_RECEIVED",
+}
+_DIAG_QUERIES = ((socket.AF_INET, socket.IPPROTO_TCP, "TCP"),
+                 (socket.AF_INET6, socket.IPPROTO_TCP, "TCP"),
+                 (socket.AF_INET, socket.IPPROTO_UDP, "UDP"),
+                 (socket.AF_INET6, socket.IPPROTO_UDP, "UDP"))
+
+_PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024 if hasattr(os, "sysconf") else 4
+
+
+def _decode_addr(raw: bytes) -> str:
+    """'0100007F' -> '127.0.0.1'; 32 dígitos -> '[::1]'.
+
+    El kernel imprime cada palabra de 32 bits en orden del host: empaquetar
+    con orden nativo devuelve los bytes en orden de red.
+    """
+    if len(raw) == 8:
+        return socket.inet_ntop(socket.AF_INET, struct.pack("=I", int(raw, 16)))
+    words = [int(raw[i:i + 8], 16) for i in range(0, 32, 8)]
+    return "[" + socket.inet_ntop(socket.AF_INET6, struct.pack("=4I", *words)) + "]"
+
+
+def iter_proc_net(data: bytes, proto: str):
+    """Filas de /proc/net/<tabla> como (proto, local, lport, remote, rport, state, inode)."""
+    addrs: dict[bytes, str] = {}
+
+    def addr(raw: bytes) -> str:
+        value = addrs.get(raw)
+        if value is None:
+            value = addrs[raw] = _decode_addr(raw)
+        return value
+
+    tcp = proto == "TCP"
+    for parts in map(bytes.split, data.splitlines()):
+        if len(parts) < 10 or parts[0] == b"sl":
+            continue
+        local, _, lport = parts[1].partition(b":")
+        remote, _, rport = parts[2].partition(b":")
+        try:
+            if tcp:
+                row = (proto, addr(local), int(lport, 16), addr(remote), int(rport, 16),
+                       _TCP_STATES.get(parts[3], "UNKNOWN"), int(parts[9]))
+            else:
+                row = (proto, addr(local), int(lport, 16), "*", 0, "", int(parts[9]))
+        except (ValueError, OSError):
+            continue
+        yield row
+
+
+class _SockDiag:
+    """Tablas de sockets por netlink sock_diag, con las mismas filas que iter_proc_net."""
+
+    def __init__(self):
+        self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, _NETLINK_SOCK_DIAG)
+        self._seq = 0
+        # Por consulta: bytes crudos (estado, puertos, direcciones, inode) -> fila
+        self._rows: list[dict[bytes, tuple]] = [{} for _ in _DIAG_QUERIES]
+        self._addrs: dict[bytes, str] = {}
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def _addr(self, family: int, raw: bytes) -> str:
+        value = self._addrs.get(raw)
+        if value is None:
+            if family == socket.AF_INET:
+                value = socket.inet_ntop(socket.AF_INET, raw)
+            else:
+                value = "[" + socket.inet_ntop(socket.AF_INET6, raw) + "]"
+            if len(self._addrs) > 65536:
+                self._addrs.clear()
+            self._addrs[raw] = value
+        return value
+
+    def rows(self) -> list[tuple]:
+        out: list[tuple] = []
+        for i, query in enumerate(_DIAG_QUERIES):
+            self._rows[i] = self._dump(*query, self._rows[i], out)
+        return out
+
+    def _dump(self, family: int, protocol: int, proto: str,
+              previous: dict[bytes, tuple], out: list[tuple]) -> dict[bytes, tuple]:
+        self._seq += 1
+        # inet_diag_req_v2: family, protocol, ext, pad, states (todos), id vacío
+        req = struct.pack("=BBBBI48x", family, protocol, 0, 0, 0xFFFFFFFF)
+        self._sock.send(_NLMSG_HDR.pack(_NLMSG_HDR.size + len(req), _SOCK_DIAG_BY_FAMILY,
+                                        _NLM_F_REQUEST_DUMP, self._seq, 0) + req)
+        current: dict[bytes, tuple] = {}
+        tcp = proto == "TCP"
+        addr_len = 4 if family == socket.AF_INET else 16
+        while True:
+            data = self._sock.recv(1 << 17)
+            off = 0
+            while off < len(data):
+                length, kind = _NLMSG_HDR.unpack_from(data, off)[:2]
+                if kind == _NLMSG_DONE:
+                    return current
+                if kind == _NLMSG_ERROR:
+                    errno = -struct.unpack_from("=i", data, off + 16)[0]
+                    raise OSError(errno, "sock_diag falló")
+                # inet_diag_msg: family, state, timer, retrans, sport, dport,
+                # src[16], dst[16], if, cookie[2], expires, rqueue, wqueue, uid, inode
+                msg = off + 16
+                key = data[msg + 1:msg + 2] + data[msg + 4:msg + 40] + data[msg + 68:msg + 72]
+                row = previous.get(key)
+                if row is None:
+                    sport, dport = _DIAG_PORTS.unpack_from(data, msg + 4)
+                    inode = _DIAG_INODE.unpack_from(data, msg + 68)[0]
+                    local = self._addr(family, data[msg + 8:msg + 8 + addr_len])
+                    if tcp:
+                        row = (proto, local, sport,
+                               self._addr(family, data[msg + 24:msg + 24 + addr_len]), dport,
+                               _DIAG_STATES.get(data[msg + 1], "UNKNOWN"), inode)
+                    else:
+                        row = (proto, local, sport, "*", 0, "", inode)
+                current[key] = row
+                out.append(row)
+                off += (length + 3) & ~3
+
+
+class _SocketIndex:
+    """Índice inode de socket -> PID mantenido incrementalmente."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._pid_inodes: dict[int, list[int]] = {}
+        self.inode_pid: dict[int, int] = {}
+        self.scans = 0        # directorios fd recorridos
+        self.links = 0        # readlink de fds
+        self.full_rescans = 0
+
+    def _scan(self, pid: int) -> None:
+        self.scans += 1
+        inodes = []
+        try:
+            with os.scandir(f"{self.root}/{pid}/fd") as it:
+                for entry in it:
+                    self.links += 1
+                    try:
+                        target = os.readlink(entry.path)
+                    except OSError:
+                        continue
+                    if target.startswith("socket:["):
+                        inodes.append(int(target[8:-1]))
+        except OSError:
+            pass  # terminó o sin permisos: queda sin sockets hasta el próximo rescan
+        self._drop(pid)
+        self._pid_inodes[pid] = inodes
+        for inode in inodes:
+            self.inode_pid[inode] = pid
+
+    def _drop(self, pid: int) -> None:
+        for inode in self._pid_inodes.pop(pid, ()):
+            if self.inode_pid.get(inode) == pid:
+                del self.inode_pid[inode]
+
+    def update(self, pids: set[int]) -> int:
+        """Descarta PIDs terminados y escanea sólo los nuevos. Retorna cuántos escaneó."""
+        known = self._pid_inodes.keys()
+        for pid in known - pids:
+            self._drop(pid)
+        new = pids - known
+        for pid in new:
+            self._scan(pid)
+        return len(new)
+
+    def rescan(self, pids: set[int]) -> None:
+        self.full_rescans += 1
+        for pid in pids:
+            self._scan(pid)
+
+
+class ProcFSCollector(SystemCollector):
+    """Conexiones y procesos leídos de /proc (Linux)."""
+
+    name = "procfs"
+    can_sample = True
+
+    def __init__(self, root: str = "/proc", rescan_interval: float = 30.0,
+                 netlink: bool = True):
+        self.root = root
+        self.rescan_interval = rescan_interval
+        self._diag: _SockDiag | None = None
+        if netlink and root == "/proc":
+            try:
+                self._diag = _SockDiag()
+            except OSError as e:
+                log.debug("sock_diag no disponible, se usa /proc/net: %s", e)
+        self._index = _SocketIndex(root)
+        self._last_rescan = 0.0
+        self._orphans: set[int] = set()  # inodes sin dueño tras el último rescan
+        self._lock = threading.Lock()  # el índice lo usan el executor y el sampler
+        self.unresolved = 0  # sockets sin PID en la última tabla
+
+    def _pids(self) -> set[int]:
+        return {int(name) for name in os.listdir(self.root) if name.isdigit()}
+
+    def _read(self, path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    # --- Conexiones ---
+
+    def _connections(self) -> list[Connection]:
+        with self._lock:
+            return self._read_connections()
+
+    def _net_rows(self) -> list[tuple]:
+        """(proto, local, lport, remote, rport, state, inode) de TCP y UDP."""
+        if self._diag is not None:
+            try:
+                return self._diag.rows()
+            except OSError as e:
+                log.warning("sock_diag falló, se usa /proc/net: %s", e)
+                self._diag.close()
+                self._diag = None
+        rows = []
+        for table, proto in _NET_TABLES:
+            try:
+                data = self._read(f"{self.root}/net/{table}")
+            except FileNotFoundError:
+                continue  # sin IPv6
+            rows.extend(iter_proc_net(data, proto))
+        return rows
+
+    def _read_connections(self) -> list[Connection]:
+        rows = self._net_rows()
+        pids = self._pids()
+        index = self._index
+        # Si todos los PIDs eran nuevos (primera consulta) el índice ya está completo
+        complete = index.update(pids) == len(pids)
+        # inode 0: sockets sin dueño (TIME_WAIT, etc.). Los listeners sin dueño
+        # que ya provocaron un rescan (procesos sin permisos) no lo repiten.
+        missing = [r for r in rows if r[6] and r[6] not in index.inode_pid]
+        if missing:
+            fresh = {r[6] for r in missing if r[5] in ("LISTENING", "")} - self._orphans
+            now = time.monotonic()
+            if not complete and (fresh or now - self._last_rescan >= self.rescan_interval):
+                log.debug("Re-escaneando fds: %d sockets sin dueño", len(missing))
+                index.rescan(pids)
+                complete = True
+            if complete:
+                self._last_rescan = now
+                self._orphans = {r[6] for r in missing if r[6] not in index.inode_pid}
+
+        owners = index.inode_pid
+        self.unresolved = sum(1 for r in missing if r[6] not in owners)
+        new = tuple.__new__  # sin el __new__ de NamedTuple (como parsers.py)
+        return [new(Connection, (p, la, lp, ra, rp, st, owners.get(inode, 0)))
+                for p, la, lp, ra, rp, st, inode in rows]
+
+    async def connections(self) -> list[Connection]:
+        return await asyncio.get_running_loop().run_in_executor(None, self._connections)
+
+    def sample_connections(self) -> list[Connection]:
+        return self._connections()
+
+    # --- Procesos ---
+
+    def _processes(self) -> list[ProcessRow]:
+        processes = []
+        for pid in self._pids():
+            try:
+                stat = self._read(f"{self.root}/{pid}/stat")
+            except OSError:
+                continue
+            # pid (comm) estado ppid pgrp session ... rss(24); comm puede tener espacios
+            head, _, rest = stat.rpartition(b")")
+            fields = rest.split()
+            if len(fields) < 22:
+                continue
+            name = head.partition(b"(")[2].decode("utf-8", errors="replace")
+            rss_kb = int(fields[21]) * _PAGE_KB
+            processes.append(ProcessRow(name, pid, fields[3].decode(), f"{rss_kb:,} K"))
+        return processes
+
+    async def processes(self) -> list[ProcessRow]:
+        return await asyncio.get_running_loop().run_in_executor(None, self._processes)
+
+    def _exe(self, pid: int) -> str:
+        try:
+            return os.readlink(f"{self.root}/{pid}/exe")
+        except OSError:
+            pass
+        # Sin permisos sobre exe: argv[0] si es un path absoluto
+        try:
+            argv0 = self._read(f"{self.root}/{pid}/cmdline").partition(b"\0")[0]
+        except OSError:
+            return ""
+        return argv0.decode("utf-8", errors="replace") if argv0.startswith(b"/") else ""
+
+    def _process_paths(self) -> dict[int, str]:
+        paths = {}
+        for pid in self._pids():
+            path = self._exe(pid)
+            if path:
+                paths[pid] = path
+        return paths
+
+    async def process_paths(self) -> dict[int, str]:
+        return await asyncio.get_running_loop().run_in_executor(None, self._process_paths)
+
+    def get_stats(self) -> dict:
+        index = self._index
+        return {
+            "backend": self.name,
+            "source": "sock_diag" if self._diag is not None else "/proc/net",
+            "fd_scans": index.scans,
+            "fd_links": index.links,
+            "full_rescans": index.full_rescans,
+            "sockets_indexed": len(index.inode_pid),
+            "unresolved": self.unresolved,
+        }
@@ -0,0 +1,215 @@
+"""Muestreo sub-segundo de la tabla de conexiones en un hilo dedicado.
+
+Con polls cada 10-15 s, las conexiones cortas (un scan rápido, una
+reverse shell que conecta y sale, una ráfaga de exfiltración) pueden
+abrir y cerrar entre dos snapshots sin que ningún monitor las vea.
+ConnectionSampler lee la tabla cada `interval` segundos (por defecto
+250 ms) con el backend nativo del collector (sample_connections: /proc
+en Linux, iphlpapi en Windows; nunca netstat), la compara con la muestra
+anterior y publica sólo los cambios (ConnChange: open / close / state)
+en un ChangeRing.
+
+El ring tiene un solo productor (el hilo del sampler) y cada monitor lee
+con su propio RingReader, sin locks: el productor escribe el slot y
+después publica la secuencia; el lector copia hasta la secuencia
+publicada y descarta lo que el productor pudo pisar mientras copiaba.
+Si un lector se atrasa más que la capacidad pierde los cambios más
+viejos y los cuenta en `dropped` (el consumidor puede resincronizar con
+un snapshot completo).
+
+La última tabla muestreada también se sirve como snapshot a
+ConnectionSnapshotProvider, así que con el sampler activo los polls no
+vuelven a leer la tabla.
+
+Costo: get_stats() reporta CPU del hilo (time.thread_time), duración
+media de cada muestra, muestras salteadas porque la anterior tardó más
+que el intervalo, y cambios perdidos por lectores atrasados.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import NamedTuple
+
+from ..core.logger import get_logger
+from .collectors import SystemCollector
+from .connections import ConnectionTable
+from .parsers import Connection
+
+log = get_logger("sampler")
+
+
+class ConnChange(NamedTuple):
+    """Cambio entre dos muestras: open (nueva), close (desapareció) o state (cambió de estado)."""
+    ts: float           # time.time() de la muestra que lo detectó
+    kind: str
+    conn: Connection    # en close, la fila tal como se vio por última vez
+
+
+class ChangeRing:
+    """Ring buffer de un productor y varios lectores, sin locks."""
+
+    def __init__(self, capacity: int = 65536):
+        self.capacity = capacity
+        self._slots: list = [None] * capacity
+        self._head = 0  # próxima secuencia a escribir (publicada)
+
+    def extend(self, items: list) -> None:
+        """Sólo desde el hilo productor. Publica la secuencia después de escribir."""
+        slots, cap = self._slots, self.capacity
+        seq = self._head
+        for item in items:
+            slots[seq % cap] = item
+            seq += 1
+            self._head = seq
+
+    def reader(self, name: str) -> RingReader:
+        return RingReader(self, name)
+
+
+class RingReader:
+    """Cursor propio sobre un ChangeRing: cada lector ve todos los cambios una vez."""
+
+    def __init__(self, ring: ChangeRing, name: str):
+        self.name = name
+        self._ring = ring
+        self._cursor = ring._head  # sólo cambios posteriores a la creación
+        self.read = 0
+        self.dropped = 0
+
+    def drain(self) -> tuple[list, int]:
+        """Cambios nuevos desde la última lectura y cuántos se perdieron por atraso."""
+        ring = self._ring
+        cap = ring.capacity
+        head = ring._head
+        start = max(self._cursor, head - cap)
+        slots = ring._slots
+        items = [slots[seq % cap] for seq in range(start, head)]
+        # El productor pudo pisar slots mientras copiábamos: la secuencia s es
+        # válida sólo si s + cap todavía no se empezó a escribir
+        valid_from = ring._head - cap + 1
+        if valid_from > start:
+            skip = min(valid_from - start, len(items))
+            items = items[skip:]
+            start += skip
+        lost = start - self._cursor
+        self._cursor = head
+        self.read += len(items)
+        self.dropped += lost
+        return items, lost
+
+
+class ConnectionSampler:
+    """Hilo que muestrea conexiones y publica los cambios en un ChangeRing."""
+
+    def __init__(self, collector: SystemCollector, interval: float = 0.25,
+                 capacity: int = 65536):
+        if not collector.can_sample:
+            raise ValueError(f"el collector {collector.name} no soporta muestreo")
+        self.collector = collector
+        self.interval = interval
+        self.ring = ChangeRing(capacity)
+        self._readers: list[RingReader] = []
+        self._latest: ConnectionTable | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._started_at = 0.0
+
+        self.samples = 0
+        self.changes = 0
+        self.skipped = 0          # muestras salteadas: la anterior tardó más que el intervalo
+        self.errors = 0
+        self.cpu_seconds = 0.0    # CPU del hilo del sampler
+        self.busy_seconds = 0.0   # tiempo de pared muestreando
+
+    def reader(self, name: str) -> RingReader:
+        """Lector para un consumidor. Crear antes de start() para no perder cambios."""
+        reader = self.ring.reader(name)
+        self._readers.append(reader)
+        return reader
+
+    def latest(self) -> ConnectionTable | None:
+        """Última tabla muestreada (taken_at en time.monotonic())."""
+        return self._latest
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="vigil-conn-sampler",
+                                        daemon=True)
+        self._thread.start()
+        log.info("Sampler de conexiones cada %.0f ms (%s)", self.interval * 1000,
+                 self.collector.name)
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        previous: dict[tuple, Connection] | None = None
+        next_at = time.monotonic()
+        while not self._stop.wait(max(0.0, next_at - time.monotonic())):
+            cpu = time.thread_time()
+            started = time.monotonic()
+            try:
+                rows = self.collector.sample_connections()
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1 or self.errors % 100 == 0:
+                    log.warning("Error muestreando conexiones (%d): %s", self.errors, e)
+                rows = None
+            if rows is not None:
+                previous = self._publish(previous, rows, started)
+            finished = time.monotonic()
+            self.cpu_seconds += time.thread_time() - cpu
+            self.busy_seconds += finished - started
+
+            next_at += self.interval
+            if finished > next_at:
+                missed = int((finished - next_at) // self.interval) + 1
+                self.skipped += missed
+                next_at += missed * self.interval
+
+    def _publish(self, previous: dict[tuple, Connection] | None, rows: list[Connection],
+                 taken_at: float) -> dict[tuple, Connection]:
+        """Diff contra la muestra anterior por (proto, local, puerto, remoto, puerto)."""
+        self.samples += 1
+        current = {c[:5]: c for c in rows}
+        self._latest = ConnectionTable(rows, taken_at)
+        if previous is None:
+            return current  # primera muestra: baseline sin cambios
+
+        now = time.time()
+        changes = [ConnChange(now, "open", current[k]) for k in current.keys() - previous.keys()]
+        changes += [ConnChange(now, "close", previous[k])
+                    for k in previous.keys() - current.keys()]
+        for key, conn in current.items():
+            old = previous.get(key)
+            if old is not None and old.state != conn.state:
+                changes.append(ConnChange(now, "state", conn))
+        if changes:
+            self.changes += len(changes)
+            self.ring.extend(changes)
+        return current
+
+    def get_stats(self) -> dict:
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "backend": self.collector.name,
+            "interval_ms": round(self.interval * 1000),
+            "running": self._thread is not None and self._thread.is_alive(),
+            "samples": self.samples,
+            "changes": self.changes,
+            "skipped_samples": self.skipped,
+            "errors": self.errors,
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "cpu_percent": round(100 * self.cpu_seconds / elapsed, 2) if elapsed else 0.0,
+            "avg_sample_ms": round(1000 * self.busy_seconds / self.samples, 2)
+                if self.samples else 0.0,
+            "dropped": {r.name: r.dropped for r in self._readers},
+        }
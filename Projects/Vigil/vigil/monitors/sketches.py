@@ -0,0 +1,335 @@
+"""Detección de scans lentos con sketches de memoria acotada.
+
+SCAN001 sólo ve barridos rápidos (> 20 puertos en 2 minutos). Un scanner
+paciente que prueba un puerto cada pocos minutos durante horas no llega
+nunca al umbral, y agrandar la ventana con listas por conexión no escala.
+SlowScanTracker cuenta puertos distintos por IP remota en varios
+horizontes (minutos, horas, día) con estructuras de tamaño fijo:
+
+- Filtro de Bloom de pares (ip, puerto): decide si un par es nuevo.
+- Count-min sketch por IP (actualización conservadora) de pares nuevos:
+  estima cuántos puertos distintos tocó una fuente no seguida.
+- Las fuentes que pasan `promote_after` se siguen con HyperLogLog por
+  horizonte: un ring de buckets (como rollups._Ring) con 128 registros de
+  1 byte por bucket. La unión de los buckets (máximo por registro) estima
+  los puertos distintos de la ventana con ~9% de error.
+
+Bloom y count-min rotan en dos generaciones que cubren el horizonte más
+largo. Las fuentes seguidas están limitadas a `max_sources`; con la tabla
+llena sale la que menos puertos nuevos sumó, así que la memoria total es
+fija e independiente del volumen del scan.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+from collections import deque
+from dataclasses import dataclass, replace
+from functools import lru_cache
+
+import numpy as np
+
+# HyperLogLog: 2^7 = 128 registros de 1 byte, error estándar 1.04/sqrt(128) ≈ 9%
+_P = 7
+_M = 1 << _P
+_ALPHA = 0.7213 / (1 + 1.079 / _M)
+_INV_POW2 = 2.0 ** -np.arange(64 - _P + 2)
+_MASK64 = (1 << 64) - 1
+
+
+@dataclass(frozen=True)
+class Horizon:
+    name: str
+    seconds: int      # tamaño del bucket
+    slots: int        # buckets en la ventana
+    threshold: int    # puertos distintos que disparan la alerta
+
+    @property
+    def window(self) -> int:
+        return self.seconds * self.slots
+
+
+HORIZONS = (
+    Horizon("15m", 60, 15, 30),
+    Horizon("6h", 1800, 12, 60),
+    Horizon("24h", 3600, 24, 100),
+)
+
+
+def _mix64(x: int) -> int:
+    """splitmix64: dispersa enteros chicos (puertos) sobre 64 bits."""
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+@lru_cache(maxsize=65536)
+def _hll_slot(port: int) -> tuple[int, int]:
+    """(registro, rango) de un puerto: bits altos eligen registro, el resto da el rango."""
+    h = _mix64(port)
+    rest = (h << _P) & _MASK64
+    return h >> (64 - _P), 64 - rest.bit_length() + 1 if rest else 64 - _P + 1
+
+
+def hll_estimate(registers: np.ndarray) -> float:
+    """Cardinalidad estimada de un vector de registros HLL."""
+    estimate = _ALPHA * _M * _M / float(_INV_POW2[registers].sum())
+    if estimate <= 2.5 * _M:
+        zeros = _M - int(np.count_nonzero(registers))
+        if zeros:
+            estimate = _M * math.log(_M / zeros)  # corrección de rango chico
+    return estimate
+
+
+def _hash_pair(key: bytes) -> tuple[int, int]:
+    digest = hashlib.blake2b(key, digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class BloomFilter:
+    """Conjunto aproximado de tamaño fijo (sin falsos negativos)."""
+
+    def __init__(self, bits: int = 1 << 22, hashes: int = 3):
+        self.size = bits
+        self.hashes = hashes
+        self.bits = bytearray(bits // 8)
+
+    def _positions(self, key: bytes) -> list[int]:
+        h1, h2 = _hash_pair(key)
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: bytes) -> bool:
+        """Agrega la clave. Retorna True si (probablemente) no estaba."""
+        new = False
+        for pos in self._positions(key):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                new = True
+        return new
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def clear(self) -> None:
+        self.bits[:] = bytes(len(self.bits))
+
+
+class CountMinSketch:
+    """Contadores aproximados por clave (sobreestima, nunca subestima)."""
+
+    def __init__(self, width: int = 1 << 16, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.uint32)
+        self._rows = np.arange(depth)
+
+    def _cols(self, key: bytes) -> np.ndarray:
+        h1, h2 = _hash_pair(key)
+        return np.array([(h1 + i * h2) % self.width for i in range(self.depth)])
+
+    def add(self, key: bytes, count: int = 1) -> int:
+        """Suma con actualización conservadora; retorna la nueva estimación."""
+        cols = self._cols(key)
+        cells = self.table[self._rows, cols]
+        estimate = int(cells.min()) + count
+        self.table[self._rows, cols] = np.maximum(cells, estimate)
+        return estimate
+
+    def estimate(self, key: bytes) -> int:
+        return int(self.table[self._rows, self._cols(key)].min())
+
+    def clear(self) -> None:
+        self.table[:] = 0
+
+
+class _HorizonRing:
+    """Registros HLL (fuentes × slots × 128) indexados por bucket = ts // seconds."""
+
+    def __init__(self, horizon: Horizon, max_sources: int):
+        self.horizon = horizon
+        self.regs = np.zeros((max_sources, horizon.slots, _M), dtype=np.uint8)
+        self.head = -1  # último bucket escrito
+
+    def advance(self, bucket: int) -> None:
+        """Pone en cero los slots de los buckets salteados hasta `bucket`."""
+        if bucket <= self.head:
+            return
+        slots = self.horizon.slots
+        if self.head < 0 or bucket - self.head >= slots:
+            self.regs[:] = 0
+        else:
+            cols = np.arange(self.head + 1, bucket + 1) % slots
+            self.regs[:, cols] = 0
+        self.head = bucket
+
+    def add(self, row: int, bucket: int, register: int, rank: int) -> None:
+        if bucket <= self.head - self.horizon.slots:
+            return  # más viejo que la ventana
+        cell = self.regs[row, bucket % self.horizon.slots]
+        if rank > cell[register]:
+            cell[register] = rank
+
+    def distinct(self, row: int) -> float:
+        # Los buckets fuera de la ventana ya quedaron en cero al avanzar
+        return hll_estimate(self.regs[row].max(axis=0))
+
+
+class SlowScanTracker:
+    """Puertos distintos por IP remota en varios horizontes, con memoria fija."""
+
+    def __init__(self, max_sources: int = 1024, promote_after: int = 4,
+                 thresholds: dict[str, int] | None = None,
+                 horizons: tuple[Horizon, ...] = HORIZONS):
+        thresholds = thresholds or {}
+        self.horizons = tuple(replace(h, threshold=thresholds.get(h.name, h.threshold))
+                              for h in horizons)
+        self.max_sources = max_sources
+        self.promote_after = promote_after
+        self._rings = [_HorizonRing(h, max_sources) for h in self.horizons]
+        # Dos generaciones de Bloom/count-min, cada una cubre medio horizonte largo
+        self._rotate_every = max(h.window for h in self.horizons) / 2
+        self._rotated_at: float | None = None
+        self._pairs = [BloomFilter(), BloomFilter()]
+        self._ports = [CountMinSketch(), CountMinSketch()]
+
+        self._rows: dict[str, int] = {}        # ip seguida -> fila (orden de actividad)
+        self._row_ip: list[str | None] = [None] * max_sources
+        self._score = np.zeros(max_sources, dtype=np.int64)  # puertos nuevos por fila
+        self._free = list(range(max_sources - 1, -1, -1))
+        self._last_seen: dict[str, float] = {}
+        self._samples: dict[str, deque] = {}   # últimos puertos vistos por fuente
+        self._alerted: set[tuple[str, str]] = set()  # (ip, horizonte)
+
+        self.observed = 0
+        self.promoted = 0
+        self.evicted = 0
+
+    # --- Entrada ---
+
+    def _rotate(self, now: float) -> None:
+        if self._rotated_at is None:
+            self._rotated_at = now
+        elif now - self._rotated_at >= self._rotate_every:
+            self._rotated_at = now
+            for gens in (self._pairs, self._ports):
+                old = gens.pop()
+                old.clear()
+                gens.insert(0, old)
+            self._score >>= 1
+
+    def observe(self, ip: str, port: int, now: float) -> None:
+        """Registra una conexión nueva de `ip` al puerto local `port`."""
+        self.observed += 1
+        self._rotate(now)
+        pair = f"{ip}|{port}".encode()
+        novel = self._pairs[0].add(pair) and pair not in self._pairs[1]
+        row = self._rows.get(ip)
+        if row is None:
+            if not novel:
+                return
+            key = ip.encode()
+            distinct = self._ports[0].add(key) + self._ports[1].estimate(key)
+            if distinct < self.promote_after:
+                return
+            row = self._promote(ip, distinct)
+        else:
+            self._rows[ip] = self._rows.pop(ip)  # más reciente al final (orden de expiración)
+            if novel:
+                self._score[row] += 1
+
+        self._last_seen[ip] = now
+        if novel:
+            self._samples[ip].append(port)
+        register, rank = _hll_slot(port)
+        for ring in self._rings:
+            bucket = int(now) // ring.horizon.seconds
+            ring.advance(bucket)
+            ring.add(row, bucket, register, rank)
+
+    def _promote(self, ip: str, score: int) -> int:
+        if not self._free:
+            # Tabla llena: sale la fuente con menos puertos nuevos (space-saving).
+            # Un scan distribuido con pocos puertos por IP no desplaza a un scanner lento.
+            self._release(self._row_ip[int(self._score.argmin())])
+            self.evicted += 1
+        row = self._free.pop()
+        for ring in self._rings:
+            ring.regs[row] = 0
+        self._rows[ip] = row
+        self._row_ip[row] = ip
+        self._score[row] = score
+        self._samples[ip] = deque(maxlen=20)
+        self.promoted += 1
+        return row
+
+    def _release(self, ip: str) -> None:
+        row = self._rows.pop(ip)
+        self._free.append(row)
+        self._row_ip[row] = None
+        self._score[row] = 0
+        self._last_seen.pop(ip, None)
+        self._samples.pop(ip, None)
+        for h in self.horizons:
+            self._alerted.discard((ip, h.name))
+
+    # --- Evaluación ---
+
+    def evaluate(self, ips, now: float) -> list[dict]:
+        """Datos de alerta para las IPs dadas que superan el umbral de algún horizonte.
+
+        Una alerta por (IP, horizonte); se re-arma cuando la estimación cae
+        por debajo de la mitad del umbral o la fuente deja de seguirse.
+        """
+        self._expire(now)
+        results = []
+        for ip in ips:
+            row = self._rows.get(ip)
+            if row is None:
+                continue
+            for ring in self._rings:
+                horizon = ring.horizon
+                ring.advance(int(now) // horizon.seconds)
+                distinct = ring.distinct(row)
+                key = (ip, horizon.name)
+                if distinct > horizon.threshold:
+                    if key in self._alerted:
+                        continue
+                    self._alerted.add(key)
+                    results.append({
+                        "remote_ip": ip,
+                        "distinct_ports": math.ceil(distinct),
+                        "horizon": horizon.name,
+                        "window_seconds": horizon.window,
+                        "sample_ports": sorted(set(self._samples[ip])),
+                    })
+                    break  # el horizonte más corto que dispara alcanza
+                if distinct < horizon.threshold / 2:
+                    self._alerted.discard(key)
+        return results
+
+    def _expire(self, now: float) -> None:
+        """Libera fuentes sin actividad en todo el horizonte más largo."""
+        longest = max(h.window for h in self.horizons)
+        while self._rows:
+            ip = next(iter(self._rows))
+            if now - self._last_seen.get(ip, now) <= longest:
+                break
+            self._release(ip)
+
+    def get_stats(self) -> dict:
+        return {
+            "tracked_sources": len(self._rows),
+            "observed": self.observed,
+            "promoted": self.promoted,
+            "evicted": self.evicted,
+            "memory_bytes": self.memory_bytes(),
+        }
+
+    def memory_bytes(self) -> int:
+        """Memoria fija de los sketches (sin contar dicts de fuentes seguidas)."""
+        return (sum(r.regs.nbytes for r in self._rings)
+                + sum(len(b.bits) for b in self._pairs)
+                + sum(c.table.nbytes for c in self._ports))
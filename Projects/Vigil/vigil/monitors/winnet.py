@@ -0,0 +1,106 @@
+"""Tabla TCP nativa de Windows vía iphlpapi (GetExtendedTcpTable, ctypes).
+
+netstat -ano cuesta un proceso por consulta: sirve para polls de 10-15 s
+pero no para muestrear varias veces por segundo. GetExtendedTcpTable
+devuelve la misma tabla (con PID dueño) desde el kernel en una llamada.
+Sólo TCP: UDP no tiene conexiones que aparezcan y desaparezcan.
+
+Las filas salen en el formato de parse_netstat (estados como netstat,
+IPv6 entre corchetes) para que los consumidores no distingan la fuente.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import socket
+import struct
+
+from .parsers import Connection
+
+_AF_INET = 2
+_AF_INET6 = 23
+_TCP_TABLE_OWNER_PID_ALL = 5
+_ERROR_INSUFFICIENT_BUFFER = 122
+
+# MIB_TCP_STATE -> nombre de netstat
+_STATES = {
+    1: "CLOSED", 2: "LISTENING", 3: "SYN_SENT", 4: "SYN_RECEIVED",
+    5: "ESTABLISHED", 6: "FIN_WAIT_1", 7: "FIN_WAIT_2", 8: "CLOSE_WAIT",
+    9: "CLOSING", 10: "LAST_ACK", 11: "TIME_WAIT", 12: "DELETE_TCB",
+}
+
+_DWORD = ctypes.c_uint32
+
+
+class _TcpRow(ctypes.Structure):
+    """MIB_TCPROW_OWNER_PID."""
+    _fields_ = [("state", _DWORD), ("local_addr", _DWORD), ("local_port", _DWORD),
+                ("remote_addr", _DWORD), ("remote_port", _DWORD), ("pid", _DWORD)]
+
+
+class _Tcp6Row(ctypes.Structure):
+    """MIB_TCP6ROW_OWNER_PID."""
+    _fields_ = [("local_addr", ctypes.c_ubyte * 16), ("local_scope", _DWORD),
+                ("local_port", _DWORD), ("remote_addr", ctypes.c_ubyte * 16),
+                ("remote_scope", _DWORD), ("remote_port", _DWORD),
+                ("state", _DWORD), ("pid", _DWORD)]
+
+
+class TcpTableReader:
+    """Lee la tabla TCP (IPv4 + IPv6) reutilizando el buffer entre llamadas."""
+
+    def __init__(self):
+        self._get = ctypes.windll.iphlpapi.GetExtendedTcpTable
+        self._buffers = {_AF_INET: ctypes.create_string_buffer(64 * 1024),
+                         _AF_INET6: ctypes.create_string_buffer(64 * 1024)}
+        self._addrs: dict[bytes, str] = {}
+
+    def _table(self, family: int) -> ctypes.Array:
+        buf = self._buffers[family]
+        size = _DWORD(len(buf))
+        while True:
+            err = self._get(buf, ctypes.byref(size), False, family,
+                            _TCP_TABLE_OWNER_PID_ALL, 0)
+            if err == 0:
+                return buf
+            if err != _ERROR_INSUFFICIENT_BUFFER:
+                raise OSError(err, "GetExtendedTcpTable falló")
+            # La tabla creció entre llamadas: agrandar con margen y reintentar
+            buf = self._buffers[family] = ctypes.create_string_buffer(size.value + 16 * 1024)
+            size = _DWORD(len(buf))
+
+    def _addr(self, family: int, raw: bytes) -> str:
+        value = self._addrs.get(raw)
+        if value is None:
+            if family == _AF_INET:
+                value = socket.inet_ntop(socket.AF_INET, raw)
+            else:
+                value = "[" + socket.inet_ntop(socket.AF_INET6, raw) + "]"
+            if len(self._addrs) > 65536:
+                self._addrs.clear()
+            self._addrs[raw] = value
+        return value
+
+    def read(self) -> list[Connection]:
+        rows = []
+        states = _STATES
+        for family, row_type in ((_AF_INET, _TcpRow), (_AF_INET6, _Tcp6Row)):
+            buf = self._table(family)
+            count = _DWORD.from_buffer(buf).value
+            # Las filas empiezan después de dwNumEntries (alineadas a 4 bytes)
+            table = (row_type * count).from_buffer(buf, 4)
+            for r in table:
+                if family == _AF_INET:
+                    # Direcciones y puertos en orden de red dentro de un DWORD
+                    local = self._addr(family, struct.pack("<I", r.local_addr))
+                    remote = self._addr(family, struct.pack("<I", r.remote_addr))
+                else:
+                    local = self._addr(family, bytes(r.local_addr))
+                    remote = self._addr(family, bytes(r.remote_addr))
+                state = states.get(r.state, "UNKNOWN")
+                rows.append(Connection(
+                    "TCP", local, socket.ntohs(r.local_port & 0xFFFF), remote,
+                    0 if state == "LISTENING" else socket.ntohs(r.remote_port & 0xFFFF),
+                    state, r.pid,
+                ))
+        return rows